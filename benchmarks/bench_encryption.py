@@ -0,0 +1,58 @@
+"""
+bench_encryption.py
+-------------------
+
+Compares the legacy Fernet path with the AEAD envelope written by `cry_encryption.encrypt_string`.
+Reports per-operation latency with a warm derived-key cache and the stored size of each format.
+
+Run from the project root:
+
+    python -m benchmarks.bench_encryption --iterations 20000
+"""
+
+import argparse
+import os
+import time
+
+from modules import cry_encryption
+
+
+def _time_per_op(func, iterations):
+    """Return the mean latency of `func` in microseconds."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def run(iterations, sizes):
+    salt = os.urandom(cry_encryption.SALT_LENGTH)
+    fernet = cry_encryption.get_fernet(salt)  # Warms the derived-key cache for both paths
+    cipher_name = {cry_encryption.ENVELOPE_AES_GCM: 'AES-256-GCM',
+                   cry_encryption.ENVELOPE_CHACHA20_POLY1305: 'ChaCha20-Poly1305'}[cry_encryption.ENVELOPE_CIPHER]
+
+    print(f"Envelope cipher: {cipher_name}, iterations per measurement: {iterations}")
+    print(f"{'size':>7} | {'fernet enc':>10} {'aead enc':>10} | {'fernet dec':>10} {'aead dec':>10} | "
+          f"{'fernet bytes':>12} {'aead bytes':>10} {'saved':>6}")
+    for size in sizes:
+        plaintext = os.urandom(size // 2 + 1).hex()[:size]
+        fernet_token = fernet.encrypt(plaintext.encode())
+        envelope = cry_encryption.encrypt_string(plaintext, salt)
+
+        fernet_enc = _time_per_op(lambda: fernet.encrypt(plaintext.encode()), iterations)
+        aead_enc = _time_per_op(lambda: cry_encryption.encrypt_string(plaintext, salt), iterations)
+        fernet_dec = _time_per_op(lambda: cry_encryption.decrypt_string(fernet_token, salt), iterations)
+        aead_dec = _time_per_op(lambda: cry_encryption.decrypt_string(envelope, salt), iterations)
+        saved = 1 - len(envelope) / len(fernet_token)
+
+        print(f"{size:>7} | {fernet_enc:>8.1f}us {aead_enc:>8.1f}us | {fernet_dec:>8.1f}us {aead_dec:>8.1f}us | "
+              f"{len(fernet_token):>12} {len(envelope):>10} {saved:>6.1%}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark Fernet against the AEAD secret envelope.')
+    parser.add_argument('--iterations', type=int, default=10000, help='Operations per measurement')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[32, 256, 4096, 65536],
+                        help='Plaintext sizes in characters')
+    args = parser.parse_args()
+    run(args.iterations, args.sizes)
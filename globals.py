@@ -1,6 +1,7 @@
 # Global variable to store bucket details in memory
 import logging
 import os
+import threading
 
 from flask_restx import reqparse
 from keycloak import KeycloakOpenID
@@ -18,12 +19,22 @@ server_env = os.environ.get('SERVERENV', "DEV")
 SECRETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '', 'secrets')
 SECRET_KEY_FILE = "secret.key"
 BUCKET_KEYS = {}  # Store the encryption keys for each bucket
-BUCKETS = {}  # Store the list of keys for each bucket
+BUCKETS = {}  # Index of secret names for each bucket - maintained by modules.cry_index
+
+# Serializes database sync passes and targeted bucket resyncs that update BUCKETS, BUCKET_KEYS and the files
+SYNC_LOCK = threading.RLock()
 
 # Database Config Files
 CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config', server_env, 'database_config.json')
 SQL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '', 'sql', 'create_table.sql')
 
+# Bucket Config Files - config/<env>/<app>/**/<bucket>.json, re-checked for changes at most once per interval
+BUCKET_CONFIG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config', server_env)
+CONFIG_RELOAD_INTERVAL = float(os.environ.get('CRY_CONFIG_RELOAD_INTERVAL', 5.0))  # Seconds
+
+# Key Derivation Config File - written by `python -m modules.cry_kdf_calibrate`
+KDF_CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config', server_env, 'kdf_config.json')
+
 # Define the RequestParser for handling authentication
 auth_parser = reqparse.RequestParser()
 auth_parser.add_argument('Authorization', location='headers', required=True, help='Bearer <token>')
@@ -47,6 +58,82 @@ keycloak_openid = KeycloakOpenID(
 # Constants
 KEY_SALT_DELIMITER = '$'
 
+# Derived Key Cache - bounds the PBKDF2 derived keys kept in memory, keyed by bucket salt
+DERIVED_KEY_CACHE_SIZE = int(os.environ.get('CRY_KEY_CACHE_SIZE', 1024))
+DERIVED_KEY_CACHE_TTL = int(os.environ.get('CRY_KEY_CACHE_TTL', 3600))  # Seconds
+
+# KDF Limits - envelopes may request at most this multiple of the configured KDF cost, and scrypt at most
+# this much memory (128 * r * n bytes); ciphertexts reach /decrypt_string from unauthenticated clients
+KDF_ENVELOPE_MAX_COST_FACTOR = int(os.environ.get('CRY_KDF_ENVELOPE_MAX_COST_FACTOR', 4))
+SCRYPT_MAX_MEMORY = int(os.environ.get('CRY_SCRYPT_MAX_MEMORY', 32 * 1024 * 1024))  # Bytes
+
+# Cipher for new secret envelopes - 'auto' picks AES-GCM when the CPU has AES instructions, else ChaCha20-Poly1305
+AEAD_CIPHER = os.environ.get('CRY_AEAD_CIPHER', 'auto').lower()
+
+# Database Sync - incremental; each pass reads the rows committed since the transaction horizon of the previous one
+SYNC_INTERVAL = float(os.environ.get('CRY_SYNC_INTERVAL', 15))  # Seconds
+
+# File Materialization - worker threads and queue depth for bulk secret/key file writes during sync
+MATERIALIZE_WORKERS = int(os.environ.get('CRY_MATERIALIZE_WORKERS', 4))
+MATERIALIZE_QUEUE_SIZE = int(os.environ.get('CRY_MATERIALIZE_QUEUE_SIZE', 1000))
+
+# Database Change Listener - while it is connected, the periodic sync only runs as a safety net
+DB_LISTENER_ENABLED = os.environ.get('CRY_DB_LISTENER', 'true').lower() == 'true'
+DB_NOTIFY_CHANNEL = 'cry_changes'
+SYNC_INTERVAL_LISTENING = float(os.environ.get('CRY_SYNC_INTERVAL_LISTENING', 300))  # Seconds
+
+# Anti-Entropy - seconds between hash-tree comparisons of the database and the local secrets directory
+ANTI_ENTROPY_INTERVAL = float(os.environ.get('CRY_ANTI_ENTROPY_INTERVAL', 3600))
+# Seconds between rescans of the local secret files, which catch files edited or removed by hand; between them the
+# local digests follow this node's writes. A rescan stats every indexed file and re-hashes only the changed ones.
+ANTI_ENTROPY_RESCAN_INTERVAL = float(os.environ.get('CRY_ANTI_ENTROPY_RESCAN_INTERVAL', ANTI_ENTROPY_INTERVAL))
+
+# Write Coalescing - concurrent secret writes within the delay window share one multi-row statement and commit
+WRITE_COALESCE_ENABLED = os.environ.get('CRY_WRITE_COALESCE', 'true').lower() == 'true'
+WRITE_COALESCE_MAX_BATCH = int(os.environ.get('CRY_WRITE_COALESCE_MAX_BATCH', 100))
+WRITE_COALESCE_MAX_DELAY = float(os.environ.get('CRY_WRITE_COALESCE_MAX_DELAY', 0.005))  # Seconds
+
+# Decrypted Secret Cache - opt-in; a bucket config's "cache_secrets" flag overrides the default per bucket
+SECRET_CACHE_ENABLED = os.environ.get('CRY_SECRET_CACHE', 'false').lower() == 'true'
+SECRET_CACHE_MAX_ENTRIES = int(os.environ.get('CRY_SECRET_CACHE_SIZE', 10000))
+SECRET_CACHE_MAX_BYTES = int(os.environ.get('CRY_SECRET_CACHE_BYTES', 16 * 1024 * 1024))
+SECRET_CACHE_TTL = int(os.environ.get('CRY_SECRET_CACHE_TTL', 30))  # Seconds
+
+# Server Threads - size of the waitress thread pool; the Dockerfile passes the same CRY_SERVER_THREADS to waitress-serve.
+# Budget: long-poll waiters take up to WATCH_MAX_WAITERS threads and key derivations up to KDF workers + queue;
+# the remaining threads serve ordinary requests, so keep their sum well below SERVER_THREADS.
+SERVER_THREADS = int(os.environ.get('CRY_SERVER_THREADS', 16))
+
+# Watch - long-poll waiters park a server thread each; by default up to half the server threads
+WATCH_MAX_WAITERS = int(os.environ.get('CRY_WATCH_MAX_WAITERS', max(1, SERVER_THREADS // 2)))
+WATCH_DEFAULT_TIMEOUT = float(os.environ.get('CRY_WATCH_DEFAULT_TIMEOUT', 25))  # Seconds
+WATCH_MAX_TIMEOUT = float(os.environ.get('CRY_WATCH_MAX_TIMEOUT', 55))  # Seconds
+
+# Change Feed - default and largest number of changes returned per page
+CHANGE_FEED_PAGE_SIZE = int(os.environ.get('CRY_CHANGE_FEED_PAGE_SIZE', 500))
+CHANGE_FEED_MAX_PAGE_SIZE = int(os.environ.get('CRY_CHANGE_FEED_MAX_PAGE_SIZE', 5000))
+
+# Paginated Listings - default and largest page size, and the most index entries a filtered page may examine
+LISTING_PAGE_SIZE = int(os.environ.get('CRY_LISTING_PAGE_SIZE', 1000))
+LISTING_MAX_PAGE_SIZE = int(os.environ.get('CRY_LISTING_MAX_PAGE_SIZE', 10000))
+LISTING_SCAN_LIMIT = int(os.environ.get('CRY_LISTING_SCAN_LIMIT', 50000))
+
+# Secret Tags - the most key/value tags a single secret may carry
+SECRET_TAGS_MAX = int(os.environ.get('CRY_SECRET_TAGS_MAX', 50))
+
+# Batch Encryption - worker threads for encrypt_many/decrypt_many and the largest batch a route accepts
+CRYPTO_BATCH_WORKERS = int(os.environ.get('CRY_BATCH_WORKERS', min(8, os.cpu_count() or 1)))
+CRYPTO_BATCH_MAX_ITEMS = int(os.environ.get('CRY_BATCH_MAX_ITEMS', 1000))
+# Most distinct salts one decryption batch may use; each costs a full key derivation
+CRYPTO_BATCH_MAX_SALTS = int(os.environ.get('CRY_BATCH_MAX_SALTS', 16))
+
+# KDF Executor - runs per-request PBKDF2 derivations ('process', 'thread' or 'inline').
+# Keep workers + max queue below the server thread count so cheap routes always have a free thread.
+KDF_EXECUTOR = os.environ.get('CRY_KDF_EXECUTOR', 'process').lower()
+KDF_EXECUTOR_WORKERS = int(os.environ.get('CRY_KDF_WORKERS', 2))
+KDF_EXECUTOR_MAX_QUEUE = int(os.environ.get('CRY_KDF_MAX_QUEUE', 4))
+KDF_EXECUTOR_TIMEOUT = float(os.environ.get('CRY_KDF_TIMEOUT', 5))  # Seconds
+
 # Global KEY
 # Fetch SECRET_KEY from environment variable CRY_INFO
 SECRET_KEY = os.environ.get("CRY_INFO", "UGFwcHVDYW50RGFuY2VTYWFsYUAyMDIwMzEjJCUK")
\ No newline at end of file
@@ -13,7 +13,6 @@ import json
 import logging
 import os
 import threading
-import time
 
 from flask import Flask, send_from_directory, request
 from flask_restx import Api, Namespace
@@ -22,11 +21,13 @@ from flask_limiter.util import get_remote_address
 from flask_limiter import Limiter
 
 import routes.cry_home
+from modules import cry_anti_entropy
 from modules import cry_database
+from modules import cry_db_listener
 from modules import cry_gen_docs
 from modules import cry_initialize
 
-from globals import LOG_LEVEL
+from globals import LOG_LEVEL, SYNC_INTERVAL, SYNC_INTERVAL_LISTENING, DB_LISTENER_ENABLED
 
 # Flask app initialization
 app = Flask(__name__, template_folder='../templates', static_folder='../templates/static')
@@ -131,26 +132,47 @@ cry_gen_docs.generate_documentation()
 logging.info("Initializing Secrets Manager Service")
 cry_initialize.initialize_app()
 
-bucket_keys_lock = threading.Lock()
+_background_lock = threading.Lock()
+_background_started = False
 
 
 def start_sync_thread():
-    """Start a synchronization loop to periodically sync buckets, keys, and secrets from the database."""
+    """Start a synchronization loop to periodically sync changed buckets, keys, and secrets from the database."""
     while True:
-        logging.info("Syncing Buckets & Keys from Database")
-        with bucket_keys_lock:
-            bucket_keys_list = cry_database.initialize_buckets_and_keys_from_db()
-            cry_initialize.initialize_buckets(bucket_keys_list)
-        logging.info("Syncing Secrets from Database")
-        cry_initialize.initialize_secrets_from_db()
-        time.sleep(600)  # Sync every 10 minutes
+        logging.debug("Syncing Buckets, Keys & Secrets from Database")
+        try:
+            cry_initialize.sync_from_db()
+            cry_anti_entropy.run_if_due()
+        except Exception as e:
+            logging.error(f"Error syncing from database: {str(e)}")
+        # Change notifications keep this node current while the listener is connected
+        cry_initialize.wait_for_sync(SYNC_INTERVAL_LISTENING if cry_db_listener.is_connected() else SYNC_INTERVAL)
 
 
-if __name__ == '__main__':
-    # Initialize synchronization thread
-    sync_thread = threading.Thread(target=start_sync_thread)
-    sync_thread.start()
+def start_background_threads():
+    """Start the synchronization thread and the database change listener, once per process.
+
+    Runs at import, so the threads also start when a WSGI server such as waitress-serve loads `app`
+    rather than running this module as a script.
+    """
+    global _background_started
+    with _background_lock:
+        if _background_started:
+            return
+        _background_started = True
+
+    logging.info("Starting Database Synchronization Thread")
+    threading.Thread(target=start_sync_thread, name='cry-sync', daemon=True).start()
+
+    if DB_LISTENER_ENABLED:
+        logging.info("Starting Database Change Listener")
+        cry_db_listener.start()
 
+
+start_background_threads()
+
+
+if __name__ == '__main__':
     # Start the server
     # serve(
     #    app,
@@ -0,0 +1,159 @@
+"""
+cry_anti_entropy
+~~~~~~~~~~~~~~~~
+
+This module detects and repairs drift between the `secrets` table and the local secrets directory,
+such as a crash between the database write and the file write, or a file removed by hand.
+
+Both sides are summarised as the same hash tree: a leaf per live secret (a hash of its name and the
+sha256 of its ciphertext), a digest per bucket that is the XOR of its leaves, and a root per app that
+is the XOR of its bucket digests. XOR lets either side swap one leaf without re-reading the others:
+the database keeps its bucket digests current with a trigger, and `cry_local_digests` keeps the
+local ones current from the materializer's writes and removals. To catch files edited or removed
+behind its back, the local files are rescanned every ANTI_ENTROPY_RESCAN_INTERVAL seconds - by default on every
+run. A rescan stats each indexed file and re-hashes only those whose size or mtime changed.
+
+Reconciliation compares app roots, fetches bucket digests only for the apps whose roots differ, and
+compares leaves only for the buckets that differ. Only the differing secrets are re-read and
+rewritten or removed, so the work of a run grows with the drift rather than with the number of secrets.
+
+"""
+
+import logging
+import threading
+import time
+
+from globals import ANTI_ENTROPY_INTERVAL, ANTI_ENTROPY_RESCAN_INTERVAL, BUCKETS, LOG_LEVEL
+from modules import cry_database
+from modules import cry_index
+from modules import cry_initialize
+from modules import cry_local_digests
+from modules import cry_metrics
+from modules import cry_secrets_management
+
+logging.basicConfig(level=LOG_LEVEL)
+
+_run_lock = threading.Lock()
+_last_run_at = time.monotonic()
+_last_result = {}
+_duration = cry_metrics.Histogram()
+_totals = {'runs': 0, 'buckets_differing': 0, 'secrets_repaired': 0, 'errors': 0}
+
+
+_last_rescan_at = None
+
+
+def _app_roots(bucket_digests):
+    """Return {app_name: hex root digest}, the XOR of the hex bucket digests of each app."""
+    roots = {}
+    for (app_name, _), digest in bucket_digests.items():
+        roots[app_name] = roots.get(app_name, 0) ^ int(digest, 16)
+    return {app_name: f"{root:064x}" for app_name, root in roots.items()}
+
+
+def _repair_bucket(app_name, bucket_name):
+    """Compare the leaves of one bucket and refresh the secrets that differ.
+
+    Returns:
+        int: The number of secrets rewritten or removed.
+    """
+    remote = dict(cry_database.get_secret_digests(bucket_name, app_name))
+    local = cry_local_digests.secret_digests(app_name, bucket_name)
+
+    repaired = 0
+    for secret_name in sorted(name for name in remote.keys() | local.keys() if remote.get(name) != local.get(name)):
+        # Rewrites a stale or missing file, or removes a file whose secret is deleted or unknown
+        if cry_initialize.sync_secret_from_db(bucket_name, secret_name, app_name):
+            repaired += 1
+    for secret_name in cry_index.list_secrets(app_name, bucket_name):
+        if secret_name not in remote and secret_name not in local:
+            # Indexed, but with neither a file nor a live row
+            cry_secrets_management.notify_secret_changed(bucket_name, secret_name, app_name, deleted=True)
+            repaired += 1
+    # Also corrects local leaves that missed a change, e.g. a file first indexed after the last rescan
+    cry_local_digests.refresh_bucket(app_name, bucket_name)
+    if repaired:
+        logging.warning(f"Anti-entropy repaired {repaired} secrets in bucket '{bucket_name}' of app '{app_name}'")
+    return repaired
+
+
+def reconcile():
+    """Compare the database and local hash trees and repair the buckets that differ.
+
+    Returns:
+        dict: The apps and buckets compared, the ones that differed and the secrets repaired.
+    """
+    global _last_run_at, _last_result, _last_rescan_at
+    with _run_lock:
+        start = time.perf_counter()
+        if _last_rescan_at is None or time.monotonic() - _last_rescan_at >= ANTI_ENTROPY_RESCAN_INTERVAL:
+            cry_local_digests.rescan()
+            _last_rescan_at = time.monotonic()
+        local_buckets = cry_local_digests.bucket_digests()
+
+        remote_roots = dict(cry_database.get_app_digests())
+        local_roots = _app_roots(local_buckets)
+        differing_apps = {app for app in remote_roots.keys() | local_roots.keys()
+                          if remote_roots.get(app) != local_roots.get(app)}
+
+        remote_buckets = {(app_name, bucket_name): digest for app_name, bucket_name, _, digest
+                          in cry_database.get_bucket_digests(sorted(differing_apps))} if differing_apps else {}
+        compared_buckets = remote_buckets.keys() | {key for key in local_buckets if key[0] in differing_apps}
+        differing_buckets = sorted(key for key in compared_buckets if remote_buckets.get(key) != local_buckets.get(key))
+
+        secrets_repaired = 0
+        for app_name, bucket_name in differing_buckets:
+            if bucket_name not in BUCKETS.get(app_name, {}):
+                # The bucket's key has not been synced yet; the next sync pass brings it and its secrets
+                continue
+            secrets_repaired += _repair_bucket(app_name, bucket_name)
+
+        elapsed = time.perf_counter() - start
+        _duration.observe(elapsed)
+        _last_run_at = time.monotonic()
+        _totals['runs'] += 1
+        _totals['buckets_differing'] += len(differing_buckets)
+        _totals['secrets_repaired'] += secrets_repaired
+        _last_result = {
+            'apps_compared': len(remote_roots.keys() | local_roots.keys()),
+            'apps_differing': len(differing_apps),
+            'buckets_compared': len(compared_buckets),
+            'buckets_differing': len(differing_buckets),
+            'secrets_repaired': secrets_repaired,
+            'seconds': elapsed,
+        }
+        logging.info(f"Anti-entropy: {len(differing_apps)} apps and {len(differing_buckets)} buckets differed, "
+                     f"{secrets_repaired} secrets repaired in {elapsed:.2f} s")
+        return dict(_last_result)
+
+
+def run_if_due():
+    """Run `reconcile` if ANTI_ENTROPY_INTERVAL seconds passed since the last run."""
+    global _last_run_at
+    if time.monotonic() - _last_run_at < ANTI_ENTROPY_INTERVAL:
+        return None
+    try:
+        return reconcile()
+    except Exception as e:
+        # Wait a full interval before retrying
+        _last_run_at = time.monotonic()
+        _totals['errors'] += 1
+        logging.error(f"Error during anti-entropy reconciliation: {str(e)}")
+        return None
+
+
+def stats():
+    """Return the reconciliation totals, the last result and run durations.
+
+    Returns:
+        dict: Anti-entropy stats.
+    """
+    return {
+        'interval': ANTI_ENTROPY_INTERVAL,
+        **_totals,
+        'last_run': dict(_last_result),
+        'duration_seconds': _duration.snapshot(),
+    }
+
+
+cry_metrics.register('anti_entropy', stats)
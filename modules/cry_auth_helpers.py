@@ -18,7 +18,7 @@ from flask_httpauth import HTTPTokenAuth
 from keycloak import KeycloakConnectionError
 
 from globals import LOG_LEVEL, keycloak_openid, SECRET_KEY
-from modules.cry_secrets_management import get_bucket_config
+from modules.cry_ip_allowlist import get_allowlist
 
 logging.basicConfig(level=LOG_LEVEL)
 
@@ -85,7 +85,7 @@ def verify_sso_token(token):
 
 
 def ip_whitelist_required(f):
-    """Decorator to check if the incoming IP is whitelisted.
+    """Decorator to check if the incoming IP is whitelisted by an address or CIDR range in the bucket config.
 
      Args:
          f (function): The function to be decorated.
@@ -98,14 +98,13 @@ def ip_whitelist_required(f):
     def decorated_function(*args, **kwargs):
         # Retrieve the client IP from the X-Real-IP header
         incoming_ip = request.headers.get('X-Real-IP', request.remote_addr)
-        bucket_config = get_bucket_config(g.bucket_name, g.app_name)
-        allowed_ips = bucket_config.get("allowed_ips", [])
+        allowlist = get_allowlist(g.bucket_name, g.app_name)
 
-        # If "ANY" is in the allowed_ips list or the incoming IP is in the allowed_ips list, allow the request
-        if "ANY" in allowed_ips:
+        # Allow the request if "ANY" is in allowed_ips or the incoming IP matches an allowed address or network
+        if allowlist is not None and allowlist.allow_any:
             logging.info(f"IP address {incoming_ip} allowed due to 'ANY' in whitelist for bucket {g.bucket_name}.")
             return f(*args, **kwargs)
-        elif incoming_ip in allowed_ips:
+        elif allowlist is not None and incoming_ip in allowlist:
             return f(*args, **kwargs)
 
         logging.warning(f"Unauthorized IP address attempt: {incoming_ip} for bucket {g.bucket_name}.")
@@ -0,0 +1,140 @@
+"""
+cry_cache
+~~~~~~~~~
+
+This module provides a small, thread-safe in-memory cache with LRU eviction, an optional
+time-to-live for entries and an optional memory budget. It keeps hit, miss and eviction
+counters so callers can report how effective the cache is.
+
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """A thread-safe, size-bounded LRU cache with optional per-entry TTL and memory budget.
+
+    Args:
+        max_entries (int): Maximum number of entries held before the least recently used is evicted.
+        ttl (float, optional): Seconds an entry stays valid after insertion. None disables expiry.
+        max_bytes (int, optional): Maximum total size of the held values. None disables the budget.
+        sizeof (callable, optional): Returns the size in bytes of a value. Required with `max_bytes`.
+    """
+
+    def __init__(self, max_entries=1024, ttl=None, max_bytes=None, sizeof=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof or (lambda value: 0)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _remove(self, key):
+        """Remove an entry and release its bytes. Must be called with the lock held."""
+        _, _, size = self._entries.pop(key)
+        self.bytes -= size
+
+    def get(self, key, default=None):
+        """Return the cached value for `key`, or `default` if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at, _ = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Insert or replace `key`, evicting least recently used entries if the cache is full.
+
+        Returns:
+            bool: False if the value alone exceeds the memory budget and was not cached.
+        """
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        size = self._sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return False
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires_at, size)
+            self.bytes += size
+            while len(self._entries) > self.max_entries or \
+                    (self.max_bytes is not None and self.bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return True
+
+    def invalidate(self, key):
+        """Remove `key` from the cache.
+
+        Returns:
+            bool: True if an entry was removed.
+        """
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._remove(key)
+            self.invalidations += 1
+            return True
+
+    def invalidate_matching(self, predicate):
+        """Remove every entry whose key satisfies `predicate`.
+
+        Returns:
+            int: The number of entries removed.
+        """
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        """Remove every entry from the cache."""
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self):
+        """Return a snapshot of the cache counters.
+
+        Returns:
+            dict: Entry count, bytes held, limits and hit/miss/eviction counters.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
@@ -0,0 +1,192 @@
+"""
+cry_config_registry
+~~~~~~~~~~~~~~~~~~~
+
+This module provides a registry of bucket configurations keyed by (app_name, bucket_name).
+Every `config/<env>/<app>/**/<bucket>.json` file is parsed once into an immutable snapshot.
+Lookups read the current snapshot without touching disk; at most once per reload interval
+a lookup checks the files' modification times, re-parses only the files that changed and
+swaps a new snapshot in with a single assignment.
+
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+from globals import BUCKET_CONFIG_DIR, CONFIG_RELOAD_INTERVAL, LOG_LEVEL
+from modules import cry_metrics
+
+logging.basicConfig(level=LOG_LEVEL)
+
+
+class _Snapshot:
+    """An immutable view of the bucket configuration files.
+
+    Attributes:
+        configs (dict): (app_name, bucket_name) mapped to the parsed configuration, or None if the file is invalid.
+        files (dict): Config file path mapped to its (mtime_ns, size, parsed configuration).
+        version (int): Incremented on every reload that changed the snapshot.
+    """
+
+    __slots__ = ('configs', 'files', 'version')
+
+    def __init__(self, configs, files, version):
+        self.configs = configs
+        self.files = files
+        self.version = version
+
+
+_snapshot = _Snapshot({}, {}, 0)
+_reload_lock = threading.Lock()
+_last_checked = 0.0
+
+_reload_time = cry_metrics.Histogram()
+_counters_lock = threading.Lock()
+_counters = {'checks': 0, 'reloads': 0, 'files_parsed': 0, 'parse_errors': 0}
+
+
+def _count(name, delta=1):
+    with _counters_lock:
+        _counters[name] += delta
+
+
+def _scan_config_files(config_dir):
+    """Return every bucket config file below the app directories as {path: (app_name, bucket_name, mtime_ns, size)}.
+
+    Files at the top level of the environment directory (database and KDF configuration) are not bucket configs.
+    """
+    found = {}
+    if not os.path.isdir(config_dir):
+        return found
+    for app_entry in sorted(os.scandir(config_dir), key=lambda entry: entry.name):
+        if not app_entry.is_dir():
+            continue
+        for root, dirs, files in os.walk(app_entry.path):
+            dirs.sort()
+            for file_name in sorted(files):
+                if not file_name.endswith('.json'):
+                    continue
+                path = os.path.join(root, file_name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                found[path] = (app_entry.name, os.path.splitext(file_name)[0], stat.st_mtime_ns, stat.st_size)
+    return found
+
+
+def _parse_config_file(path):
+    """Parse one bucket config file, returning None if it cannot be read or parsed."""
+    _count('files_parsed')
+    try:
+        with open(path, 'r') as config_file:
+            return json.load(config_file)
+    except Exception as e:
+        _count('parse_errors')
+        logging.error(f"Error reading or parsing config file {path}: {str(e)}")
+        return None
+
+
+def _reload(config_dir):
+    """Rebuild the snapshot from changed files. Must be called with the reload lock held."""
+    global _snapshot, _last_checked
+    start = time.perf_counter()
+    _count('checks')
+    current = _snapshot
+    scanned = _scan_config_files(config_dir)
+    _last_checked = time.monotonic()
+
+    unchanged = scanned.keys() == current.files.keys() and all(
+        current.files[path][:2] == (mtime_ns, size) for path, (_, _, mtime_ns, size) in scanned.items())
+    if unchanged:
+        return False
+
+    files = {}
+    configs = {}
+    for path, (app_name, bucket_name, mtime_ns, size) in scanned.items():
+        previous = current.files.get(path)
+        if previous is not None and previous[:2] == (mtime_ns, size):
+            config = previous[2]
+        else:
+            config = _parse_config_file(path)
+        files[path] = (mtime_ns, size, config)
+        # The first file found for a bucket wins, as with a top-down directory walk
+        configs.setdefault((app_name, bucket_name), config)
+
+    _snapshot = _Snapshot(configs, files, current.version + 1)
+    elapsed = time.perf_counter() - start
+    _reload_time.observe(elapsed)
+    _count('reloads')
+    logging.info(f"Loaded {len(configs)} bucket configurations in {elapsed * 1000:.1f} ms")
+    return True
+
+
+def reload(config_dir=BUCKET_CONFIG_DIR):
+    """Re-read the bucket config files that were added or changed since the last snapshot.
+
+    Returns:
+        bool: True if a new snapshot was swapped in.
+    """
+    with _reload_lock:
+        return _reload(config_dir)
+
+
+def _maybe_reload():
+    """Reload the snapshot if the reload interval has passed. Only one caller checks at a time."""
+    if time.monotonic() - _last_checked < CONFIG_RELOAD_INTERVAL:
+        return
+    if not _reload_lock.acquire(blocking=False):
+        # Another request is already checking; serve the current snapshot
+        return
+    try:
+        if time.monotonic() - _last_checked >= CONFIG_RELOAD_INTERVAL:
+            _reload(BUCKET_CONFIG_DIR)
+    finally:
+        _reload_lock.release()
+
+
+def get_snapshot():
+    """Return the current configuration snapshot, reloading it first if it is due for a check."""
+    _maybe_reload()
+    return _snapshot
+
+
+def get_bucket_config(bucket_name, app_name):
+    """Return the configuration of a bucket.
+
+    The returned dictionary is shared by all callers and must not be modified.
+
+    Args:
+        bucket_name (str): The name of the bucket.
+        app_name (str): Application Name for the Bucket.
+
+    Returns:
+        dict: Configuration data for the bucket or None if not found.
+    """
+    return get_snapshot().configs.get((app_name, bucket_name))
+
+
+def stats():
+    """Return the registry size, reload counters and reload timings.
+
+    Returns:
+        dict: Registry stats.
+    """
+    with _counters_lock:
+        counters = dict(_counters)
+    snapshot = _snapshot
+    return {
+        'buckets': len(snapshot.configs),
+        'files': len(snapshot.files),
+        'version': snapshot.version,
+        'reload_interval': CONFIG_RELOAD_INTERVAL,
+        'seconds_since_check': time.monotonic() - _last_checked if _last_checked else None,
+        **counters,
+        'reload_time_seconds': _reload_time.snapshot(),
+    }
+
+
+cry_metrics.register('config_registry', stats)
@@ -3,23 +3,67 @@ cry_database
 ~~~~~~~~~~~~
 
 This module provides database operations for managing encryption keys and secrets.
-It uses a connection pool for efficient database connections and performs CRUD operations
-on the `bucket_keys` and `secrets` tables.
+It uses a thread-safe connection pool for efficient database connections and performs CRUD operations
+on the `bucket_keys` and `secrets` tables. Every operation checks a connection out with `get_connection`,
+which commits or rolls back and always returns the connection to the pool.
 
 """
 
 import json
 import logging
 import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
 import psycopg2
-from psycopg2 import pool
+from psycopg2 import extensions, pool
+from psycopg2.extras import execute_values
 from globals import CONFIG_FILE, SQL_FILE, LOG_LEVEL, SECRETS_DIR
+from modules import cry_metrics
 
 # Set up logging
 logging.basicConfig(level=LOG_LEVEL)
 
+# Pool defaults, overridable with POOL_MIN, POOL_MAX, POOL_TIMEOUT and POOL_HEALTHCHECK_IDLE in the config file
+DEFAULT_POOL_MIN = 2
+DEFAULT_POOL_MAX = 8
+DEFAULT_POOL_TIMEOUT = 10.0  # Seconds a caller waits for a free connection
+DEFAULT_POOL_HEALTHCHECK_IDLE = 30.0  # Connections idle longer than this are pinged on checkout
+
+# Rows fetched per round trip by server-side cursors
+STREAM_BATCH_SIZE = 1000
+
 # Create the DML connection pool at startup
 BACKUP_POOL = None
+POOL_SETTINGS = {}
+
+# Bounds checked-out connections so waiting callers block with a timeout instead of failing immediately
+_pool_slots = None
+
+# Monotonic time each pooled connection was last returned, keyed by id(connection)
+_last_used = {}
+
+_wait_time = cry_metrics.Histogram()
+_counters_lock = threading.Lock()
+_counters = {'checkouts': 0, 'in_use': 0, 'waiting': 0, 'timeouts': 0, 'health_checks': 0, 'replaced': 0,
+             'rollbacks': 0}
+
+
+class DatabasePoolError(Exception):
+    """Exception raised when no database connection can be obtained from the pool."""
+    pass
+
+
+class PoolTimeoutError(DatabasePoolError):
+    """Exception raised when no pooled connection becomes free within the checkout timeout."""
+    pass
+
+
+def _count(name, delta=1):
+    with _counters_lock:
+        _counters[name] += delta
 
 
 def load_config():
@@ -45,18 +89,25 @@ def load_sql_script():
 
 
 def create_dml_connection_pool():
-    """Create a connection pool for DML operations using the loaded configuration settings.
+    """Create a thread-safe connection pool for DML operations using the loaded configuration settings.
 
     The function initializes the global variable BACKUP_POOL with the connection pool.
     """
-    global BACKUP_POOL
+    global BACKUP_POOL, POOL_SETTINGS, _pool_slots
     if not BACKUP_POOL:
         logging.info("Creating Connection POOL")
         config = load_config()
         dml_info = os.environ.get('DMLINFO')
-        BACKUP_POOL = pool.SimpleConnectionPool(
-            minconn=2,
-            maxconn=8,
+        POOL_SETTINGS = {
+            'minconn': int(config.get("POOL_MIN", DEFAULT_POOL_MIN)),
+            'maxconn': int(config.get("POOL_MAX", DEFAULT_POOL_MAX)),
+            'timeout': float(config.get("POOL_TIMEOUT", DEFAULT_POOL_TIMEOUT)),
+            'healthcheck_idle': float(config.get("POOL_HEALTHCHECK_IDLE", DEFAULT_POOL_HEALTHCHECK_IDLE)),
+        }
+        _pool_slots = threading.BoundedSemaphore(POOL_SETTINGS['maxconn'])
+        BACKUP_POOL = pool.ThreadedConnectionPool(
+            minconn=POOL_SETTINGS['minconn'],
+            maxconn=POOL_SETTINGS['maxconn'],
             host=config["DB_HOST"],
             port=config["DB_PORT"],
             database=config["DB_NAME"],
@@ -65,6 +116,130 @@ def create_dml_connection_pool():
         )
 
 
+def _is_healthy(conn):
+    """Check a pooled connection before handing it out. Connections idle for long are pinged."""
+    if conn.closed or conn.get_transaction_status() == extensions.TRANSACTION_STATUS_UNKNOWN:
+        return False
+    idle_since = _last_used.get(id(conn))
+    if idle_since is not None and time.monotonic() - idle_since < POOL_SETTINGS['healthcheck_idle']:
+        return True
+    _count('health_checks')
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1;")
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def _checkout():
+    """Take a healthy connection from the pool, replacing a broken one once."""
+    conn = BACKUP_POOL.getconn()
+    if _is_healthy(conn):
+        return conn
+    logging.warning("Discarding broken pooled database connection.")
+    _count('replaced')
+    _last_used.pop(id(conn), None)
+    BACKUP_POOL.putconn(conn, close=True)
+    conn = BACKUP_POOL.getconn()
+    if not _is_healthy(conn):
+        _last_used.pop(id(conn), None)
+        BACKUP_POOL.putconn(conn, close=True)
+        raise DatabasePoolError("Unable to obtain a healthy database connection.")
+    return conn
+
+
+@contextmanager
+def get_connection(timeout=None):
+    """Check a connection out of the pool for the duration of a `with` block.
+
+    The transaction is committed when the block completes and rolled back if it raises.
+    The connection always goes back to the pool; a connection that broke is closed instead of reused.
+
+    Args:
+        timeout (float, optional): Seconds to wait for a free connection. Defaults to the POOL_TIMEOUT setting.
+
+    Yields:
+        connection: A psycopg2 connection.
+
+    Raises:
+        PoolTimeoutError: If no connection becomes free within the timeout.
+        DatabasePoolError: If no healthy connection can be obtained.
+    """
+    if BACKUP_POOL is None:
+        create_dml_connection_pool()
+    timeout = POOL_SETTINGS['timeout'] if timeout is None else timeout
+
+    wait_start = time.perf_counter()
+    _count('waiting')
+    acquired = _pool_slots.acquire(timeout=timeout)
+    _count('waiting', -1)
+    _wait_time.observe(time.perf_counter() - wait_start)
+    if not acquired:
+        _count('timeouts')
+        logging.warning(f"No database connection became free within {timeout} seconds.")
+        raise PoolTimeoutError("Database connection pool exhausted. Please retry later.")
+
+    conn = None
+    discard = False
+    try:
+        conn = _checkout()
+        _count('checkouts')
+        _count('in_use')
+        yield conn
+        conn.commit()
+    except Exception:
+        if conn is not None:
+            _count('rollbacks')
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                discard = True
+        raise
+    finally:
+        if conn is not None:
+            _count('in_use', -1)
+            discard = discard or bool(conn.closed)
+            if discard:
+                _last_used.pop(id(conn), None)
+            else:
+                _last_used[id(conn)] = time.monotonic()
+            BACKUP_POOL.putconn(conn, close=discard)
+        _pool_slots.release()
+
+
+def _stream_rows(query, params=None, batch_size=STREAM_BATCH_SIZE):
+    """Yield the rows of a query from a named server-side cursor, `batch_size` rows per round trip.
+
+    Only one batch is held in memory at a time. The connection stays checked out until the
+    generator is exhausted or closed.
+    """
+    with get_connection() as conn:
+        with conn.cursor(name=f"cry_stream_{uuid.uuid4().hex}") as cur:
+            cur.itersize = batch_size
+            cur.execute(query, params)
+            for row in cur:
+                yield row
+
+
+def pool_stats():
+    """Return the pool configuration, usage counters and checkout wait times.
+
+    Returns:
+        dict: Pool stats.
+    """
+    with _counters_lock:
+        counters = dict(_counters)
+    return {
+        **POOL_SETTINGS,
+        **counters,
+        'wait_time_seconds': _wait_time.snapshot(),
+    }
+
+
+cry_metrics.register('database_pool', pool_stats)
+
 create_dml_connection_pool()  # Initialize the pool at startup
 
 
@@ -81,15 +256,13 @@ def backup_keys(bucket, combined_key_salt, client_id, app_name):
         Exception: If any issue occurs during the backup process.
     """
     try:
-        with BACKUP_POOL.getconn() as conn, conn.cursor() as cur:
+        with get_connection() as conn, conn.cursor() as cur:
             query = ("INSERT INTO bucket_keys (app_name, bucket_name, encryption_key_salt, client_id) "
                      "VALUES (%s, %s, %s, %s);")
             cur.execute(query, (app_name, bucket, combined_key_salt, client_id))
-            conn.commit()
     except Exception as e:
         logging.error(f"Error backing up keys: {e}")
-        conn.rollback()  # Rollback will be effective as conn is still in context
-        raise  # Re-raise the exception after handling it.
+        raise  # Re-raise the exception after handling it; the transaction was rolled back by get_connection
 
 
 def create_table():
@@ -124,7 +297,7 @@ def sync_keys():
         Exception: If any issue occurs during the syncing process.
     """
     try:
-        with BACKUP_POOL.getconn() as conn, conn.cursor() as cur:
+        with get_connection() as conn, conn.cursor() as cur:
             query = "SELECT app_name, bucket_name, encryption_key_salt FROM bucket_keys;"
             cur.execute(query)
             keys = cur.fetchall()
@@ -152,7 +325,7 @@ def initialize_buckets_and_keys_from_db():
     """
     try:
         # Get a connection from the connection pool
-        with BACKUP_POOL.getconn() as connection:
+        with get_connection() as connection:
             # Use a cursor to execute the query and fetch results
             with connection.cursor() as cursor:
                 # Execute the SELECT query to fetch bucket names and keys
@@ -162,7 +335,7 @@ def initialize_buckets_and_keys_from_db():
                 # Fetch the combined list of bucket names and keys
                 bucket_keys_list = cursor.fetchall()
 
-        # Return the connection to the pool is automatically handled by the context manager
+        # Returning the connection to the pool is handled by get_connection
         return bucket_keys_list
 
     except Exception as e:
@@ -184,22 +357,23 @@ def save_secret(bucket_name, secret_name, encrypted_secret, app_name):
     """
     try:
         # Get a connection from the connection pool with DML permissions
-        with BACKUP_POOL.getconn() as conn:
+        with get_connection() as conn:
             # Use a cursor to perform database operations
             with conn.cursor() as cur:
                 # Prepare the query to insert or update the encrypted_secret into the secrets table
+                # A tombstoned secret is brought back to life with a fresh created_at
                 query = """
                     INSERT INTO secrets (app_name, bucket_name, secret_name, encrypted_secret) 
                     VALUES (%s, %s, %s, %s) 
                     ON CONFLICT (app_name, bucket_name, secret_name) 
-                    DO UPDATE SET encrypted_secret = EXCLUDED.encrypted_secret, updated_at = CURRENT_TIMESTAMP;
+                    DO UPDATE SET encrypted_secret = EXCLUDED.encrypted_secret, updated_at = CURRENT_TIMESTAMP,
+                        created_at = CASE WHEN secrets.deleted THEN CURRENT_TIMESTAMP ELSE secrets.created_at END,
+                        deleted = FALSE;
                 """
                 # Execute the query to insert or update the encrypted_secret
                 cur.execute(query, (app_name, bucket_name, secret_name, psycopg2.Binary(encrypted_secret)))
-                # Commit the changes to the database
-                conn.commit()
 
-        # The returning of the connection to the pool is automatically handled by the context manager
+        # get_connection commits the changes and returns the connection to the pool
 
     except Exception as e:
         logging.error(
@@ -220,15 +394,14 @@ def update_secret(bucket_name, secret_name, encrypted_secret, app_name):
         Exception: If an error occurs during database operations.
     """
     try:
-        with BACKUP_POOL.getconn() as conn:
+        with get_connection() as conn:
             with conn.cursor() as cur:
                 query = """
                     UPDATE secrets 
                     SET encrypted_secret = %s, updated_at = CURRENT_TIMESTAMP
-                    WHERE app_name = %s AND bucket_name = %s AND secret_name = %s;
+                    WHERE app_name = %s AND bucket_name = %s AND secret_name = %s AND NOT deleted;
                 """
                 cur.execute(query, (psycopg2.Binary(encrypted_secret), app_name, bucket_name, secret_name))
-                conn.commit()
 
     except Exception as e:
         logging.error(f"An error occurred while updating the secret for bucket "
@@ -239,6 +412,8 @@ def update_secret(bucket_name, secret_name, encrypted_secret, app_name):
 def delete_secret(bucket_name, secret_name, app_name):
     """Delete a secret from the database.
 
+    The row is kept as a tombstone, with its ciphertext cleared, so that other nodes' incremental sync sees the delete.
+
     Args:
         bucket_name (str): The name of the bucket.
         secret_name (str): The name of the secret.
@@ -248,14 +423,14 @@ def delete_secret(bucket_name, secret_name, app_name):
         Exception: If an error occurs during database operations.
     """
     try:
-        with BACKUP_POOL.getconn() as conn:
+        with get_connection() as conn:
             with conn.cursor() as cur:
                 query = """
-                    DELETE FROM secrets 
-                    WHERE app_name = %s AND bucket_name = %s AND secret_name = %s;
+                    UPDATE secrets 
+                    SET deleted = TRUE, encrypted_secret = ''::bytea, updated_at = CURRENT_TIMESTAMP
+                    WHERE app_name = %s AND bucket_name = %s AND secret_name = %s AND NOT deleted;
                 """
                 cur.execute(query, (app_name, bucket_name, secret_name))
-                conn.commit()
 
     except Exception as e:
         logging.error(f"An error occurred while deleting the secret for bucket "
@@ -263,36 +438,26 @@ def delete_secret(bucket_name, secret_name, app_name):
         raise e
 
 
-def get_all_secrets(batch_size=1000):
-    """Retrieve all secrets from the database in batches.
+def get_all_secrets(batch_size=STREAM_BATCH_SIZE):
+    """Stream all secrets from the database in batches.
 
     Args:
         batch_size (int): The number of records to fetch in each batch.
 
-    Returns:
-        list: List of all secrets.
+    Yields:
+        tuple: (app_name, bucket_name, secret_name, encrypted_secret) for each secret.
 
     Raises:
         Exception: If an error occurs during database operations.
     """
-    secrets = []
     try:
-        with BACKUP_POOL.getconn() as conn:
-            with conn.cursor() as cur:
-                query = "SELECT app_name, bucket_name, secret_name, encrypted_secret FROM secrets;"
-                cur.execute(query)
-
-                batch = cur.fetchmany(batch_size)
-                while batch:
-                    secrets.extend(batch)
-                    batch = cur.fetchmany(batch_size)
+        query = "SELECT app_name, bucket_name, secret_name, encrypted_secret FROM secrets WHERE NOT deleted;"
+        yield from _stream_rows(query, batch_size=batch_size)
 
     except Exception as e:
         logging.error(f"An error occurred while retrieving all secrets: {e}")
         raise e
 
-    return secrets
-
 
 def get_all_buckets():
     """Retrieve all bucket details from the database.
@@ -304,7 +469,7 @@ def get_all_buckets():
         Exception: If an error occurs during database operations.
     """
     try:
-        with BACKUP_POOL.getconn() as conn:
+        with get_connection() as conn:
             with conn.cursor() as cur:
                 query = "SELECT app_name, bucket_name, encryption_key_salt, client_id FROM bucket_keys;"
                 cur.execute(query)
@@ -315,3 +480,487 @@ def get_all_buckets():
         raise e
 
     return result
+
+
+def get_change_horizon():
+    """Retrieve the id of the oldest transaction still running.
+
+    Every change stamped with a lower `change_txid` is committed, so a sync that reads up to this
+    horizon never passes a change that commits later.
+
+    Returns:
+        int: The transaction id horizon.
+
+    Raises:
+        Exception: If an error occurs during database operations.
+    """
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT txid_snapshot_xmin(txid_current_snapshot());")
+                horizon = cur.fetchone()[0]
+
+    except Exception as e:
+        logging.error(f"An error occurred while retrieving the change horizon: {e}")
+        raise e
+
+    return horizon
+
+
+def _changed_between(query, after, before):
+    """Append the change_txid range of an incremental read to `query`; None for `after` reads every row."""
+    if after is None:
+        return query + ";", None
+    return query + " WHERE change_txid >= %s AND change_txid < %s ORDER BY change_txid;", (after, before)
+
+
+def get_secrets_changed_since(after=None, before=None, batch_size=STREAM_BATCH_SIZE):
+    """Stream secrets, including tombstones, changed by transactions between two horizons.
+
+    Args:
+        after (int, optional): Horizon of the previous sync; rows with a lower `change_txid` were already read.
+            None returns every row.
+        before (int, optional): Current horizon from `get_change_horizon`; later rows are left for the next sync.
+        batch_size (int): The number of records to fetch in each batch.
+
+    Yields:
+        tuple: (app_name, bucket_name, secret_name, encrypted_secret, deleted) for each secret.
+
+    Raises:
+        Exception: If an error occurs during database operations.
+    """
+    try:
+        query, params = _changed_between(
+            "SELECT app_name, bucket_name, secret_name, encrypted_secret, deleted FROM secrets", after, before)
+        yield from _stream_rows(query, params, batch_size)
+
+    except Exception as e:
+        logging.error(f"An error occurred while retrieving changed secrets: {e}")
+        raise e
+
+
+def get_bucket_keys_changed_since(after=None, before=None):
+    """Retrieve buckets created or changed by transactions between two horizons.
+
+    Args:
+        after (int, optional): Horizon of the previous sync; rows with a lower `change_txid` were already read.
+            None returns every row.
+        before (int, optional): Current horizon from `get_change_horizon`; later rows are left for the next sync.
+
+    Returns:
+        list: Tuples of (app_name, bucket_name, encryption_key_salt, client_id).
+
+    Raises:
+        Exception: If an error occurs during database operations.
+    """
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(*_changed_between(
+                    "SELECT app_name, bucket_name, encryption_key_salt, client_id FROM bucket_keys", after, before))
+                result = cur.fetchall()
+
+    except Exception as e:
+        logging.error(f"An error occurred while retrieving changed buckets: {e}")
+        raise e
+
+    return result
+
+
+def get_secret_row(bucket_name, secret_name, app_name):
+    """Retrieve the current row of one secret, including a tombstone.
+
+    Args:
+        bucket_name (str): The name of the bucket.
+        secret_name (str): The name of the secret.
+        app_name (str): Application Name
+
+    Returns:
+        tuple: (encrypted_secret, deleted), or None if the secret has no row.
+
+    Raises:
+        Exception: If an error occurs during database operations.
+    """
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                query = ("SELECT encrypted_secret, deleted FROM secrets "
+                         "WHERE app_name = %s AND bucket_name = %s AND secret_name = %s;")
+                cur.execute(query, (app_name, bucket_name, secret_name))
+                result = cur.fetchone()
+
+    except Exception as e:
+        logging.error(f"An error occurred while retrieving the secret for bucket "
+                      f"'{bucket_name}' and secret '{secret_name}': {e}")
+        raise e
+
+    return result
+
+
+def get_bucket_key_row(bucket_name, app_name):
+    """Retrieve the key and client ID of one bucket.
+
+    Args:
+        bucket_name (str): The name of the bucket.
+        app_name (str): Application Name
+
+    Returns:
+        tuple: (encryption_key_salt, client_id), or None if the bucket has no row.
+
+    Raises:
+        Exception: If an error occurs during database operations.
+    """
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                query = "SELECT encryption_key_salt, client_id FROM bucket_keys WHERE app_name = %s AND bucket_name = %s;"
+                cur.execute(query, (app_name, bucket_name))
+                result = cur.fetchone()
+
+    except Exception as e:
+        logging.error(f"An error occurred while retrieving bucket '{bucket_name}': {e}")
+        raise e
+
+    return result
+
+
+def _hex_digest(bits):
+    """Convert a BIT(256) value, as returned by psycopg2, to 64 hex digits."""
+    return f"{int(bits, 2):064x}"
+
+
+def get_app_digests():
+    """Retrieve the root digest of every app: the XOR of the digests of its buckets.
+
+    Bucket digests are kept current by the `secrets_track_bucket_digest` trigger, so this reads one row per
+    bucket rather than hashing any secret.
+
+    Returns:
+        list: Tuples of (app_name, hex digest) for apps with live secrets.
+
+    Raises:
+        Exception: If an error occurs during database operations.
+    """
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                query = """
+                    SELECT app_name, cry_bit_xor(digest)::TEXT
+                    FROM bucket_digests
+                    WHERE secret_count > 0
+                    GROUP BY app_name;
+                """
+                cur.execute(query)
+                result = [(app_name, _hex_digest(digest)) for app_name, digest in cur.fetchall()]
+
+    except Exception as e:
+        logging.error(f"An error occurred while retrieving app digests: {e}")
+        raise e
+
+    return result
+
+
+def get_bucket_digests(app_names):
+    """Retrieve the digest of the live secrets of every bucket of the given apps.
+
+    A bucket's digest is the XOR of its leaves, where a leaf is
+    sha256(hex(utf-8 secret name) + ':' + hex(sha256(encrypted_secret))) read as a 256-bit number.
+
+    Args:
+        app_names (list): Names of the apps whose buckets to return.
+
+    Returns:
+        list: Tuples of (app_name, bucket_name, secret_count, hex digest) for buckets with live secrets.
+
+    Raises:
+        Exception: If an error occurs during database operations.
+    """
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                query = """
+                    SELECT app_name, bucket_name, secret_count, digest::TEXT
+                    FROM bucket_digests
+                    WHERE app_name = ANY(%s) AND secret_count > 0;
+                """
+                cur.execute(query, (list(app_names),))
+                result = [(app_name, bucket_name, secret_count, _hex_digest(digest))
+                          for app_name, bucket_name, secret_count, digest in cur.fetchall()]
+
+    except Exception as e:
+        logging.error(f"An error occurred while retrieving bucket digests: {e}")
+        raise e
+
+    return result
+
+
+def get_secret_digests(bucket_name, app_name):
+    """Retrieve the ciphertext digest of every live secret in a bucket.
+
+    Args:
+        bucket_name (str): The name of the bucket.
+        app_name (str): Application Name
+
+    Returns:
+        list: Tuples of (secret_name, hex sha256 of encrypted_secret).
+
+    Raises:
+        Exception: If an error occurs during database operations.
+    """
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                query = """
+                    SELECT secret_name, encode(sha256(encrypted_secret), 'hex')
+                    FROM secrets
+                    WHERE app_name = %s AND bucket_name = %s AND NOT deleted;
+                """
+                cur.execute(query, (app_name, bucket_name))
+                result = cur.fetchall()
+
+    except Exception as e:
+        logging.error(f"An error occurred while retrieving secret digests for bucket '{bucket_name}': {e}")
+        raise e
+
+    return result
+
+
+def get_bucket_secrets(bucket_name, app_name, batch_size=STREAM_BATCH_SIZE):
+    """Stream every secret of one bucket, including tombstones, using the primary key index.
+
+    Args:
+        bucket_name (str): The name of the bucket.
+        app_name (str): Application Name
+        batch_size (int): The number of records to fetch in each batch.
+
+    Yields:
+        tuple: (secret_name, encrypted_secret, deleted) for each secret.
+
+    Raises:
+        Exception: If an error occurs during database operations.
+    """
+    try:
+        query = ("SELECT secret_name, encrypted_secret, deleted FROM secrets "
+                 "WHERE bucket_name = %s AND app_name = %s;")
+        yield from _stream_rows(query, (bucket_name, app_name), batch_size)
+
+    except Exception as e:
+        logging.error(f"An error occurred while retrieving the secrets of bucket '{bucket_name}': {e}")
+        raise e
+
+
+def get_bucket_changes(bucket_name, app_name, after=None, limit=500):
+    """Retrieve one page of the change feed of a bucket: secrets created, updated or deleted after a position.
+
+    Rows are ordered by (change_txid, secret_name). Rows written by a transaction at or after the oldest
+    one still running are held back, so a position once passed is never overtaken by a later commit.
+
+    Args:
+        bucket_name (str): The name of the bucket.
+        app_name (str): Application Name
+        after (tuple, optional): (change_txid, secret_name) of the last change already read. None starts at the beginning.
+        limit (int): The maximum number of rows to return.
+
+    Returns:
+        tuple: (rows, horizon), where rows are (change_txid, secret_name, deleted, updated_at) tuples and
+        horizon is the oldest running transaction id; every change below it is committed.
+
+    Raises:
+        Exception: If an error occurs during database operations.
+    """
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT txid_snapshot_xmin(txid_current_snapshot());")
+                horizon = cur.fetchone()[0]
+                query = ("SELECT change_txid, secret_name, deleted, updated_at FROM secrets "
+                         "WHERE app_name = %s AND bucket_name = %s AND change_txid < %s")
+                params = [app_name, bucket_name, horizon]
+                if after is not None:
+                    query += " AND (change_txid, secret_name) > (%s, %s)"
+                    params.extend(after)
+                cur.execute(query + " ORDER BY change_txid, secret_name LIMIT %s;", params + [limit])
+                rows = cur.fetchall()
+
+    except Exception as e:
+        logging.error(f"An error occurred while retrieving the changes of bucket '{bucket_name}': {e}")
+        raise e
+
+    return rows, horizon
+
+
+def set_secret_tags(bucket_name, secret_name, tags, app_name):
+    """Replace the tags of a live secret and touch its `updated_at`, in one transaction.
+
+    Args:
+        bucket_name (str): The name of the bucket.
+        secret_name (str): The name of the secret.
+        tags (dict): The new tags as {tag_key: tag_value}. An empty dict removes every tag.
+        app_name (str): Application Name
+
+    Returns:
+        bool: False if there is no live secret of that name, in which case nothing is changed.
+
+    Raises:
+        Exception: If an error occurs during database operations.
+    """
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("UPDATE secrets SET updated_at = CURRENT_TIMESTAMP "
+                            "WHERE app_name = %s AND bucket_name = %s AND secret_name = %s AND NOT deleted;",
+                            (app_name, bucket_name, secret_name))
+                if cur.rowcount == 0:
+                    return False
+                cur.execute("DELETE FROM secret_tags WHERE app_name = %s AND bucket_name = %s AND secret_name = %s;",
+                            (app_name, bucket_name, secret_name))
+                if tags:
+                    execute_values(cur, "INSERT INTO secret_tags (app_name, bucket_name, secret_name, tag_key, "
+                                        "tag_value) VALUES %s;",
+                                   [(app_name, bucket_name, secret_name, key, value) for key, value in tags.items()])
+
+    except Exception as e:
+        logging.error(f"An error occurred while setting the tags of secret '{secret_name}' "
+                      f"in bucket '{bucket_name}': {e}")
+        raise e
+    return True
+
+
+def get_secret_tags(secrets):
+    """Retrieve the tags of the given secrets with one query.
+
+    Args:
+        secrets (list): (app_name, bucket_name, secret_name) tuples.
+
+    Returns:
+        list: Tuples of (app_name, bucket_name, secret_name, tag_key, tag_value). Untagged secrets have no rows.
+
+    Raises:
+        Exception: If an error occurs during database operations.
+    """
+    if not secrets:
+        return []
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                query = """
+                    SELECT t.app_name, t.bucket_name, t.secret_name, t.tag_key, t.tag_value
+                    FROM secret_tags AS t
+                    JOIN (VALUES %s) AS v (app_name, bucket_name, secret_name)
+                        ON t.app_name = v.app_name AND t.bucket_name = v.bucket_name AND t.secret_name = v.secret_name;
+                """
+                result = execute_values(cur, query, list(secrets), page_size=len(secrets), fetch=True)
+
+    except Exception as e:
+        logging.error(f"An error occurred while retrieving the tags of {len(secrets)} secrets: {e}")
+        raise e
+
+    return result
+
+
+def get_bucket_tags(bucket_name, app_name):
+    """Retrieve the tags of every secret of one bucket.
+
+    Returns:
+        list: Tuples of (secret_name, tag_key, tag_value).
+
+    Raises:
+        Exception: If an error occurs during database operations.
+    """
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT secret_name, tag_key, tag_value FROM secret_tags "
+                            "WHERE bucket_name = %s AND app_name = %s;", (bucket_name, app_name))
+                result = cur.fetchall()
+
+    except Exception as e:
+        logging.error(f"An error occurred while retrieving the tags of bucket '{bucket_name}': {e}")
+        raise e
+
+    return result
+
+
+def get_all_secret_tags(batch_size=STREAM_BATCH_SIZE):
+    """Stream the tags of every secret.
+
+    Yields:
+        tuple: (app_name, bucket_name, secret_name, tag_key, tag_value) for each tag.
+
+    Raises:
+        Exception: If an error occurs during database operations.
+    """
+    try:
+        query = "SELECT app_name, bucket_name, secret_name, tag_key, tag_value FROM secret_tags;"
+        yield from _stream_rows(query, batch_size=batch_size)
+
+    except Exception as e:
+        logging.error(f"An error occurred while retrieving all secret tags: {e}")
+        raise e
+
+
+# Multi-row statements for write_secrets_batch, keyed by operation
+_BATCH_WRITE_QUERIES = {
+    'save': """
+        INSERT INTO secrets (app_name, bucket_name, secret_name, encrypted_secret)
+        VALUES %s
+        ON CONFLICT (app_name, bucket_name, secret_name)
+        DO UPDATE SET encrypted_secret = EXCLUDED.encrypted_secret, updated_at = CURRENT_TIMESTAMP,
+            created_at = CASE WHEN secrets.deleted THEN CURRENT_TIMESTAMP ELSE secrets.created_at END,
+            deleted = FALSE;
+    """,
+    'update': """
+        UPDATE secrets AS s
+        SET encrypted_secret = v.encrypted_secret, updated_at = CURRENT_TIMESTAMP
+        FROM (VALUES %s) AS v (app_name, bucket_name, secret_name, encrypted_secret)
+        WHERE s.app_name = v.app_name AND s.bucket_name = v.bucket_name AND s.secret_name = v.secret_name
+            AND NOT s.deleted;
+    """,
+    'delete': """
+        UPDATE secrets AS s
+        SET deleted = TRUE, encrypted_secret = ''::bytea, updated_at = CURRENT_TIMESTAMP
+        FROM (VALUES %s) AS v (app_name, bucket_name, secret_name)
+        WHERE s.app_name = v.app_name AND s.bucket_name = v.bucket_name AND s.secret_name = v.secret_name
+            AND NOT s.deleted;
+    """,
+}
+
+
+def _group_writes(writes):
+    """Split writes into runs of one operation that each touch a secret at most once, keeping their order."""
+    runs = []
+    for operation, app_name, bucket_name, secret_name, encrypted_secret in writes:
+        key = (app_name, bucket_name, secret_name)
+        if not runs or runs[-1][0] != operation or key in runs[-1][2]:
+            runs.append((operation, [], set()))
+        row = (app_name, bucket_name, secret_name)
+        if operation != 'delete':
+            row += (psycopg2.Binary(encrypted_secret),)
+        runs[-1][1].append(row)
+        runs[-1][2].add(key)
+    return [(operation, rows) for operation, rows, _ in runs]
+
+
+def write_secrets_batch(writes):
+    """Apply a batch of secret writes in a single transaction.
+
+    Consecutive writes with the same operation become one multi-row statement. A secret written
+    twice starts a new statement, so the later write wins as it would have sequentially.
+
+    Args:
+        writes (list): Tuples of (operation, app_name, bucket_name, secret_name, encrypted_secret), where
+            operation is 'save', 'update' or 'delete' with the semantics of save_secret, update_secret
+            and delete_secret. encrypted_secret is ignored for 'delete'.
+
+    Raises:
+        Exception: If an error occurs during database operations. No write of the batch is applied.
+    """
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                for operation, rows in _group_writes(writes):
+                    execute_values(cur, _BATCH_WRITE_QUERIES[operation], rows, page_size=len(rows))
+
+    except Exception as e:
+        logging.error(f"An error occurred while writing a batch of {len(writes)} secrets: {e}")
+        raise e
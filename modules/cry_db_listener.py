@@ -0,0 +1,169 @@
+"""
+cry_db_listener
+~~~~~~~~~~~~~~~
+
+This module listens for change notifications from the database on a dedicated connection.
+Triggers on `bucket_keys` and `secrets` announce every write on the DB_NOTIFY_CHANNEL channel with
+the names of the affected app, bucket and secret. The listener thread refreshes just those entries:
+bucket credentials, key ring and key file for buckets; file, index and cache for secrets.
+
+While the listener is connected the periodic sync only runs every SYNC_INTERVAL_LISTENING seconds
+as a safety net. When the connection drops, the periodic sync is woken and falls back to its normal
+interval until the listener reconnects with backoff; after reconnecting, a catch-up sync covers the
+notifications missed in between.
+
+"""
+
+import json
+import logging
+import os
+import select
+import threading
+
+import psycopg2
+from psycopg2 import extensions
+
+from globals import DB_NOTIFY_CHANNEL, LOG_LEVEL
+from modules import cry_database
+from modules import cry_initialize
+from modules import cry_metrics
+
+logging.basicConfig(level=LOG_LEVEL)
+
+# Seconds between reconnection attempts, doubled after each failure
+RECONNECT_BACKOFF_MIN = 1.0
+RECONNECT_BACKOFF_MAX = 60.0
+
+# Seconds between checks of an idle connection
+POLL_TIMEOUT = 5.0
+
+_connected = threading.Event()
+_stop = threading.Event()
+_listener_thread = None
+
+_counters_lock = threading.Lock()
+_counters = {'notifications': 0, 'applied': 0, 'errors': 0, 'reconnects': 0}
+
+
+def _count(name, delta=1):
+    with _counters_lock:
+        _counters[name] += delta
+
+
+def is_connected():
+    """Return whether the listener currently receives change notifications."""
+    return _connected.is_set()
+
+
+def _connect():
+    """Open the dedicated, autocommit listening connection."""
+    config = cry_database.load_config()
+    conn = psycopg2.connect(
+        host=config["DB_HOST"],
+        port=config["DB_PORT"],
+        database=config["DB_NAME"],
+        user=config["DML_USER"],
+        password=os.environ.get('DMLINFO')
+    )
+    conn.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+    with conn.cursor() as cur:
+        cur.execute(f"LISTEN {DB_NOTIFY_CHANNEL};")
+    return conn
+
+
+def handle_notification(payload):
+    """Refresh the bucket or secret named in a change notification.
+
+    Args:
+        payload (str): The JSON payload emitted by the `cry_notify_change` trigger.
+    """
+    _count('notifications')
+    try:
+        event = json.loads(payload)
+        table = event.get('table')
+        app_name = event.get('app_name')
+        bucket_name = event.get('bucket_name')
+        if table == 'secrets':
+            if cry_initialize.sync_secret_from_db(bucket_name, event.get('secret_name'), app_name):
+                _count('applied')
+        elif table == 'bucket_keys':
+            cry_initialize.sync_bucket_from_db(bucket_name, app_name)
+            _count('applied')
+        else:
+            logging.warning(f"Ignoring change notification for unknown table: {table}")
+    except Exception as e:
+        _count('errors')
+        logging.error(f"Error applying change notification {payload}: {str(e)}")
+
+
+def _listen(conn):
+    """Dispatch notifications until the connection fails or the listener is stopped."""
+    while not _stop.is_set():
+        if select.select([conn], [], [], POLL_TIMEOUT) == ([], [], []):
+            # Idle - a round trip detects a connection that died silently
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+        conn.poll()
+        while conn.notifies:
+            handle_notification(conn.notifies.pop(0).payload)
+
+
+def _run():
+    backoff = RECONNECT_BACKOFF_MIN
+    while not _stop.is_set():
+        conn = None
+        try:
+            conn = _connect()
+            _connected.set()
+            backoff = RECONNECT_BACKOFF_MIN
+            logging.info(f"Listening for database changes on channel '{DB_NOTIFY_CHANNEL}'")
+            # Catch up on changes made while no notifications were received
+            cry_initialize.request_sync()
+            _listen(conn)
+        except Exception as e:
+            _count('errors')
+            logging.warning(f"Database change listener disconnected: {str(e)}. Retrying in {backoff:.0f} seconds.")
+        finally:
+            if _connected.is_set():
+                _connected.clear()
+                # Fall back to periodic sync straight away
+                cry_initialize.request_sync()
+            if conn is not None and not conn.closed:
+                conn.close()
+        if _stop.wait(backoff):
+            break
+        backoff = min(backoff * 2, RECONNECT_BACKOFF_MAX)
+        _count('reconnects')
+
+
+def start():
+    """Start the listener thread."""
+    global _listener_thread
+    if _listener_thread is not None and _listener_thread.is_alive():
+        return
+    _stop.clear()
+    _listener_thread = threading.Thread(target=_run, name='cry-db-listener', daemon=True)
+    _listener_thread.start()
+
+
+def stop():
+    """Stop the listener thread after its current wait."""
+    _stop.set()
+
+
+def stats():
+    """Return the listener state and notification counters.
+
+    Returns:
+        dict: Listener stats.
+    """
+    with _counters_lock:
+        counters = dict(_counters)
+    return {
+        'channel': DB_NOTIFY_CHANNEL,
+        'connected': is_connected(),
+        **counters,
+    }
+
+
+cry_metrics.register('db_listener', stats)
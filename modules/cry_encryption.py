@@ -7,17 +7,82 @@ the Fernet symmetric encryption and PBKDF2HMAC key derivation. It includes
 functions to generate encryption keys, encrypt and decrypt strings, and handle
 custom encryption-related exceptions.
 
+Keys derived from a bucket salt are kept in a bounded LRU/TTL cache together with
+ready-built cipher instances, so repeated operations on the same bucket only pay
+for the PBKDF2 derivation once.
+
+Secrets are written in a versioned AEAD envelope (header byte + KDF parameters + nonce
++ ciphertext) using AES-256-GCM, or ChaCha20-Poly1305 on hosts without AES acceleration.
+The KDF parameters come from `config/<env>/kdf_config.json` and travel with every
+envelope, so decryption always re-derives with the parameters actually used. Legacy
+Fernet tokens are still decrypted transparently.
+
 """
 
 import base64
+import json
+import logging
 import os
+import struct
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
 from cryptography.fernet import Fernet, InvalidToken
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+
+from globals import (DERIVED_KEY_CACHE_SIZE, DERIVED_KEY_CACHE_TTL, AEAD_CIPHER, CRYPTO_BATCH_WORKERS,
+                     CRYPTO_BATCH_MAX_SALTS, KDF_CONFIG_FILE, KDF_ENVELOPE_MAX_COST_FACTOR, LOG_LEVEL, SCRYPT_MAX_MEMORY)
+from modules import cry_kdf_executor
+from modules import cry_metrics
+from modules.cry_cache import LRUCache
+from modules.cry_kdf_executor import KdfExecutorError
+
+logging.basicConfig(level=LOG_LEVEL)
 
 SALT_LENGTH = 16  # 128 bits
 
+# Envelope header bytes - never collide with a Fernet token, which starts with 'g' (0x67)
+ENVELOPE_AES_GCM = 0x01
+ENVELOPE_CHACHA20_POLY1305 = 0x02
+ENVELOPE_KDF_FLAG = 0x10  # Set when the KDF parameters follow the header byte
+NONCE_LENGTH = 12  # 96 bits, as recommended for both AEAD ciphers
+
+# KDF identifiers inside the envelope
+KDF_PBKDF2 = 0x01
+KDF_SCRYPT = 0x02
+
+# Parameters of every key derived before they became configurable
+DEFAULT_KDF_PARAMS = ('pbkdf2', 100000)
+
+# Structural bounds on KDF parameters. Envelopes supplied by callers of decrypt_text(s) are further held to
+# KDF_ENVELOPE_MAX_COST_FACTOR times the configured cost by _check_envelope_cost; stored secrets are not, so
+# lowering the configured cost never locks out secrets written under a higher one.
+MAX_PBKDF2_ITERATIONS = 10000000
+MAX_SCRYPT_LOG2_N = 20
+MAX_SCRYPT_R = 32
+MAX_SCRYPT_P = 16
+
+# scrypt cost assumed for envelopes while PBKDF2 is configured, e.g. written before a switch back from scrypt
+BASELINE_SCRYPT_PARAMS = ('scrypt', 2 ** 15, 8, 1)
+
+# Ciphers built from one derived key
+_DerivedCiphers = namedtuple('_DerivedCiphers', ['derived_key', 'fernet', 'aes_gcm', 'chacha20'])
+
+# Cache of derived keys and their ciphers keyed by (salt, KDF parameters)
+_derived_key_cache = LRUCache(max_entries=DERIVED_KEY_CACHE_SIZE, ttl=DERIVED_KEY_CACHE_TTL)
+
+# Batches smaller than this are processed on the calling thread
+BATCH_PARALLEL_THRESHOLD = 64
+
+# Thread pool for batch operations - the cryptography primitives release the GIL
+_batch_executor = None
+_batch_executor_lock = threading.Lock()
+
 
 class EncryptionError(Exception):
     """Custom exception raised for encryption-related errors."""
@@ -29,6 +94,156 @@ class DecryptionError(Exception):
     pass
 
 
+def _has_aes_acceleration():
+    """Reports whether the CPU advertises AES instructions (AES-NI on x86, the AES extension on ARM)."""
+    try:
+        with open('/proc/cpuinfo') as cpuinfo:
+            for line in cpuinfo:
+                if line.startswith(('flags', 'Features')):
+                    return 'aes' in line.split()
+    except OSError:
+        pass
+    return True  # Unknown platform - OpenSSL's AES-GCM is the safer default
+
+
+def _select_envelope_cipher():
+    """Picks the AEAD used for new envelopes from the CRY_AEAD_CIPHER setting."""
+    if AEAD_CIPHER == 'aes-gcm':
+        return ENVELOPE_AES_GCM
+    if AEAD_CIPHER == 'chacha20':
+        return ENVELOPE_CHACHA20_POLY1305
+    return ENVELOPE_AES_GCM if _has_aes_acceleration() else ENVELOPE_CHACHA20_POLY1305
+
+
+def kdf_params_from_config(config):
+    """Builds KDF parameters from a `kdf_config.json` dictionary.
+
+    Args:
+        config (dict): {"algorithm": "pbkdf2", "iterations": N} or {"algorithm": "scrypt", "n": N, "r": R, "p": P}.
+
+    Returns:
+        tuple: ('pbkdf2', iterations) or ('scrypt', n, r, p).
+
+    Raises:
+        ValueError: If the configuration is incomplete or out of bounds.
+    """
+    algorithm = config.get('algorithm', 'pbkdf2').lower()
+    if algorithm == 'pbkdf2':
+        params = ('pbkdf2', int(config['iterations']))
+    elif algorithm == 'scrypt':
+        params = ('scrypt', int(config['n']), int(config.get('r', 8)), int(config.get('p', 1)))
+    else:
+        raise ValueError(f"Unsupported KDF algorithm '{algorithm}'.")
+    _encode_kdf_params(params)  # Validates the bounds
+    _check_scrypt_memory(params)
+    return params
+
+
+def kdf_params_to_config(kdf_params):
+    """Converts KDF parameters back into their `kdf_config.json` form."""
+    if kdf_params[0] == 'pbkdf2':
+        return {'algorithm': 'pbkdf2', 'iterations': kdf_params[1]}
+    return {'algorithm': 'scrypt', 'n': kdf_params[1], 'r': kdf_params[2], 'p': kdf_params[3]}
+
+
+def load_kdf_config():
+    """Loads the KDF parameters for new envelopes from KDF_CONFIG_FILE.
+
+    Returns:
+        tuple: The configured KDF parameters, or DEFAULT_KDF_PARAMS if the file is missing or invalid.
+    """
+    if not os.path.exists(KDF_CONFIG_FILE):
+        return DEFAULT_KDF_PARAMS
+    try:
+        with open(KDF_CONFIG_FILE) as config_file:
+            logging.info("Loading KDF Configuration File")
+            return kdf_params_from_config(json.load(config_file))
+    except Exception as e:
+        logging.error(f"Invalid KDF configuration in {KDF_CONFIG_FILE}, using defaults: {str(e)}")
+        return DEFAULT_KDF_PARAMS
+
+
+def _encode_kdf_params(kdf_params):
+    """Serializes KDF parameters for the envelope header."""
+    if kdf_params[0] == 'pbkdf2':
+        iterations = kdf_params[1]
+        if not 1 <= iterations <= MAX_PBKDF2_ITERATIONS:
+            raise ValueError(f"PBKDF2 iterations must be between 1 and {MAX_PBKDF2_ITERATIONS}.")
+        return struct.pack('>BI', KDF_PBKDF2, iterations)
+    if kdf_params[0] == 'scrypt':
+        _, n, r, p = kdf_params
+        log2_n = n.bit_length() - 1
+        if n < 2 or n != 1 << log2_n or log2_n > MAX_SCRYPT_LOG2_N:
+            raise ValueError(f"scrypt n must be a power of two no larger than 2^{MAX_SCRYPT_LOG2_N}.")
+        if not (1 <= r <= MAX_SCRYPT_R and 1 <= p <= MAX_SCRYPT_P):
+            raise ValueError("scrypt r or p is out of bounds.")
+        return struct.pack('>BBBB', KDF_SCRYPT, log2_n, r, p)
+    raise ValueError(f"Unsupported KDF algorithm '{kdf_params[0]}'.")
+
+
+def scrypt_memory(n, r):
+    """Returns the bytes of memory one scrypt derivation with cost `n` and block size `r` needs."""
+    return 128 * r * n
+
+
+def _check_scrypt_memory(kdf_params):
+    """Rejects scrypt parameters needing more than SCRYPT_MAX_MEMORY bytes per derivation."""
+    if kdf_params[0] == 'scrypt' and scrypt_memory(kdf_params[1], kdf_params[2]) > SCRYPT_MAX_MEMORY:
+        raise ValueError(f"scrypt n and r need more than {SCRYPT_MAX_MEMORY} bytes of memory.")
+
+
+def _kdf_cost(kdf_params):
+    """Returns the work of one derivation in algorithm-specific units: iterations, or n * r * p for scrypt."""
+    if kdf_params[0] == 'pbkdf2':
+        return kdf_params[1]
+    _, n, r, p = kdf_params
+    return n * r * p
+
+
+def _check_envelope_cost(kdf_params):
+    """Rejects caller-supplied envelope KDF parameters costing more than KDF_ENVELOPE_MAX_COST_FACTOR times
+    the accepted baseline, or scrypt parameters over SCRYPT_MAX_MEMORY.
+
+    The baseline is the configured parameters of the same algorithm, never below the defaults every earlier
+    key was derived with.
+    """
+    _check_scrypt_memory(kdf_params)
+    if kdf_params[0] == 'pbkdf2':
+        baselines = [DEFAULT_KDF_PARAMS]
+    else:
+        baselines = [BASELINE_SCRYPT_PARAMS]
+    if KDF_PARAMS[0] == kdf_params[0]:
+        baselines.append(KDF_PARAMS)
+    limit = KDF_ENVELOPE_MAX_COST_FACTOR * max(_kdf_cost(baseline) for baseline in baselines)
+    if _kdf_cost(kdf_params) > limit:
+        raise ValueError("Envelope KDF parameters exceed the allowed cost.")
+
+
+def _decode_kdf_params(data, offset):
+    """Reads KDF parameters from an envelope header.
+
+    Returns:
+        tuple: The KDF parameters and the offset just past them.
+    """
+    kdf_id = data[offset]
+    if kdf_id == KDF_PBKDF2:
+        _, iterations = struct.unpack_from('>BI', data, offset)
+        kdf_params, offset = ('pbkdf2', iterations), offset + 5
+    elif kdf_id == KDF_SCRYPT:
+        _, log2_n, r, p = struct.unpack_from('>BBBB', data, offset)
+        kdf_params, offset = ('scrypt', 1 << log2_n, r, p), offset + 4
+    else:
+        raise ValueError(f"Unknown KDF identifier {kdf_id} in envelope.")
+    _encode_kdf_params(kdf_params)  # Validates the bounds
+    return kdf_params, offset
+
+
+ENVELOPE_CIPHER = _select_envelope_cipher()
+KDF_PARAMS = load_kdf_config()
+
+cry_metrics.register('derived_key_cache', lambda: _derived_key_cache.stats())
+
+
 def generate_key():
     """Generates a new Fernet symmetric encryption key.
 
@@ -38,11 +253,12 @@ def generate_key():
     return Fernet.generate_key()
 
 
-def generate_key_basic(salt):
-    """Generates a key using PBKDF2HMAC key derivation.
+def generate_key_basic(salt, kdf_params=DEFAULT_KDF_PARAMS):
+    """Generates a key using PBKDF2HMAC (or scrypt) key derivation.
 
     Args:
         salt (bytes): Salt to use in key derivation.
+        kdf_params (tuple): ('pbkdf2', iterations) or ('scrypt', n, r, p).
 
     Returns:
         bytes: A derived key.
@@ -51,33 +267,126 @@ def generate_key_basic(salt):
     if not passphrase:
         raise EncryptionError("Passphrase not found.")
 
-    kdf = PBKDF2HMAC(
-        algorithm=hashes.SHA256(),
-        length=32,
-        salt=salt,
-        iterations=100000,
-        backend=default_backend()
-    )
+    if kdf_params[0] == 'scrypt':
+        _, n, r, p = kdf_params
+        kdf = Scrypt(salt=salt, length=32, n=n, r=r, p=p, backend=default_backend())
+    else:
+        kdf = PBKDF2HMAC(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=salt,
+            iterations=kdf_params[1],
+            backend=default_backend()
+        )
     return base64.urlsafe_b64encode(kdf.derive(passphrase.encode()))
 
 
+def _build_ciphers(derived_key):
+    """Builds every supported cipher from one derived key."""
+    raw_key = base64.urlsafe_b64decode(derived_key)
+    return _DerivedCiphers(derived_key, Fernet(derived_key), AESGCM(raw_key), ChaCha20Poly1305(raw_key))
+
+
+def _get_ciphers(salt, kdf_params=DEFAULT_KDF_PARAMS):
+    """Returns the ciphers for the salt and KDF parameters, deriving the key only on a cache miss."""
+    cache_key = (bytes(salt), kdf_params)
+    ciphers = _derived_key_cache.get(cache_key)
+    if ciphers is None:
+        ciphers = _build_ciphers(generate_key_basic(cache_key[0], kdf_params))
+        _derived_key_cache.put(cache_key, ciphers)
+    return ciphers
+
+
+def get_fernet(salt):
+    """Returns a Fernet instance for the salt, deriving the key only on a cache miss.
+
+    Args:
+        salt (bytes): Salt to use in key derivation.
+
+    Returns:
+        Fernet: A Fernet instance built from the derived key.
+    """
+    return _get_ciphers(salt).fernet
+
+
+def invalidate_derived_key(salt):
+    """Drops the cached derived keys for a salt, e.g. when a bucket's key file changes.
+
+    Args:
+        salt (bytes): Salt whose derived keys should be discarded.
+
+    Returns:
+        bool: True if a cached key was removed.
+    """
+    salt = bytes(salt)
+    return _derived_key_cache.invalidate_matching(lambda cache_key: cache_key[0] == salt) > 0
+
+
+def clear_derived_key_cache():
+    """Drops every cached derived key."""
+    _derived_key_cache.clear()
+
+
+def derived_key_cache_stats():
+    """Returns the derived key cache counters.
+
+    Returns:
+        dict: Entry count, limits and hit/miss/eviction counters.
+    """
+    return _derived_key_cache.stats()
+
+
+def _seal(ciphers, kdf_params, plaintext):
+    """Encrypts a plaintext into an envelope. The header and KDF parameters are authenticated as associated data."""
+    header = bytes((ENVELOPE_CIPHER | ENVELOPE_KDF_FLAG,)) + _encode_kdf_params(kdf_params)
+    aead = ciphers.aes_gcm if ENVELOPE_CIPHER == ENVELOPE_AES_GCM else ciphers.chacha20
+    nonce = os.urandom(NONCE_LENGTH)
+    return header + nonce + aead.encrypt(nonce, plaintext.encode(), header)
+
+
+def _parse_envelope(encrypted_text):
+    """Splits an envelope into its parts.
+
+    Returns:
+        tuple: (cipher, kdf_params, associated_data, nonce_and_ciphertext), or None for a legacy Fernet token.
+    """
+    header = encrypted_text[0] if encrypted_text else None
+    if header in (ENVELOPE_AES_GCM, ENVELOPE_CHACHA20_POLY1305):
+        return header, DEFAULT_KDF_PARAMS, None, encrypted_text[1:]
+    if header in (ENVELOPE_AES_GCM | ENVELOPE_KDF_FLAG, ENVELOPE_CHACHA20_POLY1305 | ENVELOPE_KDF_FLAG):
+        kdf_params, offset = _decode_kdf_params(encrypted_text, 1)
+        return header & ~ENVELOPE_KDF_FLAG, kdf_params, encrypted_text[:offset], encrypted_text[offset:]
+    return None
+
+
+def _open(ciphers, envelope):
+    """Decrypts a parsed envelope."""
+    cipher, _, associated_data, body = envelope
+    aead = ciphers.aes_gcm if cipher == ENVELOPE_AES_GCM else ciphers.chacha20
+    return aead.decrypt(body[:NONCE_LENGTH], body[NONCE_LENGTH:], associated_data).decode()
+
+
+def kdf_params_of(encrypted_text):
+    """Returns the KDF parameters an envelope or Fernet token was encrypted with."""
+    envelope = _parse_envelope(bytes(encrypted_text))
+    return DEFAULT_KDF_PARAMS if envelope is None else envelope[1]
+
+
 def encrypt_string(plaintext, salt):
-    """Encrypts a plaintext string.
+    """Encrypts a plaintext string into an AEAD envelope.
 
     Args:
         plaintext (str): The plaintext string to encrypt.
         salt (bytes): Salt for the key derivation.
 
     Returns:
-        bytes: The encrypted ciphertext.
+        bytes: The envelope - header byte, KDF parameters, nonce and ciphertext with its authentication tag.
     """
-    derived_key = generate_key_basic(salt)
-    fernet = Fernet(derived_key)
-    return fernet.encrypt(plaintext.encode())
+    return _seal(_get_ciphers(salt, KDF_PARAMS), KDF_PARAMS, plaintext)
 
 
 def decrypt_string(encrypted_text, salt):
-    """Decrypts an encrypted string.
+    """Decrypts an encrypted string, accepting both AEAD envelopes and legacy Fernet tokens.
 
     Args:
         encrypted_text (bytes): The encrypted text to decrypt.
@@ -86,9 +395,100 @@ def decrypt_string(encrypted_text, salt):
     Returns:
         str: The decrypted plaintext string.
     """
-    derived_key = generate_key_basic(salt)
-    fernet = Fernet(derived_key)
-    return fernet.decrypt(encrypted_text).decode()
+    encrypted_text = bytes(encrypted_text)
+    envelope = _parse_envelope(encrypted_text)
+    if envelope is None:
+        return _get_ciphers(salt).fernet.decrypt(encrypted_text).decode()
+    return _open(_get_ciphers(salt, envelope[1]), envelope)
+
+
+def _get_batch_executor():
+    """Returns the shared batch thread pool, creating it on first use."""
+    global _batch_executor
+    with _batch_executor_lock:
+        if _batch_executor is None:
+            _batch_executor = ThreadPoolExecutor(max_workers=CRYPTO_BATCH_WORKERS,
+                                                 thread_name_prefix='cry-crypto-batch')
+        return _batch_executor
+
+
+def _apply_chunk(func, chunk, return_exceptions):
+    """Applies `func` to each argument tuple of a chunk, optionally capturing exceptions as results."""
+    results = []
+    for args in chunk:
+        try:
+            results.append(func(*args))
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            results.append(e)
+    return results
+
+
+def _run_batch(func, items, return_exceptions=False):
+    """Applies `func` to every argument tuple in `items`, spreading large batches over the batch thread pool.
+
+    Args:
+        func (callable): The function to apply.
+        items (list): Argument tuples, one per call.
+        return_exceptions (bool): Return exceptions in place of results instead of raising the first one.
+
+    Returns:
+        list: The results in the same order as `items`.
+    """
+    if len(items) < BATCH_PARALLEL_THRESHOLD or CRYPTO_BATCH_WORKERS <= 1:
+        return _apply_chunk(func, items, return_exceptions)
+
+    executor = _get_batch_executor()
+    chunk_size = -(-len(items) // CRYPTO_BATCH_WORKERS)
+    futures = [executor.submit(_apply_chunk, func, items[start:start + chunk_size], return_exceptions)
+               for start in range(0, len(items), chunk_size)]
+    results = []
+    for future in futures:
+        results.extend(future.result())
+    return results
+
+
+def _derive_distinct(salt_params):
+    """Derives (and caches) the key of each distinct (salt, KDF parameters) pair once, in parallel."""
+    distinct = {(bytes(salt), kdf_params) for salt, kdf_params in salt_params}
+    _run_batch(_get_ciphers, list(distinct))
+
+
+def encrypt_many(items, return_exceptions=False):
+    """Encrypts many plaintexts, deriving each distinct salt's key only once.
+
+    Args:
+        items (list): (plaintext, salt) pairs.
+        return_exceptions (bool): Return per-item exceptions instead of raising the first one.
+
+    Returns:
+        list: The envelopes, in the same order as `items`.
+    """
+    items = list(items)
+    _derive_distinct((salt, KDF_PARAMS) for _, salt in items)
+    return _run_batch(encrypt_string, items, return_exceptions)
+
+
+def decrypt_many(items, return_exceptions=False):
+    """Decrypts many envelopes or Fernet tokens, deriving each distinct salt's key only once.
+
+    Args:
+        items (list): (encrypted_text, salt) pairs.
+        return_exceptions (bool): Return per-item exceptions instead of raising the first one.
+
+    Returns:
+        list: The plaintext strings, in the same order as `items`.
+    """
+    items = list(items)
+    salt_params = []
+    for encrypted_text, salt in items:
+        try:
+            salt_params.append((salt, kdf_params_of(encrypted_text)))
+        except (ValueError, IndexError, struct.error):
+            continue  # Reported by decrypt_string for this item
+    _derive_distinct(salt_params)
+    return _run_batch(decrypt_string, items, return_exceptions)
 
 
 def encrypt_text(text):
@@ -102,13 +502,14 @@ def encrypt_text(text):
     """
     try:
         salt = os.urandom(SALT_LENGTH)
-        key = generate_key_basic(salt)
-        fernet = Fernet(key)
-        encrypted_text = fernet.encrypt(text.encode())
+        key = cry_kdf_executor.run(generate_key_basic, salt, KDF_PARAMS)
+        encrypted_text = _seal(_build_ciphers(key), KDF_PARAMS, text)
         return {
             'encrypted_text': base64.urlsafe_b64encode(encrypted_text).decode(),
             'salt': base64.urlsafe_b64encode(salt).decode(),
         }
+    except KdfExecutorError:
+        raise
     except InvalidToken as e:
         raise EncryptionError(f"InvalidToken during encryption: {str(e)}")
     except Exception as e:
@@ -127,13 +528,97 @@ def decrypt_text(encrypted_text, salt_provided):
     """
     try:
         salt = base64.urlsafe_b64decode(salt_provided.encode())
-        key = generate_key_basic(salt)
-        fernet = Fernet(key)
-        decrypted_text = fernet.decrypt(base64.urlsafe_b64decode(encrypted_text)).decode()
+        encrypted_bytes = base64.urlsafe_b64decode(encrypted_text)
+        envelope = _parse_envelope(encrypted_bytes)
+        kdf_params = DEFAULT_KDF_PARAMS if envelope is None else envelope[1]
+        _check_envelope_cost(kdf_params)
+        ciphers = _build_ciphers(cry_kdf_executor.run(generate_key_basic, salt, kdf_params))
+        if envelope is None:
+            decrypted_text = ciphers.fernet.decrypt(encrypted_bytes).decode()
+        else:
+            decrypted_text = _open(ciphers, envelope)
         return {
             'decrypted_text': decrypted_text
         }
+    except KdfExecutorError:
+        raise
     except InvalidToken as e:
         raise DecryptionError(f"InvalidToken during decryption: {str(e)}")
     except Exception as e:
         raise DecryptionError(f"Unexpected error during decryption: {str(e)}")
+
+
+def encrypt_texts(texts):
+    """Encrypts many texts under one freshly generated salt, deriving its key once.
+
+    Args:
+        texts (list): The plaintexts to encrypt.
+
+    Returns:
+        list: One dictionary per text containing the encrypted text and the shared salt.
+    """
+    try:
+        salt = os.urandom(SALT_LENGTH)
+        ciphers = _build_ciphers(cry_kdf_executor.run(generate_key_basic, salt, KDF_PARAMS))
+        salt_str = base64.urlsafe_b64encode(salt).decode()
+        encrypted = _run_batch(lambda text: _seal(ciphers, KDF_PARAMS, text), [(text,) for text in texts])
+        return [{
+            'encrypted_text': base64.urlsafe_b64encode(encrypted_text).decode(),
+            'salt': salt_str,
+        } for encrypted_text in encrypted]
+    except KdfExecutorError:
+        raise
+    except Exception as e:
+        raise EncryptionError(f"Unexpected error during batch encryption: {str(e)}")
+
+
+def decrypt_texts(items):
+    """Decrypts many texts, deriving the key of each distinct salt once.
+
+    Args:
+        items (list): (encrypted_text, salt) pairs of base64 strings as returned by `encrypt_text`.
+
+    Returns:
+        list: One dictionary with the decrypted text, or a DecryptionError, per item.
+
+    Raises:
+        ValueError: If the items use more than CRYPTO_BATCH_MAX_SALTS distinct salts.
+    """
+    parsed = []
+    pending = {}
+    for encrypted_text, salt_provided in items:
+        try:
+            salt = base64.urlsafe_b64decode(salt_provided.encode())
+            encrypted_bytes = base64.urlsafe_b64decode(encrypted_text)
+            envelope = _parse_envelope(encrypted_bytes)
+            kdf_params = DEFAULT_KDF_PARAMS if envelope is None else envelope[1]
+            _check_envelope_cost(kdf_params)
+        except Exception as e:
+            parsed.append((DecryptionError(f"Unexpected error during decryption: {str(e)}"),))
+            continue
+        pending.setdefault((salt, kdf_params), None)
+        parsed.append((encrypted_bytes, envelope, (salt, kdf_params)))
+
+    if len(pending) > CRYPTO_BATCH_MAX_SALTS:
+        raise ValueError(f"At most {CRYPTO_BATCH_MAX_SALTS} distinct salts can be decrypted per batch.")
+
+    # One executor job per distinct salt, run one after another: the batch holds a single slot at a time
+    # and each derivation gets the normal timeout, so other callers interleave with a large batch.
+    ciphers_by_salt = {salt_params: _build_ciphers(cry_kdf_executor.run(generate_key_basic, *salt_params))
+                       for salt_params in pending}
+
+    def _decrypt(*entry):
+        if len(entry) == 1:
+            return entry[0]
+        encrypted_bytes, envelope, salt_params = entry
+        ciphers = ciphers_by_salt[salt_params]
+        try:
+            if envelope is None:
+                return {'decrypted_text': ciphers.fernet.decrypt(encrypted_bytes).decode()}
+            return {'decrypted_text': _open(ciphers, envelope)}
+        except InvalidToken as e:
+            return DecryptionError(f"InvalidToken during decryption: {str(e)}")
+        except Exception as e:
+            return DecryptionError(f"Unexpected error during decryption: {str(e)}")
+
+    return _run_batch(_decrypt, parsed)
@@ -0,0 +1,360 @@
+"""
+cry_index
+~~~~~~~~~
+
+This module provides the in-memory index of apps, their buckets and the secret names in each bucket.
+It is built from the secrets directory at startup and kept current by the write paths and the
+database sync, so existence checks and listings never scan the filesystem.
+
+The index lives in `BUCKETS` as {app_name: {bucket_name: set(secret_names)}}. A sorted copy of
+each bucket's names, and a sorted list of all buckets, are kept next to it, so listings come back
+in order without sorting per call and a page of a listing is a binary search plus the page itself.
+
+Secret tags are held here too, with an inverted index per bucket from each (tag_key, tag_value)
+pair to the names carrying it, so a tag query intersects posting sets instead of scanning secrets.
+
+"""
+
+import bisect
+import fnmatch
+import hashlib
+import logging
+import os
+import threading
+
+from globals import BUCKETS, LOG_LEVEL, SECRET_KEY_FILE, SECRETS_DIR
+
+logging.basicConfig(level=LOG_LEVEL)
+
+_index_lock = threading.Lock()
+
+# Sorted secret names keyed by (app_name, bucket_name), mirroring the sets in BUCKETS
+_sorted_secrets = {}
+
+# Every (app_name, bucket_name) pair in sorted order
+_sorted_buckets = []
+
+# Tags of each tagged secret as {tag_key: tag_value}, keyed by (app_name, bucket_name, secret_name)
+_secret_tags = {}
+
+# Inverted tag index: (app_name, bucket_name) mapped to {(tag_key, tag_value): set(secret_names)}
+_tag_postings = {}
+
+# sha256 of each bucket's sorted names keyed by (app_name, bucket_name), computed on demand and dropped on change
+_names_digests = {}
+
+
+def _ensure_bucket(app_name, bucket_name):
+    """Return the name set of a bucket, creating the bucket in the index. Must be called with the lock held."""
+    names = BUCKETS.setdefault(app_name, {}).get(bucket_name)
+    if names is None:
+        names = BUCKETS[app_name][bucket_name] = set()
+        _sorted_secrets[(app_name, bucket_name)] = []
+        bisect.insort(_sorted_buckets, (app_name, bucket_name))
+    return names
+
+
+def add_bucket(app_name, bucket_name):
+    """Add a bucket to the index. Existing secret names of the bucket are kept."""
+    with _index_lock:
+        _ensure_bucket(app_name, bucket_name)
+
+
+def remove_bucket(app_name, bucket_name):
+    """Remove a bucket and its secret names from the index."""
+    with _index_lock:
+        buckets = BUCKETS.get(app_name, {})
+        if buckets.pop(bucket_name, None) is not None:
+            del _sorted_buckets[bisect.bisect_left(_sorted_buckets, (app_name, bucket_name))]
+        _drop_bucket_tags(app_name, bucket_name)
+        _sorted_secrets.pop((app_name, bucket_name), None)
+        _names_digests.pop((app_name, bucket_name), None)
+        if not buckets:
+            BUCKETS.pop(app_name, None)
+
+
+def add_secret(app_name, bucket_name, secret_name):
+    """Add a secret name to a bucket, creating the bucket in the index if needed."""
+    with _index_lock:
+        names = _ensure_bucket(app_name, bucket_name)
+        if secret_name not in names:
+            names.add(secret_name)
+            bisect.insort(_sorted_secrets[(app_name, bucket_name)], secret_name)
+            _names_digests.pop((app_name, bucket_name), None)
+
+
+def remove_secret(app_name, bucket_name, secret_name):
+    """Remove a secret name from a bucket."""
+    with _index_lock:
+        names = BUCKETS.get(app_name, {}).get(bucket_name)
+        if names is None or secret_name not in names:
+            return
+        names.discard(secret_name)
+        sorted_names = _sorted_secrets[(app_name, bucket_name)]
+        del sorted_names[bisect.bisect_left(sorted_names, secret_name)]
+        _names_digests.pop((app_name, bucket_name), None)
+        _set_tags(app_name, bucket_name, secret_name, None)
+
+
+def bucket_exists(app_name, bucket_name):
+    """Return whether the bucket is in the index."""
+    return bucket_name in BUCKETS.get(app_name, {})
+
+
+def secret_exists(app_name, bucket_name, secret_name):
+    """Return whether the secret name is in the bucket."""
+    return secret_name in BUCKETS.get(app_name, {}).get(bucket_name, ())
+
+
+def list_buckets():
+    """Return every bucket as a sorted list of (app_name, bucket_name) pairs."""
+    with _index_lock:
+        return list(_sorted_buckets)
+
+
+def list_secrets(app_name, bucket_name):
+    """Return the secret names of a bucket in sorted order, or an empty list for an unknown bucket."""
+    with _index_lock:
+        return list(_sorted_secrets.get((app_name, bucket_name), ()))
+
+
+def _glob_prefix(pattern):
+    """Return the literal part of a glob pattern before its first wildcard."""
+    for position, char in enumerate(pattern):
+        if char in '*?[':
+            return pattern[:position]
+    return pattern
+
+
+def _narrow_prefix(prefix, pattern):
+    """Combine a prefix filter with the literal prefix of a glob pattern.
+
+    Returns:
+        str: The longer of the two, or None if no name can match both.
+    """
+    if not pattern:
+        return prefix
+    literal = _glob_prefix(pattern)
+    if literal.startswith(prefix):
+        return literal
+    return prefix if prefix.startswith(literal) else None
+
+
+def _scan(entries, start, name_of, in_range, prefix, pattern, limit, scan_limit):
+    """Collect up to `limit` entries from position `start` whose name matches the prefix and glob pattern.
+
+    The scan stops at the first entry outside `in_range` and after `scan_limit` entries, so a page costs at
+    most a binary search plus `scan_limit` comparisons however sparse the pattern's matches are.
+
+    Returns:
+        tuple: (matching entries, last entry examined if the listing continues past the page, else None).
+    """
+    page = []
+    end = min(len(entries), start + scan_limit)
+    position = start
+    while position < end:
+        entry = entries[position]
+        if not in_range(entry):
+            return page, None
+        position += 1
+        name = name_of(entry)
+        if name.startswith(prefix) and (not pattern or fnmatch.fnmatchcase(name, pattern)):
+            page.append(entry)
+            if len(page) >= limit:
+                break
+    if position < len(entries) and in_range(entries[position]):
+        return page, entries[position - 1]
+    return page, None
+
+
+def page_secrets(app_name, bucket_name, limit, after=None, prefix='', pattern=None, scan_limit=None):
+    """Return one page of a bucket's secret names in sorted order.
+
+    Args:
+        app_name (str): Application Name for the Bucket.
+        bucket_name (str): The name of the bucket.
+        limit (int): The maximum number of names to return.
+        after (str, optional): Only names after this one are returned.
+        prefix (str): Only names starting with this prefix are returned.
+        pattern (str, optional): Only names matching this glob pattern (`fnmatch` syntax, case-sensitive) are returned.
+        scan_limit (int, optional): The maximum number of names examined. Defaults to `limit`.
+
+    Returns:
+        tuple: (names, last name examined if more names may follow, else None).
+    """
+    prefix = _narrow_prefix(prefix or '', pattern)
+    if prefix is None:
+        return [], None
+    with _index_lock:
+        names = _sorted_secrets.get((app_name, bucket_name), [])
+        start = bisect.bisect_left(names, prefix)
+        if after is not None:
+            start = max(start, bisect.bisect_right(names, after))
+        return _scan(names, start, lambda name: name, lambda name: name.startswith(prefix),
+                     prefix, pattern, limit, max(scan_limit or limit, limit))
+
+
+def page_buckets(limit, after=None, app_name=None, prefix='', pattern=None, scan_limit=None):
+    """Return one page of (app_name, bucket_name) pairs in sorted order.
+
+    Args:
+        limit (int): The maximum number of pairs to return.
+        after (tuple, optional): Only pairs after this (app_name, bucket_name) pair are returned.
+        app_name (str, optional): Only buckets of this application are returned.
+        prefix (str): Only buckets whose name starts with this prefix are returned.
+        pattern (str, optional): Only buckets whose name matches this glob pattern are returned.
+        scan_limit (int, optional): The maximum number of pairs examined. Defaults to `limit`.
+
+    Returns:
+        tuple: (pairs, last pair examined if more pairs may follow, else None).
+    """
+    prefix = _narrow_prefix(prefix or '', pattern)
+    if prefix is None:
+        return [], None
+    if app_name is not None:
+        def in_range(pair):
+            return pair[0] == app_name and pair[1].startswith(prefix)
+        first = (app_name, prefix)
+    else:
+        # Bucket names only sort together within an app, so every pair is scanned against the filters
+        def in_range(pair):
+            return True
+        first = ('', '')
+    with _index_lock:
+        start = bisect.bisect_left(_sorted_buckets, first)
+        if after is not None:
+            start = max(start, bisect.bisect_right(_sorted_buckets, tuple(after)))
+        return _scan(_sorted_buckets, start, lambda pair: pair[1], in_range,
+                     prefix, pattern, limit, max(scan_limit or limit, limit))
+
+
+def _set_tags(app_name, bucket_name, secret_name, tags):
+    """Replace the tags of a secret in the tag maps. Must be called with the lock held."""
+    postings = _tag_postings.get((app_name, bucket_name), {})
+    for tag in _secret_tags.pop((app_name, bucket_name, secret_name), {}).items():
+        names = postings[tag]
+        names.discard(secret_name)
+        if not names:
+            del postings[tag]
+    if tags:
+        _secret_tags[(app_name, bucket_name, secret_name)] = dict(tags)
+        postings = _tag_postings.setdefault((app_name, bucket_name), postings)
+        for tag in tags.items():
+            postings.setdefault(tag, set()).add(secret_name)
+    if not postings:
+        _tag_postings.pop((app_name, bucket_name), None)
+
+
+def _drop_bucket_tags(app_name, bucket_name):
+    """Remove the tags of every secret of a bucket. Must be called with the lock held."""
+    postings = _tag_postings.pop((app_name, bucket_name), {})
+    for secret_name in set().union(*postings.values()):
+        _secret_tags.pop((app_name, bucket_name, secret_name), None)
+
+
+def set_tags(app_name, bucket_name, secret_name, tags):
+    """Replace the tags of a secret. Empty or None tags remove them."""
+    with _index_lock:
+        _set_tags(app_name, bucket_name, secret_name, tags)
+
+
+def load_tags(rows, app_name=None, bucket_name=None):
+    """Replace the tags of every secret, or of every secret of one bucket, with the given rows.
+
+    Args:
+        rows (iterable): (app_name, bucket_name, secret_name, tag_key, tag_value) tuples.
+        app_name (str, optional): With bucket_name, only that bucket's tags are replaced.
+        bucket_name (str, optional): The bucket whose tags are replaced.
+
+    Returns:
+        int: The number of tags loaded.
+    """
+    tags = {}
+    for row_app_name, row_bucket_name, secret_name, tag_key, tag_value in rows:
+        tags.setdefault((row_app_name, row_bucket_name, secret_name), {})[tag_key] = tag_value
+    with _index_lock:
+        if bucket_name is None:
+            _secret_tags.clear()
+            _tag_postings.clear()
+        else:
+            _drop_bucket_tags(app_name, bucket_name)
+        for (row_app_name, row_bucket_name, secret_name), secret_tags in tags.items():
+            _set_tags(row_app_name, row_bucket_name, secret_name, secret_tags)
+    return sum(len(secret_tags) for secret_tags in tags.values())
+
+
+def get_tags(app_name, bucket_name, secret_name):
+    """Return a copy of the tags of a secret, empty if it has none."""
+    with _index_lock:
+        return dict(_secret_tags.get((app_name, bucket_name, secret_name), {}))
+
+
+def find_by_tags(app_name, bucket_name, tags):
+    """Return the sorted names of the secrets of a bucket carrying every given tag.
+
+    The posting sets of the tags are intersected from the smallest, so the cost follows the rarest tag.
+    """
+    with _index_lock:
+        postings = _tag_postings.get((app_name, bucket_name), {})
+        matches = sorted((postings.get(tag, set()) for tag in tags.items()), key=len)
+        if not matches:
+            return []
+        names = set(matches[0])
+        for posting in matches[1:]:
+            names &= posting
+            if not names:
+                break
+    return sorted(names)
+
+
+def names_digest(app_name, bucket_name):
+    """Return the hex sha256 of a bucket's sorted secret names, as a version tag for its listing.
+
+    The digest is computed once per change to the bucket's names. An unknown bucket has the digest of no names.
+    """
+    with _index_lock:
+        key = (app_name, bucket_name)
+        digest = _names_digests.get(key)
+        if digest is None:
+            names = _sorted_secrets.get(key, ())
+            digest = hashlib.sha256('\0'.join(names).encode('utf-8')).hexdigest()
+            if key in _sorted_secrets:
+                _names_digests[key] = digest
+        return digest
+
+
+def build_from_directory(secrets_dir=SECRETS_DIR):
+    """Rebuild the index from the secrets directory, replacing its current contents.
+
+    Args:
+        secrets_dir (str): Root of the app/bucket/secret file tree.
+
+    Returns:
+        int: The number of secrets indexed.
+    """
+    buckets = {}
+    if os.path.isdir(secrets_dir):
+        for app_entry in os.scandir(secrets_dir):
+            if not app_entry.is_dir():
+                continue
+            for bucket_entry in os.scandir(app_entry.path):
+                if not bucket_entry.is_dir():
+                    continue
+                buckets[(app_entry.name, bucket_entry.name)] = sorted(
+                    os.path.splitext(secret_entry.name)[0] for secret_entry in os.scandir(bucket_entry.path)
+                    if secret_entry.name.endswith('.json') and secret_entry.name != SECRET_KEY_FILE)
+
+    with _index_lock:
+        BUCKETS.clear()
+        _sorted_secrets.clear()
+        _names_digests.clear()
+        _sorted_buckets[:] = sorted(buckets)
+        _secret_tags.clear()
+        _tag_postings.clear()
+        for (app_name, bucket_name), names in buckets.items():
+            BUCKETS.setdefault(app_name, {})[bucket_name] = set(names)
+            _sorted_secrets[(app_name, bucket_name)] = names
+
+    secret_count = sum(len(names) for names in buckets.values())
+    logging.info(f"Indexed {secret_count} secrets in {len(buckets)} buckets")
+    return secret_count
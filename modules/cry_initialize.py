@@ -10,14 +10,30 @@ and populate caches.
 
 import logging
 import os
+import threading
+import time
 import uuid
 
-from globals import SECRETS_DIR, BUCKET_KEYS, BUCKETS, LOG_LEVEL, bucket_cache
+from globals import SECRETS_DIR, BUCKET_KEYS, BUCKETS, LOG_LEVEL, SYNC_LOCK, bucket_cache
+from modules import cry_config_registry
 from modules import cry_database, cry_utils
 from modules import cry_encryption
+from modules import cry_index
+from modules import cry_kdf_executor
+from modules import cry_keyring
+from modules import cry_local_digests
+from modules import cry_materializer
+from modules import cry_secrets_management
 
 logging.basicConfig(level=LOG_LEVEL)
 
+# Transaction id horizon each table is synced up to: every change stamped below it has been applied.
+# None until the first, full sync.
+_sync_watermarks = {'bucket_keys': None, 'secrets': None}
+
+# Set to run the next periodic sync pass immediately, e.g. when the change listener disconnects
+_sync_requested = threading.Event()
+
 
 def initialize_app():
     """Initialize the core components of the application.
@@ -25,15 +41,30 @@ def initialize_app():
     This function performs the following tasks:
     - Set up the database connection and tables.
     - Create necessary directories for secrets.
+    - Build the in-memory index of apps, buckets and secrets from the secrets directory.
+    - Compute the local bucket digests used by anti-entropy and bucket watches.
+    - Load the bucket configuration registry.
     - Initialize the database connection pool.
     - Populate the bucket cache from the database.
+    - Load the decoded bucket keys into the key ring.
+    - Start the key derivation executor.
     """
     logging.info("Creating Database Pool & Validating Database Pre-Requisites")
     cry_database.create_table()
     _create_directory_if_not_exists(SECRETS_DIR, "Creating Secrets Directory as it's missing")
+    logging.info("Building Secrets Index from the Secrets Directory")
+    cry_index.build_from_directory(SECRETS_DIR)
+    logging.info("Computing Local Bucket Digests")
+    cry_local_digests.rescan()
+    logging.info("Loading Bucket Configurations")
+    cry_config_registry.reload()
     cry_database.create_dml_connection_pool()
     logging.info("Initializing Buckets Cache from Database")
     initialize_bucket_cache()
+    logging.info("Initializing Bucket Key Ring from Database")
+    initialize_key_ring()
+    logging.info("Starting Key Derivation Executor")
+    cry_kdf_executor.start()
 
 
 def _create_directory_if_not_exists(directory_path, log_message=None):
@@ -85,25 +116,36 @@ def _handle_missing_key(bucket_name, key_salt_file_path):
         return {'message': 'Failed to create bucket.'}, 500
 
 
-def create_bucket_directories_keys():
+def _materialize_bucket(app_name, bucket_name):
+    """Ensure a bucket's directory exists and its key file holds the key from the key ring."""
+    bucket_path = os.path.join(SECRETS_DIR, app_name, bucket_name)
+    os.makedirs(bucket_path, exist_ok=True)
+    key_file_path = os.path.join(bucket_path, 'secret.key')
+    encryption_key = BUCKET_KEYS.get(app_name, {}).get(bucket_name, {}).get('encryption_key')
+    if encryption_key is not None:
+        return _write_existing_key_to_file(bucket_name, key_file_path, encryption_key)
+    if not os.path.exists(key_file_path):
+        _handle_missing_key(bucket_name, key_file_path)
+        return cry_materializer.WRITTEN
+    return cry_materializer.UNCHANGED
+
+
+def create_bucket_directories_keys(app_bucket_pairs=None):
     """
     Create directories for each app and bucket and handle the associated encryption keys.
 
     For each app and its buckets, ensure that the directories exist and then manage its encryption key.
+    A key file is rewritten when the key ring holds a different key. The work runs on the materializer pipeline.
+
+    Parameters:
+    - app_bucket_pairs (list, optional): (app_name, bucket_name) pairs to handle. Defaults to every bucket.
     """
-    for app_name, bucket_dict in BUCKETS.items():
-        app_path = _create_directory_if_not_exists(os.path.join(SECRETS_DIR, app_name),
-                                                   f"Creating App Directory for: {app_name}")
-        for bucket_name in bucket_dict.keys():
-            bucket_path = _create_directory_if_not_exists(os.path.join(app_path, bucket_name),
-                                                          f"Creating Bucket Directory for: {bucket_name}")
-            key_file_path = os.path.join(bucket_path, 'secret.key')
-            if not os.path.exists(key_file_path):
-                encryption_key = BUCKET_KEYS.get(app_name, {}).get(bucket_name, {}).get('encryption_key')
-                if encryption_key is None:
-                    _handle_missing_key(bucket_name, key_file_path)
-                else:
-                    _write_existing_key_to_file(bucket_name, key_file_path, encryption_key)
+    if app_bucket_pairs is None:
+        app_bucket_pairs = [(app_name, bucket_name) for app_name, bucket_dict in list(BUCKETS.items())
+                            for bucket_name in list(bucket_dict)]
+    with cry_materializer.Pipeline('bucket-materializer') as pipeline:
+        for app_name, bucket_name in app_bucket_pairs:
+            pipeline.submit(_materialize_bucket, app_name, bucket_name)
 
 
 def initialize_buckets(app_bucket_keys_list):
@@ -114,15 +156,11 @@ def initialize_buckets(app_bucket_keys_list):
     - app_bucket_keys_list (list): List of tuples containing app names, bucket names and their associated encryption keys.
     """
     for app_name, bucket_name, encryption_key in app_bucket_keys_list:
-        if app_name not in BUCKETS:
-            BUCKETS[app_name] = {}
-        BUCKETS[app_name][bucket_name] = []
-
-        if app_name not in BUCKET_KEYS:
-            BUCKET_KEYS[app_name] = {}
-        BUCKET_KEYS[app_name][bucket_name] = {'encryption_key': encryption_key}
+        cry_index.add_bucket(app_name, bucket_name)
+        # A changed key is written over the stale key file below
+        cry_keyring.set_bucket_key(app_name, bucket_name, encryption_key)
 
-    create_bucket_directories_keys()
+    create_bucket_directories_keys([(app_name, bucket_name) for app_name, bucket_name, _ in app_bucket_keys_list])
 
 
 def _write_existing_key_to_file(bucket_name, key_file_path, encryption_key):
@@ -140,26 +178,145 @@ def _write_existing_key_to_file(bucket_name, key_file_path, encryption_key):
         except ValueError:
             logging.error(
                 f"Invalid key format for bucket '{bucket_name}'. The encryption key must be a valid hex string.")
-            return
-    with open(key_file_path, "wb") as key_file:
-        key_file.write(encryption_key)
+            return cry_materializer.FAILED
+    return cry_materializer.write_file(key_file_path, bytes(encryption_key))
+
+
+def _sync_since(table):
+    """Return the horizon the next sync of `table` reads from, or None for a full sync."""
+    return _sync_watermarks[table]
+
+
+def _advance_watermark(table, horizon):
+    """Move the watermark of `table` to `horizon`, the horizon read before the rows were fetched."""
+    _sync_watermarks[table] = horizon
+
+
+def _apply_secret_row(app_name, bucket_name, secret_name, encrypted_secret, deleted):
+    """Bring the local file of one secret in line with its database row.
+
+    Returns:
+        str: The materializer outcome - WRITTEN, REMOVED or UNCHANGED.
+    """
+    secret_file_path = os.path.join(SECRETS_DIR, app_name, bucket_name, f"{secret_name}.json")
+    if deleted:
+        outcome = cry_materializer.remove_file(secret_file_path)
+    else:
+        outcome = cry_materializer.write_file(secret_file_path, bytes(encrypted_secret))
+    if outcome != cry_materializer.UNCHANGED:
+        # The secret was added, changed or deleted by another instance
+        cry_secrets_management.notify_secret_changed(bucket_name, secret_name, app_name, deleted=deleted)
+    return outcome
+
+
+def sync_buckets_from_db():
+    """
+    Fetch the buckets created or changed since the last sync, and apply their keys and credentials.
+
+    The first call reads every bucket.
+    """
+    horizon = cry_database.get_change_horizon()
+    rows = cry_database.get_bucket_keys_changed_since(_sync_since('bucket_keys'), horizon)
+    if rows:
+        initialize_buckets([(app_name, bucket_name, encryption_key) for app_name, bucket_name, encryption_key, _
+                            in rows])
+        for app_name, bucket_name, _, client_id in rows:
+            bucket_cache[app_name, bucket_name] = {'client_id': client_id}
+    _advance_watermark('bucket_keys', horizon)
+    return len(rows)
 
 
 def initialize_secrets_from_db():
     """
-    Fetch all secrets from the database and create the necessary files on the system for each secret.
+    Fetch the secrets changed since the last sync and update the files on the system for each secret.
+
+    The first call reads every secret. Changed secrets are rewritten and tombstoned secrets are removed.
+    Rows stream in from a server-side cursor into the materializer pipeline, whose workers write the
+    files while the next rows are fetched. Memory use does not grow with the number of secrets.
+    The tags of the changed secrets are reloaded afterwards; the first call loads every tag.
+
+    Returns:
+        int: The number of local files written or removed.
+    """
+    since = _sync_since('secrets')
+    horizon = cry_database.get_change_horizon()
+    changed = []
+    with cry_materializer.Pipeline('secret-materializer') as pipeline:
+        for app_name, bucket_name, secret_name, encrypted_secret, deleted in \
+                cry_database.get_secrets_changed_since(since, horizon):
+            pipeline.submit(_apply_secret_row, app_name, bucket_name, secret_name, encrypted_secret, deleted)
+            if since is not None and not deleted:
+                changed.append((app_name, bucket_name, secret_name))
+    if since is None:
+        tag_count = cry_index.load_tags(cry_database.get_all_secret_tags())
+        logging.info(f"Loaded {tag_count} secret tags into the tag index")
+    else:
+        _refresh_tags(changed)
+    # A failed write is retried by the next pass, which reads from the unchanged watermark
+    if pipeline.counts[cry_materializer.FAILED] == 0:
+        _advance_watermark('secrets', horizon)
+    return pipeline.counts[cry_materializer.WRITTEN] + pipeline.counts[cry_materializer.REMOVED]
+
+
+def _refresh_tags(secrets):
+    """Reload the tags of the given (app_name, bucket_name, secret_name) secrets into the tag index."""
+    for start in range(0, len(secrets), cry_database.STREAM_BATCH_SIZE):
+        chunk = secrets[start:start + cry_database.STREAM_BATCH_SIZE]
+        tags = {key: {} for key in chunk}
+        for app_name, bucket_name, secret_name, tag_key, tag_value in cry_database.get_secret_tags(chunk):
+            tags[(app_name, bucket_name, secret_name)][tag_key] = tag_value
+        for (app_name, bucket_name, secret_name), secret_tags in tags.items():
+            cry_index.set_tags(app_name, bucket_name, secret_name, secret_tags)
+
+
+def sync_from_db():
+    """Run one incremental sync pass of buckets, keys and secrets from the database."""
+    with SYNC_LOCK:
+        bucket_count = sync_buckets_from_db()
+        secret_count = initialize_secrets_from_db()
+    logging.info(f"Database sync applied {bucket_count} bucket rows and {secret_count} secret changes")
+
+
+def request_sync():
+    """Wake the periodic sync loop so it runs its next pass now."""
+    _sync_requested.set()
+
+
+def wait_for_sync(timeout):
+    """Block the periodic sync loop until its next pass is due or requested."""
+    _sync_requested.wait(timeout)
+    _sync_requested.clear()
+
+
+def sync_secret_from_db(bucket_name, secret_name, app_name):
+    """Refresh the local file, tags and in-memory state of a single secret from the database.
+
+    Returns:
+        bool: True if the local file was written or removed.
     """
-    secrets = cry_database.get_all_secrets()
-    for secret in secrets:
-        app_name, bucket_name, secret_name, encrypted_secret = secret  # Adjusted to receive app_name
-        app_directory = os.path.join("secrets", app_name)
-        _create_directory_if_not_exists(app_directory)  # Ensure app directory exists
-        bucket_directory = os.path.join(app_directory, bucket_name)  # Adjusted to nest bucket inside app directory
-        _create_directory_if_not_exists(bucket_directory)
-        secret_file_path = os.path.join(bucket_directory, f"{secret_name}.json")
-        if not os.path.exists(secret_file_path):
-            with open(secret_file_path, "wb") as secret_file:
-                secret_file.write(encrypted_secret)
+    row = cry_database.get_secret_row(bucket_name, secret_name, app_name)
+    with SYNC_LOCK:
+        if row is None:
+            row = (b'', True)
+        encrypted_secret, deleted = row
+        outcome = _apply_secret_row(app_name, bucket_name, secret_name, encrypted_secret, deleted)
+    if not deleted:
+        _refresh_tags([(app_name, bucket_name, secret_name)])
+    return outcome != cry_materializer.UNCHANGED
+
+
+def sync_bucket_from_db(bucket_name, app_name):
+    """Refresh the key, key file and credentials of a single bucket from the database."""
+    row = cry_database.get_bucket_key_row(bucket_name, app_name)
+    with SYNC_LOCK:
+        if row is None:
+            # The bucket was removed; stop authenticating it
+            bucket_cache.pop((app_name, bucket_name), None)
+            cry_keyring.remove_bucket_key(app_name, bucket_name)
+            return
+        encryption_key, client_id = row
+        initialize_buckets([(app_name, bucket_name, encryption_key)])
+        bucket_cache[app_name, bucket_name] = {'client_id': client_id}
 
 
 def refresh_bucket_cache():
@@ -190,3 +347,59 @@ def initialize_bucket_cache():
         app_name, bucket_name, _, client_id = bucket
         bucket_cache[app_name, bucket_name] = {'client_id': client_id}
     return bucket_cache
+
+
+def initialize_key_ring():
+    """Load the key and salt of every bucket from the database into the in-memory key ring."""
+    bucket_keys_list = cry_database.initialize_buckets_and_keys_from_db()
+    cry_keyring.load_bucket_keys(bucket_keys_list)
+    logging.info(f"Loaded {len(bucket_keys_list)} bucket keys into the key ring")
+
+
+def resync_bucket(bucket_name, app_name):
+    """Re-pull one bucket from the database: its key, credentials, secret files, tags, index and cache entries.
+
+    Runs under SYNC_LOCK, so it never interleaves with a periodic sync pass.
+
+    Returns:
+        dict: The outcome, with counts of secrets written, removed and unchanged and the time taken,
+        or None if the bucket does not exist in the database.
+    """
+    start = time.perf_counter()
+    with SYNC_LOCK:
+        row = cry_database.get_bucket_key_row(bucket_name, app_name)
+        if row is None:
+            sync_bucket_from_db(bucket_name, app_name)
+            return None
+        encryption_key, client_id = row
+        initialize_buckets([(app_name, bucket_name, encryption_key)])
+        bucket_cache[app_name, bucket_name] = {'client_id': client_id}
+
+        counts = {cry_materializer.WRITTEN: 0, cry_materializer.REMOVED: 0, cry_materializer.UNCHANGED: 0}
+        seen = set()
+        for secret_name, encrypted_secret, deleted in cry_database.get_bucket_secrets(bucket_name, app_name):
+            seen.add(secret_name)
+            counts[_apply_secret_row(app_name, bucket_name, secret_name, encrypted_secret, deleted)] += 1
+        # Secrets known locally without any row in the database
+        for secret_name in cry_index.list_secrets(app_name, bucket_name):
+            if secret_name not in seen:
+                cry_materializer.remove_file(os.path.join(SECRETS_DIR, app_name, bucket_name, f"{secret_name}.json"))
+                cry_secrets_management.notify_secret_changed(bucket_name, secret_name, app_name, deleted=True)
+                counts[cry_materializer.REMOVED] += 1
+        bucket_tags = cry_database.get_bucket_tags(bucket_name, app_name)
+        cry_index.load_tags([(app_name, bucket_name) + tuple(row) for row in bucket_tags], app_name, bucket_name)
+        cache_entries = cry_secrets_management.invalidate_bucket_secrets(bucket_name, app_name)
+
+    elapsed = time.perf_counter() - start
+    logging.info(f"Resynced bucket '{bucket_name}' of app '{app_name}' in {elapsed:.3f} s: "
+                 f"{counts[cry_materializer.WRITTEN]} written, {counts[cry_materializer.REMOVED]} removed, "
+                 f"{counts[cry_materializer.UNCHANGED]} unchanged")
+    return {
+        'app_name': app_name,
+        'bucket': bucket_name,
+        'secrets_written': counts[cry_materializer.WRITTEN],
+        'secrets_removed': counts[cry_materializer.REMOVED],
+        'secrets_unchanged': counts[cry_materializer.UNCHANGED],
+        'cache_entries_invalidated': cache_entries,
+        'seconds': elapsed,
+    }
@@ -0,0 +1,106 @@
+"""
+cry_ip_allowlist
+~~~~~~~~~~~~~~~~
+
+This module compiles a bucket's `allowed_ips` into a matcher for IPv4 and IPv6 addresses and
+CIDR ranges. Each entry becomes an integer range; overlapping and adjacent ranges are merged
+and sorted, so a lookup is one binary search however many ranges a bucket allows. A bucket's
+matcher is compiled once per bucket configuration snapshot and reused by every request.
+
+Entries may be single addresses ("10.0.0.5"), networks ("10.42.0.0/16", "fd00::/8") or "ANY",
+which is matched exactly: "any" or "Any" is an invalid entry, not a wildcard.
+
+"""
+
+import bisect
+import ipaddress
+import logging
+import threading
+
+from globals import LOG_LEVEL
+from modules import cry_config_registry
+
+logging.basicConfig(level=LOG_LEVEL)
+
+ALLOW_ANY = 'ANY'
+
+
+class IPAllowList:
+    """A compiled set of allowed addresses and networks.
+
+    Args:
+        entries (list): Addresses, CIDR networks or "ANY". Invalid entries are logged and ignored.
+    """
+
+    def __init__(self, entries):
+        self.allow_any = False
+        ranges = {4: [], 6: []}
+        for entry in entries or []:
+            if entry == ALLOW_ANY:
+                self.allow_any = True
+                continue
+            entry = str(entry).strip()
+            try:
+                network = ipaddress.ip_network(entry, strict=False)
+            except ValueError:
+                logging.warning(f"Ignoring invalid allowed_ips entry: '{entry}'")
+                continue
+            ranges[network.version].append((int(network.network_address), int(network.broadcast_address)))
+
+        # Sorted, non-overlapping ranges per IP version as parallel lists of starts and ends
+        self._starts = {}
+        self._ends = {}
+        for version, version_ranges in ranges.items():
+            starts, ends = [], []
+            for start, end in sorted(version_ranges):
+                if ends and start <= ends[-1] + 1:
+                    ends[-1] = max(ends[-1], end)
+                else:
+                    starts.append(start)
+                    ends.append(end)
+            self._starts[version] = starts
+            self._ends[version] = ends
+
+    def __len__(self):
+        return sum(len(starts) for starts in self._starts.values())
+
+    def __contains__(self, ip):
+        """Return whether `ip` is allowed. Unparseable addresses are never allowed."""
+        if self.allow_any:
+            return True
+        try:
+            address = ipaddress.ip_address(str(ip).strip())
+        except ValueError:
+            return False
+        if address.version == 6 and address.ipv4_mapped is not None:
+            address = address.ipv4_mapped
+        value = int(address)
+        position = bisect.bisect_right(self._starts[address.version], value) - 1
+        return position >= 0 and value <= self._ends[address.version][position]
+
+
+# (app_name, bucket_name) mapped to (config snapshot version, compiled allowlist)
+_compiled = {}
+_compiled_lock = threading.Lock()
+
+
+def get_allowlist(bucket_name, app_name):
+    """Return the compiled allowlist of a bucket, or None if the bucket has no configuration."""
+    snapshot = cry_config_registry.get_snapshot()
+    bucket_config = snapshot.configs.get((app_name, bucket_name))
+    if bucket_config is None:
+        return None
+    key = (app_name, bucket_name)
+    compiled = _compiled.get(key)
+    if compiled is not None and compiled[0] == snapshot.version:
+        return compiled[1]
+    allowlist = IPAllowList(bucket_config.get('allowed_ips', []))
+    with _compiled_lock:
+        _compiled[key] = (snapshot.version, allowlist)
+    return allowlist
+
+
+def is_ip_allowed(ip, bucket_name, app_name):
+    """Return whether `ip` may access the bucket. Buckets without a configuration allow nothing."""
+    allowlist = get_allowlist(bucket_name, app_name)
+    return allowlist is not None and ip in allowlist
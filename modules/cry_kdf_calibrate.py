@@ -0,0 +1,110 @@
+"""
+cry_kdf_calibrate
+~~~~~~~~~~~~~~~~~
+
+This module measures key derivation speed on the current host and picks PBKDF2 or scrypt
+parameters that hit a target derivation time. The result is written to the environment's
+`kdf_config.json`, from which `cry_encryption` reads the parameters for new envelopes.
+Existing secrets keep decrypting because every envelope records its own parameters.
+
+Run from the project root, once per environment:
+
+    SERVERENV=UAT python -m modules.cry_kdf_calibrate --algorithm pbkdf2 --target-ms 100 --write
+
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import time
+
+from globals import KDF_CONFIG_FILE, LOG_LEVEL, SCRYPT_MAX_MEMORY
+from modules import cry_encryption
+
+logging.basicConfig(level=LOG_LEVEL)
+
+# Security floors - calibration never goes below these, however slow the host is
+MIN_PBKDF2_ITERATIONS = 100000
+MIN_SCRYPT_N = 2 ** 14
+
+
+def measure(kdf_params, rounds=3):
+    """Measure the median time of one derivation with the given parameters.
+
+    Args:
+        kdf_params (tuple): ('pbkdf2', iterations) or ('scrypt', n, r, p).
+        rounds (int): Number of timed derivations.
+
+    Returns:
+        float: The median derivation time in seconds.
+    """
+    salt = os.urandom(cry_encryption.SALT_LENGTH)
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        cry_encryption.generate_key_basic(salt, kdf_params)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def calibrate_pbkdf2(target_seconds, rounds=3):
+    """Pick the PBKDF2 iteration count whose derivation takes about `target_seconds`.
+
+    Returns:
+        tuple: The chosen KDF parameters.
+    """
+    probe_iterations = 50000
+    per_iteration = measure(('pbkdf2', probe_iterations), rounds) / probe_iterations
+    iterations = int(target_seconds / per_iteration)
+    iterations = max(MIN_PBKDF2_ITERATIONS, min(iterations, cry_encryption.MAX_PBKDF2_ITERATIONS))
+    return 'pbkdf2', iterations - iterations % 1000
+
+
+def calibrate_scrypt(target_seconds, r=8, p=1, rounds=3):
+    """Pick the largest power-of-two scrypt cost `n` whose derivation stays within `target_seconds`.
+
+    Returns:
+        tuple: The chosen KDF parameters.
+    """
+    n = MIN_SCRYPT_N
+    while n * 2 <= 2 ** cry_encryption.MAX_SCRYPT_LOG2_N and \
+            cry_encryption.scrypt_memory(n * 2, r) <= SCRYPT_MAX_MEMORY and \
+            measure(('scrypt', n * 2, r, p), rounds) <= target_seconds:
+        n *= 2
+    return 'scrypt', n, r, p
+
+
+def write_kdf_config(kdf_params, config_file=KDF_CONFIG_FILE):
+    """Write the KDF parameters to the environment's KDF configuration file."""
+    with open(config_file, 'w') as kdf_config_file:
+        json.dump(cry_encryption.kdf_params_to_config(kdf_params), kdf_config_file, indent=2)
+        kdf_config_file.write('\n')
+    logging.info(f"KDF configuration written to {config_file}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Calibrate key derivation cost for this host.')
+    parser.add_argument('--algorithm', choices=['pbkdf2', 'scrypt'], default='pbkdf2')
+    parser.add_argument('--target-ms', type=float, default=100.0, help='Target derivation time in milliseconds')
+    parser.add_argument('--rounds', type=int, default=3, help='Timed derivations per measurement')
+    parser.add_argument('--write', action='store_true', help=f"Write the result to {KDF_CONFIG_FILE}")
+    args = parser.parse_args()
+
+    target_seconds = args.target_ms / 1000
+    if args.algorithm == 'pbkdf2':
+        kdf_params = calibrate_pbkdf2(target_seconds, args.rounds)
+    else:
+        kdf_params = calibrate_scrypt(target_seconds, rounds=args.rounds)
+
+    achieved = measure(kdf_params, args.rounds)
+    print(f"Current parameters: {cry_encryption.kdf_params_to_config(cry_encryption.KDF_PARAMS)}")
+    print(f"Chosen parameters:  {cry_encryption.kdf_params_to_config(kdf_params)} "
+          f"({achieved * 1000:.1f} ms per derivation on this host)")
+    if args.write:
+        write_kdf_config(kdf_params)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+"""
+cry_kdf_executor
+~~~~~~~~~~~~~~~~
+
+This module runs slow key derivations on a bounded worker pool instead of the request thread.
+The pool is a process pool, a thread pool or inline execution, as configured by CRY_KDF_EXECUTOR.
+Callers beyond the configured queue depth are rejected immediately, and callers waiting longer
+than the timeout give up, so a burst of derivations cannot occupy every server thread.
+Queue time and run time of each derivation are recorded as histograms.
+
+"""
+
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from globals import (LOG_LEVEL, KDF_EXECUTOR, KDF_EXECUTOR_WORKERS, KDF_EXECUTOR_MAX_QUEUE,
+                     KDF_EXECUTOR_TIMEOUT)
+from modules import cry_metrics
+
+logging.basicConfig(level=LOG_LEVEL)
+
+
+class KdfExecutorError(Exception):
+    """Exception raised when a derivation cannot be run on the executor."""
+    pass
+
+
+class KdfBusyError(KdfExecutorError):
+    """Exception raised when the executor queue is full."""
+    pass
+
+
+class KdfTimeoutError(KdfExecutorError):
+    """Exception raised when a derivation does not finish within the timeout."""
+    pass
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Bounds running plus queued derivations
+_slots = threading.BoundedSemaphore(KDF_EXECUTOR_WORKERS + KDF_EXECUTOR_MAX_QUEUE)
+
+_queue_time = cry_metrics.Histogram()
+_run_time = cry_metrics.Histogram()
+_counters_lock = threading.Lock()
+_counters = {'submitted': 0, 'completed': 0, 'rejected': 0, 'timeouts': 0, 'errors': 0, 'in_flight': 0}
+
+
+def _count(name, delta=1):
+    with _counters_lock:
+        _counters[name] += delta
+
+
+def _timed_call(func, args):
+    """Runs `func` in the worker and reports when it started and how long it ran."""
+    started_at = time.time()
+    run_start = time.perf_counter()
+    result = func(*args)
+    return result, started_at, time.perf_counter() - run_start
+
+
+def _get_executor():
+    """Returns the configured executor, creating it on first use. None means inline execution."""
+    global _executor
+    if KDF_EXECUTOR == 'inline':
+        return None
+    with _executor_lock:
+        if _executor is None:
+            if KDF_EXECUTOR == 'process':
+                # Forked workers skip re-running the application's import-time initialization;
+                # platforms without fork fall back to spawn.
+                start_method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+                _executor = ProcessPoolExecutor(max_workers=KDF_EXECUTOR_WORKERS,
+                                                mp_context=multiprocessing.get_context(start_method))
+            else:
+                _executor = ThreadPoolExecutor(max_workers=KDF_EXECUTOR_WORKERS, thread_name_prefix='cry-kdf')
+            logging.info(f"Started {KDF_EXECUTOR} KDF executor with {KDF_EXECUTOR_WORKERS} workers")
+        return _executor
+
+
+def start():
+    """Start the executor and its workers.
+
+    Called during application initialization, before the server and sync threads exist,
+    so that process workers are forked from a single-threaded parent.
+    """
+    executor = _get_executor()
+    if executor is not None:
+        # A forked process pool launches every worker on its first submission
+        executor.submit(time.time).result()
+
+
+def _reset_executor():
+    """Discards a broken executor so the next call starts a fresh one."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        _executor = None
+
+
+def _release(_future):
+    _slots.release()
+    _count('in_flight', -1)
+
+
+def run(func, *args, timeout=None):
+    """Run `func(*args)` on the KDF executor and wait for its result.
+
+    Args:
+        func (callable): A picklable, module-level function.
+        *args: Arguments passed to `func`.
+        timeout (float, optional): Seconds to wait for the result. Defaults to KDF_EXECUTOR_TIMEOUT.
+
+    Returns:
+        The return value of `func`.
+
+    Raises:
+        KdfBusyError: If the executor queue is full.
+        KdfTimeoutError: If the result is not available within the timeout.
+        KdfExecutorError: If the worker pool is broken.
+    """
+    if not _slots.acquire(blocking=False):
+        _count('rejected')
+        logging.warning("KDF executor queue is full. Rejecting derivation request.")
+        raise KdfBusyError("Key derivation capacity exhausted. Please retry later.")
+    _count('submitted')
+    _count('in_flight')
+    timeout = KDF_EXECUTOR_TIMEOUT if timeout is None else timeout
+
+    submitted_at = time.time()
+    executor = _get_executor()
+    if executor is None:
+        try:
+            result, started_at, run_seconds = _timed_call(func, args)
+        except Exception:
+            _count('errors')
+            raise
+        finally:
+            _release(None)
+    else:
+        try:
+            future = executor.submit(_timed_call, func, args)
+        except Exception:
+            _release(None)
+            raise
+        future.add_done_callback(_release)
+        try:
+            result, started_at, run_seconds = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            _count('timeouts')
+            logging.warning(f"Key derivation did not finish within {timeout} seconds.")
+            raise KdfTimeoutError("Key derivation timed out. Please retry later.")
+        except BrokenProcessPool:
+            _count('errors')
+            _reset_executor()
+            logging.error("KDF process pool is broken. It will be restarted on the next request.")
+            raise KdfExecutorError("Key derivation worker pool failed. Please retry later.")
+        except Exception:
+            _count('errors')
+            raise
+
+    _queue_time.observe(max(0.0, started_at - submitted_at))
+    _run_time.observe(run_seconds)
+    _count('completed')
+    return result
+
+
+def stats():
+    """Return the executor configuration, counters and latency histograms.
+
+    Returns:
+        dict: Executor stats.
+    """
+    with _counters_lock:
+        counters = dict(_counters)
+    return {
+        'executor': KDF_EXECUTOR,
+        'workers': KDF_EXECUTOR_WORKERS,
+        'max_queue': KDF_EXECUTOR_MAX_QUEUE,
+        'timeout': KDF_EXECUTOR_TIMEOUT,
+        **counters,
+        'queue_time_seconds': _queue_time.snapshot(),
+        'run_time_seconds': _run_time.snapshot(),
+    }
+
+
+cry_metrics.register('kdf_executor', stats)
@@ -0,0 +1,108 @@
+"""
+cry_keyring
+~~~~~~~~~~~
+
+This module provides an in-memory key ring holding the decoded key and salt of every bucket.
+It is filled from the `bucket_keys` table at startup, kept current by the database sync and
+bucket creation, and lets secret operations resolve a bucket's salt without touching disk.
+
+"""
+
+import base64
+import logging
+import threading
+
+from globals import BUCKET_KEYS, KEY_SALT_DELIMITER, LOG_LEVEL
+from modules import cry_encryption
+
+logging.basicConfig(level=LOG_LEVEL)
+
+_key_ring_lock = threading.Lock()
+
+
+def parse_key_salt(combined_key_salt):
+    """Decode a combined key/salt record as stored in `secret.key` and `bucket_keys`.
+
+    Args:
+        combined_key_salt (bytes | memoryview | str): The base64 key and salt joined by KEY_SALT_DELIMITER.
+
+    Returns:
+        tuple: The decoded (key, salt) pair.
+
+    Raises:
+        ValueError: If the record is not in the expected format.
+    """
+    if isinstance(combined_key_salt, memoryview):
+        combined_key_salt = combined_key_salt.tobytes()
+    if isinstance(combined_key_salt, bytes):
+        combined_key_salt = combined_key_salt.decode('utf-8')
+    key_str, salt_str = combined_key_salt.split(KEY_SALT_DELIMITER)
+    key = base64.b64decode(key_str.encode('utf-8'))
+    salt = base64.b64decode(salt_str.encode('utf-8'))
+    return key, salt
+
+
+def set_bucket_key(app_name, bucket_name, encryption_key):
+    """Add or replace a bucket's key in the key ring.
+
+    If the bucket already had a different key, the derived key cached for its old salt is dropped.
+
+    Args:
+        app_name (str): Application Name for the Bucket.
+        bucket_name (str): The name of the bucket.
+        encryption_key (bytes | memoryview | str): The combined key/salt record.
+
+    Returns:
+        bool: True if an existing, different key was replaced.
+    """
+    if isinstance(encryption_key, memoryview):
+        encryption_key = encryption_key.tobytes()
+    elif isinstance(encryption_key, str):
+        encryption_key = encryption_key.encode('utf-8')
+
+    try:
+        key, salt = parse_key_salt(encryption_key)
+    except (ValueError, UnicodeDecodeError):
+        logging.warning(f"Key record for bucket '{bucket_name}' of app '{app_name}' could not be decoded.")
+        key, salt = None, None
+
+    with _key_ring_lock:
+        previous = BUCKET_KEYS.setdefault(app_name, {}).get(bucket_name)
+        BUCKET_KEYS[app_name][bucket_name] = {'encryption_key': encryption_key, 'key': key, 'salt': salt}
+
+    changed = previous is not None and previous.get('encryption_key') != encryption_key
+    if changed and previous.get('salt') is not None:
+        cry_encryption.invalidate_derived_key(previous['salt'])
+    return changed
+
+
+def get_key_salt(app_name, bucket_name):
+    """Return the decoded (key, salt) pair for a bucket, or None if it is not in the key ring."""
+    entry = BUCKET_KEYS.get(app_name, {}).get(bucket_name)
+    if entry is None or entry.get('salt') is None:
+        return None
+    return entry['key'], entry['salt']
+
+
+def remove_bucket_key(app_name, bucket_name):
+    """Remove a bucket from the key ring and drop its cached derived key."""
+    with _key_ring_lock:
+        previous = BUCKET_KEYS.get(app_name, {}).pop(bucket_name, None)
+    if previous is not None and previous.get('salt') is not None:
+        cry_encryption.invalidate_derived_key(previous['salt'])
+
+
+def load_bucket_keys(app_bucket_keys_list):
+    """Fill the key ring from rows returned by `cry_database.initialize_buckets_and_keys_from_db`.
+
+    Args:
+        app_bucket_keys_list (list): Tuples of (app_name, bucket_name, encryption_key_salt).
+
+    Returns:
+        list: (app_name, bucket_name) pairs whose key changed.
+    """
+    changed = []
+    for app_name, bucket_name, encryption_key in app_bucket_keys_list:
+        if set_bucket_key(app_name, bucket_name, encryption_key):
+            changed.append((app_name, bucket_name))
+    return changed
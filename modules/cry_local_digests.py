@@ -0,0 +1,136 @@
+"""
+cry_local_digests
+~~~~~~~~~~~~~~~~~
+
+This module keeps a digest of every local bucket: the XOR of one leaf per secret file, where a
+leaf is sha256(hex(utf-8 secret name) + ':' + hex(sha256(file))) read as a 256-bit number - the
+same leaves and digests the database keeps in `bucket_digests`.
+
+A digest depends only on the names and ciphertexts of a bucket's secrets, so every node that has
+synced the bucket holds the same one, and it survives restarts. Anti-entropy compares it with the
+database, and bucket watches use it as the bucket's version.
+
+The digests follow every file the materializer writes or removes. `rescan` rebuilds them from the
+files of every indexed secret: at startup, and periodically from anti-entropy to catch files edited
+or removed by hand.
+
+"""
+
+import hashlib
+import logging
+import os
+import threading
+
+from globals import LOG_LEVEL, SECRETS_DIR
+from modules import cry_index
+from modules import cry_materializer
+
+logging.basicConfig(level=LOG_LEVEL)
+
+# The leaf of every secret file by (app_name, bucket_name) and secret name, and each bucket's digest
+_tree_lock = threading.Lock()
+_leaves = {}
+_digests = {}
+# Changes seen while a rescan runs, replayed onto the rescanned tree; None when no rescan is running
+_rescan_changes = None
+
+
+def _leaf(secret_name, digest):
+    """Return the leaf of a secret as a 256-bit number, matching the database's cry_secret_leaf."""
+    data = f"{secret_name.encode('utf-8').hex()}:{digest.hex()}".encode('utf-8')
+    return int.from_bytes(hashlib.sha256(data).digest(), 'big')
+
+
+def _set_leaf(leaves, digests, bucket_key, secret_name, leaf):
+    """Replace the leaf of one secret in a tree, or remove it when leaf is None."""
+    bucket_leaves = leaves.setdefault(bucket_key, {})
+    digest = digests.get(bucket_key, 0) ^ bucket_leaves.pop(secret_name, 0)
+    if leaf is not None:
+        bucket_leaves[secret_name] = leaf
+        digest ^= leaf
+    if bucket_leaves:
+        digests[bucket_key] = digest
+    else:
+        del leaves[bucket_key]
+        digests.pop(bucket_key, None)
+
+
+def _on_file_changed(path, digest):
+    """Materializer listener: update the tree for a secret file written or removed."""
+    parts = os.path.relpath(path, SECRETS_DIR).split(os.sep)
+    if len(parts) != 3 or parts[0] == os.pardir or not parts[2].endswith('.json'):
+        return
+    app_name, bucket_name, file_name = parts
+    secret_name = file_name[:-len('.json')]
+    leaf = None if digest is None else _leaf(secret_name, digest)
+    with _tree_lock:
+        _set_leaf(_leaves, _digests, (app_name, bucket_name), secret_name, leaf)
+        if _rescan_changes is not None:
+            _rescan_changes.append(((app_name, bucket_name), secret_name, leaf))
+
+
+cry_materializer.add_listener(_on_file_changed)
+
+
+def secret_digests(app_name, bucket_name):
+    """Return {secret_name: hex sha256 of the file} for the secrets of a local bucket that have a file."""
+    digests = {}
+    for secret_name in cry_index.list_secrets(app_name, bucket_name):
+        digest = cry_materializer.file_digest(os.path.join(SECRETS_DIR, app_name, bucket_name, f"{secret_name}.json"))
+        if digest is not None:
+            digests[secret_name] = digest.hex()
+    return digests
+
+
+def _load_bucket(leaves, digests, app_name, bucket_name):
+    """Add the leaves of one bucket's files to a tree."""
+    for secret_name, digest in secret_digests(app_name, bucket_name).items():
+        _set_leaf(leaves, digests, (app_name, bucket_name), secret_name, _leaf(secret_name, bytes.fromhex(digest)))
+
+
+def rescan():
+    """Rebuild the tree from the files of every indexed secret.
+
+    Writes are not held up: the files are read without the tree lock, and changes reported meanwhile
+    are replayed onto the new tree before it replaces the old one.
+    """
+    global _rescan_changes, _leaves, _digests
+    with _tree_lock:
+        _rescan_changes = []
+    try:
+        leaves, digests = {}, {}
+        for app_name, bucket_name in cry_index.list_buckets():
+            _load_bucket(leaves, digests, app_name, bucket_name)
+        with _tree_lock:
+            for bucket_key, secret_name, leaf in _rescan_changes:
+                _set_leaf(leaves, digests, bucket_key, secret_name, leaf)
+            _leaves, _digests = leaves, digests
+    finally:
+        with _tree_lock:
+            _rescan_changes = None
+
+
+def refresh_bucket(app_name, bucket_name):
+    """Reload the leaves of one bucket from its files."""
+    bucket_key = (app_name, bucket_name)
+    leaves, digests = {}, {}
+    _load_bucket(leaves, digests, app_name, bucket_name)
+    with _tree_lock:
+        _leaves.pop(bucket_key, None)
+        _digests.pop(bucket_key, None)
+        if bucket_key in leaves:
+            _leaves[bucket_key] = leaves[bucket_key]
+            _digests[bucket_key] = digests[bucket_key]
+
+
+def bucket_digest(app_name, bucket_name):
+    """Return the hex digest of a bucket, or '' if it has no secret files."""
+    with _tree_lock:
+        digest = _digests.get((app_name, bucket_name))
+    return '' if digest is None else f"{digest:064x}"
+
+
+def bucket_digests():
+    """Return {(app_name, bucket_name): hex digest} for every bucket with secret files."""
+    with _tree_lock:
+        return {bucket_key: f"{digest:064x}" for bucket_key, digest in _digests.items()}
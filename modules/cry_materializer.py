@@ -0,0 +1,211 @@
+"""
+cry_materializer
+~~~~~~~~~~~~~~~~
+
+This module writes secret and key files to the secrets directory. Writes are atomic - data goes to
+a temporary file in the target directory which is then renamed over the target - so readers never
+see a partially written file. A write whose content hash matches the file on disk is skipped.
+
+For bulk work such as a node's first sync, `Pipeline` runs the writes on a small pool of worker
+threads fed through a bounded queue: the producer (typically a database cursor) blocks when the
+workers fall behind, so memory stays flat while disk I/O overlaps the fetch.
+
+"""
+
+import hashlib
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+
+from globals import LOG_LEVEL, MATERIALIZE_QUEUE_SIZE, MATERIALIZE_WORKERS
+from modules import cry_metrics
+
+logging.basicConfig(level=LOG_LEVEL)
+
+# Outcomes of a materialization job
+WRITTEN = 'written'
+UNCHANGED = 'unchanged'
+REMOVED = 'removed'
+FAILED = 'errors'
+
+# (sha256 digest, mtime_ns, size) of every file this module wrote or hashed, keyed by path.
+# A digest is trusted only while the file's mtime and size are unchanged.
+_digests = {}
+
+# Called as callback(path, digest) after every file this module writes or removes; digest is None on removal
+_listeners = []
+
+_throughput = cry_metrics.Histogram(buckets=(10, 100, 1000, 5000, 10000, 50000, 100000))
+_totals_lock = threading.Lock()
+_totals = {WRITTEN: 0, UNCHANGED: 0, REMOVED: 0, FAILED: 0}
+_last_run = {}
+
+
+def _digest(data):
+    return hashlib.sha256(data).digest()
+
+
+def add_listener(callback):
+    """Register `callback(path, digest)` to be told of every file written or removed through this module."""
+    _listeners.append(callback)
+
+
+def _notify(path, digest):
+    for callback in _listeners:
+        try:
+            callback(path, digest)
+        except Exception as e:
+            logging.error(f"Materializer listener failed for '{path}': {str(e)}")
+
+
+def file_digest(path):
+    """Return the sha256 digest of the file at `path`, or None if there is no file.
+
+    The file is only read if it changed since its digest was last recorded.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        _digests.pop(path, None)
+        return None
+    known = _digests.get(path)
+    if known is not None and known[1:] == (stat.st_mtime_ns, stat.st_size):
+        return known[0]
+    with open(path, 'rb') as existing_file:
+        digest = _digest(existing_file.read())
+    _digests[path] = (digest, stat.st_mtime_ns, stat.st_size)
+    return digest
+
+
+def write_file(path, data):
+    """Atomically write `data` to `path`, creating its directory, unless the file already holds it.
+
+    Returns:
+        str: WRITTEN or UNCHANGED.
+    """
+    digest = _digest(data)
+    if file_digest(path) == digest:
+        return UNCHANGED
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    temp_path = os.path.join(directory, f".{os.path.basename(path)}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(temp_path, 'wb') as temp_file:
+            temp_file.write(data)
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    stat = os.stat(path)
+    _digests[path] = (digest, stat.st_mtime_ns, stat.st_size)
+    _notify(path, digest)
+    return WRITTEN
+
+
+def remove_file(path):
+    """Remove the file at `path` if it exists.
+
+    Returns:
+        str: REMOVED, or UNCHANGED if there was no file.
+    """
+    _digests.pop(path, None)
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return UNCHANGED
+    _notify(path, None)
+    return REMOVED
+
+
+class Pipeline:
+    """A bounded producer/consumer queue drained by worker threads.
+
+    Jobs are callables returning one of the outcome constants; exceptions are logged and counted
+    as FAILED. Use as a context manager: leaving the block waits for every submitted job.
+
+    Args:
+        name (str): Name used in logs and thread names.
+        workers (int): Number of worker threads.
+        queue_size (int): Maximum number of queued jobs before `submit` blocks.
+    """
+
+    def __init__(self, name, workers=MATERIALIZE_WORKERS, queue_size=MATERIALIZE_QUEUE_SIZE):
+        self.name = name
+        self.counts = {WRITTEN: 0, UNCHANGED: 0, REMOVED: 0, FAILED: 0}
+        self._counts_lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._threads = [threading.Thread(target=self._work, name=f"cry-{name}-{i}", daemon=True)
+                         for i in range(workers)]
+        self._started_at = None
+
+    def __enter__(self):
+        self._started_at = time.perf_counter()
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def submit(self, func, *args):
+        """Queue `func(*args)`, blocking while the queue is full."""
+        self._queue.put((func, args))
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            func, args = job
+            try:
+                outcome = func(*args)
+            except Exception as e:
+                logging.error(f"Error in {self.name} job: {str(e)}")
+                outcome = FAILED
+            with self._counts_lock:
+                self.counts[outcome] += 1
+
+    def close(self):
+        """Wait for every queued job, stop the workers and record the run's throughput."""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        elapsed = time.perf_counter() - self._started_at
+        jobs = sum(self.counts.values())
+        files_per_second = jobs / elapsed if elapsed > 0 else 0.0
+        if jobs:
+            _throughput.observe(files_per_second)
+        with _totals_lock:
+            for outcome, count in self.counts.items():
+                _totals[outcome] += count
+            _last_run[self.name] = {**self.counts, 'seconds': elapsed, 'files_per_second': files_per_second}
+        logging.info(f"{self.name}: {jobs} files in {elapsed:.2f} s ({files_per_second:.0f} files/s) - "
+                     f"{self.counts[WRITTEN]} written, {self.counts[UNCHANGED]} unchanged, "
+                     f"{self.counts[REMOVED]} removed, {self.counts[FAILED]} failed")
+
+
+def stats():
+    """Return totals, the last run of each pipeline and the throughput histogram.
+
+    Returns:
+        dict: Materializer stats.
+    """
+    with _totals_lock:
+        return {
+            'workers': MATERIALIZE_WORKERS,
+            'queue_size': MATERIALIZE_QUEUE_SIZE,
+            'tracked_files': len(_digests),
+            **_totals,
+            'last_run': {name: dict(run) for name, run in _last_run.items()},
+            'files_per_second': _throughput.snapshot(),
+        }
+
+
+cry_metrics.register('materializer', stats)
@@ -0,0 +1,98 @@
+"""
+cry_metrics
+~~~~~~~~~~~
+
+This module provides lightweight, thread-safe metric primitives and a registry of
+stats providers. Components register a callable returning a dictionary of their
+counters, and the metrics route collects all of them into one snapshot.
+
+"""
+
+import logging
+import threading
+
+from globals import LOG_LEVEL
+
+logging.basicConfig(level=LOG_LEVEL)
+
+# Upper bounds (seconds) of the default latency buckets
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+class Histogram:
+    """A thread-safe histogram with fixed bucket upper bounds.
+
+    Args:
+        buckets (tuple): Ascending bucket upper bounds. Values above the last bound are counted in '+Inf'.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        """Record one observed value."""
+        index = len(self.buckets)
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = position
+                break
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.total += value
+            if value > self.max:
+                self.max = value
+
+    def snapshot(self):
+        """Return the histogram as a dictionary.
+
+        Returns:
+            dict: Count, sum, mean, max and the per-bucket counts (non-cumulative).
+        """
+        with self._lock:
+            buckets = {f"<={bound}": count for bound, count in zip(self.buckets, self._counts)}
+            buckets['+Inf'] = self._counts[-1]
+            return {
+                'count': self.count,
+                'sum': self.total,
+                'mean': self.total / self.count if self.count else 0.0,
+                'max': self.max,
+                'buckets': buckets,
+            }
+
+
+def register(name, provider):
+    """Register a stats provider under `name`.
+
+    Args:
+        name (str): The key the provider's stats are reported under.
+        provider (callable): A function returning a JSON-serialisable dictionary.
+    """
+    with _providers_lock:
+        _providers[name] = provider
+
+
+def collect():
+    """Collect the stats of every registered provider.
+
+    Returns:
+        dict: Provider name mapped to its stats, or to an error message if the provider failed.
+    """
+    with _providers_lock:
+        providers = dict(_providers)
+    snapshot = {}
+    for name, provider in sorted(providers.items()):
+        try:
+            snapshot[name] = provider()
+        except Exception as e:
+            logging.error(f"Error collecting metrics from '{name}': {str(e)}")
+            snapshot[name] = {'error': str(e)}
+    return snapshot
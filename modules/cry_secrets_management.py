@@ -5,18 +5,37 @@ cry_secrets_management
 This module provides utilities for managing secrets within the application.
 It includes functions to create, retrieve, update, and delete secrets, as well as manage secret buckets.
 
+Existence checks and listings are answered from the in-memory index in `cry_index`.
+Buckets can opt in to an in-memory cache of decrypted values, keyed by (app, bucket, secret).
+Every write path and the database sync invalidate the affected entries and wake the watchers of the secret.
+
 """
 
 import base64
+import binascii
 import json
 import os
+import sys
+import threading
+import time
 import uuid
 import logging
 
-from globals import bucket_cache, SECRETS_DIR, SECRET_KEY_FILE, server_env, KEY_SALT_DELIMITER
+from globals import (bucket_cache, SECRETS_DIR, SECRET_KEY_FILE, KEY_SALT_DELIMITER, CHANGE_FEED_PAGE_SIZE,
+                     LISTING_PAGE_SIZE, LISTING_SCAN_LIMIT, SECRET_TAGS_MAX,
+                     SECRET_CACHE_ENABLED, SECRET_CACHE_MAX_ENTRIES, SECRET_CACHE_MAX_BYTES, SECRET_CACHE_TTL)
+from modules import cry_config_registry
 from modules import cry_database
 from modules import cry_encryption
+from modules import cry_index
+from modules import cry_keyring
+from modules import cry_local_digests
+from modules import cry_materializer
+from modules import cry_metrics
 from modules import cry_utils
+from modules import cry_watch
+from modules import cry_write_coalescer
+from modules.cry_cache import LRUCache
 
 # Initialize the logger for this module
 logging.basicConfig(level=logging.INFO)
@@ -33,6 +52,17 @@ class SecretError(Exception):
     pass
 
 
+# Decrypted secrets keyed by (app_name, bucket, secret_name)
+_secret_cache = LRUCache(max_entries=SECRET_CACHE_MAX_ENTRIES, ttl=SECRET_CACHE_TTL,
+                         max_bytes=SECRET_CACHE_MAX_BYTES, sizeof=sys.getsizeof)
+
+# Bumped on every change to a secret, so a read that raced with a write never caches the old value
+_secret_generations = {}
+_secret_generations_lock = threading.Lock()
+
+cry_metrics.register('secret_cache', lambda: _secret_cache.stats())
+
+
 def _read_key_salt_from_file(bucket, app_name):
     """Internal utility to read the key and salt from the bucket's files."""
     secret_master_key_path = os.path.join(SECRETS_DIR, app_name, bucket, SECRET_KEY_FILE)
@@ -42,12 +72,33 @@ def _read_key_salt_from_file(bucket, app_name):
         raise BucketError(f"Combined Key or Salt file not found for bucket '{bucket}'.")
 
     with open(secret_master_key_path, 'rb') as key_salt_file:
-        combined_key_salt = key_salt_file.read().decode('utf-8')
-        key_str, salt_str = combined_key_salt.split(KEY_SALT_DELIMITER)  # Using constant as delimiter
-        key = base64.b64decode(key_str.encode('utf-8'))
-        salt = base64.b64decode(salt_str.encode('utf-8'))
+        combined_key_salt = key_salt_file.read()
+
+    # Remember the record so later operations on this bucket are served from memory
+    cry_keyring.set_bucket_key(app_name, bucket, combined_key_salt)
+    return cry_keyring.parse_key_salt(combined_key_salt)
+
+
+def _get_key_salt(bucket, app_name):
+    """Internal utility to resolve a bucket's key and salt, reading the key file only on a key ring miss."""
+    key_salt = cry_keyring.get_key_salt(app_name, bucket)
+    if key_salt is None:
+        key_salt = _read_key_salt_from_file(bucket, app_name)
+    return key_salt
+
 
-    return key, salt
+def invalidate_bucket_key(bucket, app_name):
+    """Drop the cached derived key for a bucket, e.g. before its key file is replaced."""
+    try:
+        _, salt = _get_key_salt(bucket, app_name)
+    except (BucketError, ValueError):
+        return False
+    return cry_encryption.invalidate_derived_key(salt)
+
+
+def is_valid_secret_name(secret_name):
+    """Return whether a secret name is non-empty and cannot leave its bucket directory as a file name."""
+    return bool(secret_name) and secret_name not in ('.', '..') and '/' not in secret_name and '\x00' not in secret_name
 
 
 def _get_secret_file_path(bucket, secret_name, app_name):
@@ -57,7 +108,7 @@ def _get_secret_file_path(bucket, secret_name, app_name):
 
 def bucket_exists(bucket, app_name):
     """Check if the specified bucket exists."""
-    return os.path.exists(os.path.join(SECRETS_DIR, app_name, bucket))
+    return cry_index.bucket_exists(app_name, bucket)
 
 
 def create_bucket(bucket, app_name):
@@ -81,12 +132,15 @@ def create_bucket(bucket, app_name):
             logging.error(f"Error while creating bucket: {str(e)}")
             raise BucketError('Failed to create bucket.')
 
-        os.makedirs(os.path.join(SECRETS_DIR, app_name, bucket))
+        os.makedirs(os.path.join(SECRETS_DIR, app_name, bucket), exist_ok=True)
 
         # Write the combined key and salt in binary format
         with open(os.path.join(SECRETS_DIR, app_name, bucket, SECRET_KEY_FILE), 'wb') as combined_file:
             combined_file.write(combined_key_salt.encode('utf-8'))
 
+        cry_keyring.set_bucket_key(app_name, bucket, combined_key_salt)
+        cry_index.add_bucket(app_name, bucket)
+
         bucket_cache[(app_name, bucket)] = {
             'client_id': client_id,
         }
@@ -98,103 +152,500 @@ def create_bucket(bucket, app_name):
 
 def secret_exists(bucket, secret_name, app_name):
     """Check if a secret associated with a service name exists within a bucket."""
-    return os.path.exists(_get_secret_file_path(bucket, secret_name, app_name))
+    return cry_index.secret_exists(app_name, bucket, secret_name)
+
+
+def _secret_cache_enabled(bucket, app_name):
+    """Return whether decrypted values of the bucket may be cached."""
+    bucket_config = get_bucket_config(bucket, app_name) or {}
+    return bool(bucket_config.get('cache_secrets', SECRET_CACHE_ENABLED))
+
+
+def notify_secret_changed(bucket, secret_name, app_name, deleted=False):
+    """Update everything held in memory for a secret after it was written, updated or deleted, and wake its watchers.
+
+    Called by the write paths of this module and by the database sync.
+    """
+    if deleted:
+        cry_index.remove_secret(app_name, bucket, secret_name)
+    else:
+        cry_index.add_secret(app_name, bucket, secret_name)
+    cache_key = (app_name, bucket, secret_name)
+    with _secret_generations_lock:
+        _secret_generations[cache_key] = _secret_generations.get(cache_key, 0) + 1
+        _secret_cache.invalidate(cache_key)
+    cry_watch.publish(app_name, bucket, secret_name)
+
+
+def invalidate_bucket_secrets(bucket, app_name):
+    """Drop every cached decrypted secret of a bucket.
+
+    Returns:
+        int: The number of cache entries removed.
+    """
+    with _secret_generations_lock:
+        cache_keys = []
+
+        def in_bucket(cache_key):
+            if cache_key[0] == app_name and cache_key[1] == bucket:
+                cache_keys.append(cache_key)
+                return True
+            return False
+
+        removed = _secret_cache.invalidate_matching(in_bucket)
+        for cache_key in cache_keys:
+            _secret_generations[cache_key] = _secret_generations.get(cache_key, 0) + 1
+    return removed
+
+
+def secret_cache_stats():
+    """Return the decrypted-secret cache counters, including hit ratio and bytes held."""
+    return _secret_cache.stats()
 
 
 def store_secret(bucket, secret_name, secret, app_name):
     """Store an encrypted secret within a specified bucket and service name."""
     secret_path = _get_secret_file_path(bucket, secret_name, app_name)
-    key, salt = _read_key_salt_from_file(bucket, app_name)
+    key, salt = _get_key_salt(bucket, app_name)
     if isinstance(secret, bytes):
         secret = secret.decode()
     encrypted_secret = cry_encryption.encrypt_string(secret, salt)
-    cry_database.save_secret(bucket, secret_name, encrypted_secret, app_name)
-    with open(secret_path, 'wb') as secret_file:
-        secret_file.write(encrypted_secret)
+    cry_write_coalescer.save_secret(bucket, secret_name, encrypted_secret, app_name)
+    cry_materializer.write_file(secret_path, encrypted_secret)
+    notify_secret_changed(bucket, secret_name, app_name)
+
+
+def import_secrets(bucket, secrets, app_name, overwrite=False):
+    """Store many secrets in one bucket with a single key lookup, parallel encryption and one transaction.
+
+    Args:
+        bucket (str): The name of the bucket.
+        secrets (list): (secret_name, secret) pairs.
+        app_name (str): Application Name for the Bucket.
+        overwrite (bool): Replace secrets that already exist instead of reporting them.
+
+    Returns:
+        list: One {'secret_name', 'status'} dict per input pair, in order. The status is 'created',
+            'updated', 'exists' (already present and overwrite not set), 'invalid' (empty, unsafe or
+            repeated name) or 'failed' (encryption error), with a 'message' for the last three.
+
+    Raises:
+        BucketError: If the bucket does not exist or its key cannot be read.
+        Exception: If the database write fails. No secret of the batch is stored.
+    """
+    if not bucket_exists(bucket, app_name):
+        raise BucketError(f"Bucket '{bucket}' not found.")
+    key, salt = _get_key_salt(bucket, app_name)
+
+    results = []
+    accepted = []
+    seen = set()
+    for secret_name, secret in secrets:
+        result = {'secret_name': secret_name}
+        results.append(result)
+        if not is_valid_secret_name(secret_name):
+            result.update(status='invalid', message="Secret name is empty, '.' or '..', or contains '/' or a NUL character.")
+            continue
+        if secret_name in seen:
+            result.update(status='invalid', message='Secret name is repeated in the request.')
+            continue
+        seen.add(secret_name)
+        exists = cry_index.secret_exists(app_name, bucket, secret_name)
+        if exists and not overwrite:
+            result.update(status='exists', message=f"Secret '{secret_name}' already exists in bucket '{bucket}'.")
+            continue
+        result['status'] = 'updated' if exists else 'created'
+        if isinstance(secret, bytes):
+            secret = secret.decode()
+        accepted.append((result, secret))
+
+    encrypted = cry_encryption.encrypt_many([(secret, salt) for _, secret in accepted], return_exceptions=True)
+    writes = []
+    for (result, _), encrypted_secret in zip(accepted, encrypted):
+        if isinstance(encrypted_secret, Exception):
+            logger.error(f"Error encrypting secret '{result['secret_name']}': {str(encrypted_secret)}")
+            result.update(status='failed', message='Failed to encrypt secret.')
+            continue
+        writes.append((result['secret_name'], encrypted_secret))
+    if not writes:
+        return results
+
+    cry_database.write_secrets_batch([('save', app_name, bucket, secret_name, encrypted_secret)
+                                      for secret_name, encrypted_secret in writes])
+
+    # The rows are committed; a file that fails to write here is restored by the next anti-entropy pass
+    with cry_materializer.Pipeline('import-materializer') as pipeline:
+        for secret_name, encrypted_secret in writes:
+            pipeline.submit(cry_materializer.write_file, _get_secret_file_path(bucket, secret_name, app_name),
+                            encrypted_secret)
+    for secret_name, _ in writes:
+        notify_secret_changed(bucket, secret_name, app_name)
+    logger.info(f"Imported {len(writes)} of {len(results)} secrets into bucket '{bucket}' of app '{app_name}'.")
+    return results
+
+
+def get_secret_etag(bucket, secret_name, app_name):
+    """Return a strong version tag of a stored secret: the hex sha256 of its ciphertext file.
+
+    The file is only re-hashed when it changed since it was last written or hashed, and nothing is decrypted.
+
+    Returns:
+        str: The tag, or None if the secret does not exist.
+    """
+    if not cry_index.secret_exists(app_name, bucket, secret_name):
+        return None
+    digest = cry_materializer.file_digest(_get_secret_file_path(bucket, secret_name, app_name))
+    return digest.hex() if digest is not None else None
+
+
+def get_bucket_etag(bucket, app_name):
+    """Return a strong version tag of every secret in a bucket: its local digest, or '' if it holds no secrets.
+
+    The digest covers the names and ciphertexts of the bucket's secrets, so it is the same on every node that
+    has synced the bucket and across restarts, and it is kept current without re-hashing the bucket.
+    """
+    return cry_local_digests.bucket_digest(app_name, bucket)
+
+
+def _watch(app_name, bucket, secret_name, version, timeout, current_version):
+    """Wait until `current_version()` differs from `version` or `timeout` seconds pass.
+
+    The waiter is registered before the first comparison, so a change made in between is not missed.
+    Without a version there is nothing to wait for and the current version is returned at once.
+
+    Returns:
+        tuple: (changed, current version).
+    """
+    if version is None:
+        return True, current_version()
+    deadline = time.monotonic() + timeout
+    with cry_watch.waiter(app_name, bucket, secret_name) as changed:
+        while True:
+            current = current_version()
+            remaining = deadline - time.monotonic()
+            if current != version or remaining <= 0:
+                return current != version, current
+            changed.wait(remaining)
+            changed.clear()
+
+
+def watch_secret(bucket, secret_name, app_name, version, timeout):
+    """Block until a secret's ETag differs from `version`, or until `timeout` seconds pass.
+
+    A missing secret has the version '', so a watch on '' returns once the secret is created.
+
+    Returns:
+        tuple: (changed, current version).
+
+    Raises:
+        cry_watch.WatchLimitError: If every watch slot is taken.
+    """
+    return _watch(app_name, bucket, secret_name, version, timeout,
+                  lambda: get_secret_etag(bucket, secret_name, app_name) or '')
+
+
+def watch_bucket(bucket, app_name, version, timeout):
+    """Block until any secret of a bucket is created, changed or deleted past `version`, or `timeout` seconds pass.
+
+    Returns:
+        tuple: (changed, current version as returned by get_bucket_etag).
+
+    Raises:
+        cry_watch.WatchLimitError: If every watch slot is taken.
+    """
+    return _watch(app_name, bucket, None, version, timeout, lambda: get_bucket_etag(bucket, app_name))
 
 
 def retrieve_secret(bucket, secret_name, app_name):
     """Retrieve and decrypt a secret from the specified bucket and service name."""
-    secret_path = _get_secret_file_path(bucket, secret_name, app_name)
-    if not os.path.exists(secret_path):
+    cache_key = (app_name, bucket, secret_name)
+    use_cache = _secret_cache_enabled(bucket, app_name)
+    if use_cache:
+        cached_secret = _secret_cache.get(cache_key)
+        if cached_secret is not None:
+            return cached_secret
+        generation = _secret_generations.get(cache_key, 0)
+
+    if not cry_index.secret_exists(app_name, bucket, secret_name):
+        raise SecretError(f"Service '{secret_name}' not found in bucket '{bucket}'.")
+    key, salt = _get_key_salt(bucket, app_name)
+    try:
+        with open(_get_secret_file_path(bucket, secret_name, app_name), 'rb') as secret_file:
+            encrypted_secret = secret_file.read()
+    except FileNotFoundError:
         raise SecretError(f"Service '{secret_name}' not found in bucket '{bucket}'.")
-    key, salt = _read_key_salt_from_file(bucket, app_name)
-    with open(secret_path, 'rb') as secret_file:
-        encrypted_secret = secret_file.read()
     decrypted_secret = cry_encryption.decrypt_string(encrypted_secret, salt)
+
+    if use_cache:
+        with _secret_generations_lock:
+            if _secret_generations.get(cache_key, 0) == generation:
+                _secret_cache.put(cache_key, decrypted_secret)
     return decrypted_secret
 
 
+def retrieve_secrets(bucket, secret_names, app_name):
+    """Retrieve and decrypt many secrets of one bucket with a single key lookup and a batch decrypt.
+
+    Args:
+        bucket (str): The name of the bucket.
+        secret_names (list): Names of the secrets to retrieve, or None for every secret in the bucket.
+        app_name (str): Application Name for the Bucket.
+
+    Returns:
+        dict: 'secrets' maps each retrieved name to its value, 'missing' lists the names not in the
+            bucket and 'failed' the names whose value could not be decrypted, both in request order.
+
+    Raises:
+        BucketError: If the bucket does not exist or its key cannot be read.
+    """
+    if not bucket_exists(bucket, app_name):
+        raise BucketError(f"Bucket '{bucket}' not found.")
+    if secret_names is None:
+        secret_names = cry_index.list_secrets(app_name, bucket)
+
+    use_cache = _secret_cache_enabled(bucket, app_name)
+    secrets = {}
+    missing = []
+    failed = []
+    pending = []
+    for secret_name in dict.fromkeys(secret_names):
+        cache_key = (app_name, bucket, secret_name)
+        generation = None
+        if use_cache:
+            cached_secret = _secret_cache.get(cache_key)
+            if cached_secret is not None:
+                secrets[secret_name] = cached_secret
+                continue
+            generation = _secret_generations.get(cache_key, 0)
+
+        if not cry_index.secret_exists(app_name, bucket, secret_name):
+            missing.append(secret_name)
+            continue
+        try:
+            with open(_get_secret_file_path(bucket, secret_name, app_name), 'rb') as secret_file:
+                pending.append((secret_name, secret_file.read(), generation))
+        except FileNotFoundError:
+            missing.append(secret_name)
+
+    if pending:
+        key, salt = _get_key_salt(bucket, app_name)
+        decrypted = cry_encryption.decrypt_many([(encrypted_secret, salt) for _, encrypted_secret, _ in pending],
+                                                return_exceptions=True)
+        for (secret_name, _, generation), decrypted_secret in zip(pending, decrypted):
+            if isinstance(decrypted_secret, Exception):
+                logger.error(f"Error decrypting secret '{secret_name}' of bucket '{bucket}': {str(decrypted_secret)}")
+                failed.append(secret_name)
+                continue
+            secrets[secret_name] = decrypted_secret
+            if use_cache:
+                cache_key = (app_name, bucket, secret_name)
+                with _secret_generations_lock:
+                    if _secret_generations.get(cache_key, 0) == generation:
+                        _secret_cache.put(cache_key, decrypted_secret)
+
+    return {'secrets': secrets, 'missing': missing, 'failed': failed}
+
+
 def update_secret(bucket, secret_name, new_secret, app_name):
     """Update and re-encrypt a secret associated with a service name within a bucket."""
     secret_path = _get_secret_file_path(bucket, secret_name, app_name)
-    if not os.path.exists(secret_path):
+    if not cry_index.secret_exists(app_name, bucket, secret_name):
         raise SecretError(f"Service '{secret_name}' not found in bucket '{bucket}'.")
-    key, salt = _read_key_salt_from_file(bucket, app_name)
+    key, salt = _get_key_salt(bucket, app_name)
     encrypted_secret = cry_encryption.encrypt_string(new_secret, salt)
-    cry_database.update_secret(bucket, secret_name, encrypted_secret, app_name)
-    with open(secret_path, 'wb') as secret_file:
-        secret_file.write(encrypted_secret)
+    cry_write_coalescer.update_secret(bucket, secret_name, encrypted_secret, app_name)
+    cry_materializer.write_file(secret_path, encrypted_secret)
+    notify_secret_changed(bucket, secret_name, app_name)
 
 
 def delete_secret(bucket, secret_name, app_name):
     """Delete a secret and its associated file within a bucket."""
-    cry_database.delete_secret(bucket, secret_name, app_name)
-    secret_path = _get_secret_file_path(bucket, secret_name, app_name)
-    if os.path.exists(secret_path):
-        os.remove(secret_path)
+    cry_write_coalescer.delete_secret(bucket, secret_name, app_name)
+    cry_materializer.remove_file(_get_secret_file_path(bucket, secret_name, app_name))
+    notify_secret_changed(bucket, secret_name, app_name, deleted=True)
 
 
 def get_buckets():
-    """Retrieve a list of all buckets available as (app_name, bucket_name) pairs."""
-    try:
-        app_paths = [f.path for f in os.scandir(SECRETS_DIR) if f.is_dir()]
-        bucket_pairs = []
-        for app_path in app_paths:
-            app_name = os.path.basename(app_path)
-            bucket_names = [f.name for f in os.scandir(app_path) if f.is_dir()]
-            for bucket_name in bucket_names:
-                bucket_pairs.append((app_name, bucket_name))
-        return bucket_pairs
-    except FileNotFoundError:
-        return []
+    """Retrieve a sorted list of all buckets available as (app_name, bucket_name) pairs."""
+    return cry_index.list_buckets()
 
 
 def get_secrets(bucket, app_name):
-    """Retrieve a list of all secrets stored within a specified bucket."""
-    bucket_directory = os.path.join(SECRETS_DIR, app_name, bucket)
-    if not os.path.exists(bucket_directory):
-        return []
-    secret_names = []
-    for secret_file in os.listdir(bucket_directory):
-        if secret_file.endswith(".json"):
-            secret_name = os.path.splitext(secret_file)[0]
-            secret_names.append(secret_name)
-    return secret_names
+    """Retrieve a sorted list of all secrets stored within a specified bucket."""
+    return cry_index.list_secrets(app_name, bucket)
+
+
+def get_buckets_page(cursor=None, limit=LISTING_PAGE_SIZE, app_name=None, prefix='', pattern=None):
+    """Retrieve one page of the sorted (app_name, bucket_name) pairs, optionally filtered.
+
+    Args:
+        cursor (str, optional): The next_cursor of the previous page. None starts at the first bucket.
+        limit (int): The maximum number of buckets to return.
+        app_name (str, optional): Only buckets of this application are returned.
+        prefix (str): Only buckets whose name starts with this prefix are returned.
+        pattern (str, optional): Only buckets whose name matches this glob pattern are returned.
+
+    Returns:
+        dict: 'buckets' lists the pairs and 'next_cursor' is the cursor of the next page, or None on the last page.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    after = _decode_cursor(cursor, (str, str)) if cursor else None
+    buckets, last = cry_index.page_buckets(limit, after, app_name, prefix, pattern, LISTING_SCAN_LIMIT)
+    return {'buckets': buckets, 'next_cursor': _encode_cursor(last) if last is not None else None}
+
+
+def get_secrets_page(bucket, app_name, cursor=None, limit=LISTING_PAGE_SIZE, prefix='', pattern=None):
+    """Retrieve one page of the sorted secret names of a bucket, optionally filtered.
+
+    Args:
+        bucket (str): The name of the bucket.
+        app_name (str): Application Name for the Bucket.
+        cursor (str, optional): The next_cursor of the previous page. None starts at the first name.
+        limit (int): The maximum number of names to return.
+        prefix (str): Only names starting with this prefix are returned.
+        pattern (str, optional): Only names matching this glob pattern are returned.
+
+    Returns:
+        dict: 'secrets' lists the names and 'next_cursor' is the cursor of the next page, or None on the last page.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    after = _decode_cursor(cursor, (str,))[0] if cursor else None
+    names, last = cry_index.page_secrets(app_name, bucket, limit, after, prefix, pattern, LISTING_SCAN_LIMIT)
+    return {'secrets': names, 'next_cursor': _encode_cursor([last]) if last is not None else None}
+
+
+def _validate_tags(tags):
+    """Raise ValueError unless `tags` is a dict of at most SECRET_TAGS_MAX string keys and values.
+
+    Keys and values may not contain ',' and keys may not contain '=', the separators of tag queries.
+    """
+    if not isinstance(tags, dict):
+        raise ValueError('Tags must be an object of tag keys and values.')
+    if len(tags) > SECRET_TAGS_MAX:
+        raise ValueError(f"A secret can carry at most {SECRET_TAGS_MAX} tags.")
+    for key, value in tags.items():
+        if not isinstance(key, str) or not 0 < len(key) <= 128 or ',' in key or '=' in key:
+            raise ValueError(f"Invalid tag key '{key}'.")
+        if not isinstance(value, str) or len(value) > 256 or ',' in value:
+            raise ValueError(f"Invalid value for tag '{key}'.")
+
+
+def set_secret_tags(bucket, secret_name, tags, app_name):
+    """Replace the tags of a secret. An empty dict removes every tag.
+
+    Raises:
+        ValueError: If the tags are invalid.
+        SecretError: If the secret does not exist.
+    """
+    _validate_tags(tags)
+    if not cry_index.secret_exists(app_name, bucket, secret_name) or \
+            not cry_database.set_secret_tags(bucket, secret_name, tags, app_name):
+        raise SecretError(f"Service '{secret_name}' not found in bucket '{bucket}'.")
+    cry_index.set_tags(app_name, bucket, secret_name, tags)
+
+
+def get_secret_tags(bucket, secret_name, app_name):
+    """Return the tags of a secret as {tag_key: tag_value}.
+
+    Raises:
+        SecretError: If the secret does not exist.
+    """
+    if not cry_index.secret_exists(app_name, bucket, secret_name):
+        raise SecretError(f"Service '{secret_name}' not found in bucket '{bucket}'.")
+    return cry_index.get_tags(app_name, bucket, secret_name)
+
+
+def find_secrets_by_tags(bucket, app_name, tags):
+    """Return the sorted names of the secrets of a bucket carrying every tag in `tags`, from the tag index.
+
+    Raises:
+        BucketError: If the bucket does not exist.
+        ValueError: If no tag is given or the tags are invalid.
+    """
+    if not bucket_exists(bucket, app_name):
+        raise BucketError(f"Bucket '{bucket}' not found.")
+    if not tags:
+        raise ValueError('At least one tag is required.')
+    _validate_tags(tags)
+    return cry_index.find_by_tags(app_name, bucket, tags)
+
+
+def get_secrets_etag(bucket, app_name):
+    """Return a strong version tag of a bucket's secret listing: the hex sha256 of its sorted names."""
+    return cry_index.names_digest(app_name, bucket)
+
+
+def _encode_cursor(position):
+    """Encode a listing or feed position, a list of strings and integers, as an opaque URL-safe cursor."""
+    return base64.urlsafe_b64encode(json.dumps(list(position)).encode('utf-8')).decode('ascii')
+
+
+def _decode_cursor(cursor, types):
+    """Decode a cursor made by `_encode_cursor` whose items have the given types, raising ValueError if it does not."""
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (binascii.Error, UnicodeError, TypeError, ValueError):
+        raise ValueError('Invalid cursor.')
+    if (not isinstance(position, list) or len(position) != len(types)
+            or not all(type(item) is item_type for item, item_type in zip(position, types))):
+        raise ValueError('Invalid cursor.')
+    return tuple(position)
+
+
+def get_changes(bucket, app_name, cursor=None, limit=CHANGE_FEED_PAGE_SIZE):
+    """Retrieve the secrets of a bucket created, updated or deleted since a cursor, one page at a time.
+
+    Each secret changed since the cursor appears once, at its latest write, in commit-safe order; earlier
+    writes to it are not returned, so this is not a full history. A deleted secret appears with deleted set.
+    Pass the returned cursor to the next call; while has_more is set the next page is already available.
+
+    Args:
+        bucket (str): The name of the bucket.
+        app_name (str): Application Name for the Bucket.
+        cursor (str, optional): The cursor returned by the previous call. None starts from the first change.
+        limit (int): The maximum number of changes to return.
+
+    Returns:
+        dict: 'changes' lists {'secret_name', 'deleted', 'updated_at'} dicts, 'cursor' is the position after
+            them and 'has_more' tells whether more changes are waiting.
+
+    Raises:
+        BucketError: If the bucket does not exist.
+        ValueError: If the cursor is malformed.
+    """
+    if not bucket_exists(bucket, app_name):
+        raise BucketError(f"Bucket '{bucket}' not found.")
+    after = _decode_cursor(cursor, (int, str)) if cursor else None
+    rows, horizon = cry_database.get_bucket_changes(bucket, app_name, after, limit)
+
+    has_more = len(rows) >= limit
+    if has_more:
+        position = rows[-1][:2]
+    else:
+        # Every change below the horizon has been returned, so the next page can start there
+        position = max(after, (horizon, '')) if after is not None else (horizon, '')
+    return {
+        'changes': [{'secret_name': secret_name, 'deleted': deleted,
+                     'updated_at': updated_at.isoformat() if updated_at is not None else None}
+                    for _, secret_name, deleted, updated_at in rows],
+        'cursor': _encode_cursor(position),
+        'has_more': has_more,
+    }
 
 
 def get_bucket_config(bucket_name, app_name):
     """
-    Load the bucket-specific configuration by searching through the 'config' directory and its subdirectories.
+    Load the bucket-specific configuration from the bucket config registry.
 
     Args:
         bucket_name (str): The name of the bucket.
         app_name (str): Application Name for the Bucket.
 
     Returns:
-        dict: Configuration data for the bucket or None if not found.
-    """
-    config_dir = os.path.join('config', server_env, app_name)
-    for root, dirs, files in os.walk(config_dir):
-        if f"{bucket_name}.json" in files:
-            config_path = os.path.join(root, f"{bucket_name}.json")
-            try:
-                with open(config_path, 'r') as config_file:
-                    config = json.load(config_file)
-                return config
-            except Exception as e:
-                logging.error(f"Error reading or parsing config file {config_path}: {str(e)}")
-                return None
-
-    return None
-
+        dict: Configuration data for the bucket or None if not found. The dictionary is shared and read-only.
+    """
+    return cry_config_registry.get_bucket_config(bucket_name, app_name)
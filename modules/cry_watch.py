@@ -0,0 +1,105 @@
+"""
+cry_watch
+~~~~~~~~~
+
+This module is the in-process change notifier behind the long-poll watch route. Every change to a
+secret - from the write paths, the database sync or anti-entropy - is published here by
+`cry_secrets_management.notify_secret_changed`, and wakes the waiters registered on that secret or
+on its bucket.
+
+Waiters only learn that something changed; the versions they compare - a secret's ETag and a
+bucket's digest from `cry_local_digests` - are derived from the stored ciphertexts, so they agree
+across nodes and restarts.
+
+Each waiter parks one server thread, so the registry is bounded by WATCH_MAX_WAITERS, sized from
+SERVER_THREADS: once it is full, `waiter` raises WatchLimitError at once and the caller falls back
+to polling, leaving the remaining threads free for ordinary requests.
+
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+
+from globals import (LOG_LEVEL, SERVER_THREADS, WATCH_MAX_WAITERS, KDF_EXECUTOR_WORKERS,
+                     KDF_EXECUTOR_MAX_QUEUE)
+from modules import cry_metrics
+
+logging.basicConfig(level=LOG_LEVEL)
+
+
+class WatchLimitError(Exception):
+    """Exception raised when every waiter slot is taken."""
+    pass
+
+
+# Events of the registered waiters keyed by (app_name, bucket_name, secret_name); secret_name is None for a bucket
+_waiters = {}
+_waiters_lock = threading.Lock()
+_active = 0
+_counters = {'published': 0, 'woken': 0, 'registered': 0, 'rejected': 0}
+
+
+if WATCH_MAX_WAITERS + KDF_EXECUTOR_WORKERS + KDF_EXECUTOR_MAX_QUEUE >= SERVER_THREADS:
+    logging.warning(f"{WATCH_MAX_WAITERS} watch waiters and {KDF_EXECUTOR_WORKERS + KDF_EXECUTOR_MAX_QUEUE} key "
+                    f"derivations can occupy all {SERVER_THREADS} server threads; raise CRY_SERVER_THREADS "
+                    f"or lower CRY_WATCH_MAX_WAITERS.")
+
+
+@contextmanager
+def waiter(app_name, bucket_name, secret_name=None):
+    """Register a waiter on a secret, or on every secret of a bucket when secret_name is None.
+
+    Yields:
+        threading.Event: Set by `publish` on every matching change. Clear it before waiting again.
+
+    Raises:
+        WatchLimitError: If WATCH_MAX_WAITERS waiters are already registered.
+    """
+    global _active
+    key = (app_name, bucket_name, secret_name)
+    event = threading.Event()
+    with _waiters_lock:
+        if _active >= WATCH_MAX_WAITERS:
+            _counters['rejected'] += 1
+            raise WatchLimitError(f"All {WATCH_MAX_WAITERS} watch slots are in use.")
+        _active += 1
+        _counters['registered'] += 1
+        _waiters.setdefault(key, set()).add(event)
+    try:
+        yield event
+    finally:
+        with _waiters_lock:
+            _active -= 1
+            events = _waiters.get(key)
+            events.discard(event)
+            if not events:
+                del _waiters[key]
+
+
+def publish(app_name, bucket_name, secret_name):
+    """Wake the waiters on a changed secret and on its bucket."""
+    with _waiters_lock:
+        _counters['published'] += 1
+        for key in ((app_name, bucket_name, secret_name), (app_name, bucket_name, None)):
+            for event in _waiters.get(key, ()):
+                event.set()
+                _counters['woken'] += 1
+
+
+def stats():
+    """Return the number of registered waiters and the notifier counters.
+
+    Returns:
+        dict: Watch stats.
+    """
+    with _waiters_lock:
+        return {
+            'server_threads': SERVER_THREADS,
+            'max_waiters': WATCH_MAX_WAITERS,
+            'waiters': _active,
+            **_counters,
+        }
+
+
+cry_metrics.register('watch', stats)
@@ -0,0 +1,164 @@
+"""
+cry_write_coalescer
+~~~~~~~~~~~~~~~~~~~
+
+This module group-commits concurrent secret writes. Callers of `save_secret`, `update_secret` and
+`delete_secret` queue their write and block; a single committer thread gathers the writes that
+arrive within WRITE_COALESCE_MAX_DELAY seconds (up to WRITE_COALESCE_MAX_BATCH of them), applies
+them with multi-row statements in one transaction and wakes every caller with its own result.
+
+If a batch fails, its writes are retried one by one so that a single bad write only fails its
+own caller. Batch sizes and commit latencies are recorded as histograms.
+
+"""
+
+import logging
+import queue
+import threading
+import time
+
+from globals import LOG_LEVEL, WRITE_COALESCE_ENABLED, WRITE_COALESCE_MAX_BATCH, WRITE_COALESCE_MAX_DELAY
+from modules import cry_database
+from modules import cry_metrics
+
+logging.basicConfig(level=LOG_LEVEL)
+
+
+class _PendingWrite:
+    """A queued write and the caller waiting for it."""
+
+    __slots__ = ('write', 'done', 'error')
+
+    def __init__(self, write):
+        self.write = write
+        self.done = threading.Event()
+        self.error = None
+
+
+_queue = queue.Queue()
+_committer = None
+_committer_lock = threading.Lock()
+
+_batch_size = cry_metrics.Histogram(buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500))
+_commit_time = cry_metrics.Histogram()
+_counters_lock = threading.Lock()
+_counters = {'writes': 0, 'batches': 0, 'fallbacks': 0, 'errors': 0}
+
+
+def _count(name, delta=1):
+    with _counters_lock:
+        _counters[name] += delta
+
+
+def _collect_batch():
+    """Block for the first write, then gather more until the batch is full or the delay has passed."""
+    batch = [_queue.get()]
+    deadline = time.monotonic() + WRITE_COALESCE_MAX_DELAY
+    while len(batch) < WRITE_COALESCE_MAX_BATCH:
+        remaining = deadline - time.monotonic()
+        try:
+            batch.append(_queue.get(timeout=remaining) if remaining > 0 else _queue.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+
+def _commit(batch):
+    """Apply a batch in one transaction, falling back to one transaction per write if it fails."""
+    start = time.perf_counter()
+    try:
+        cry_database.write_secrets_batch([pending.write for pending in batch])
+    except Exception as e:
+        if len(batch) == 1:
+            batch[0].error = e
+            _count('errors')
+        else:
+            _count('fallbacks')
+            logging.warning(f"Batch of {len(batch)} secret writes failed. Retrying writes individually.")
+            for pending in batch:
+                try:
+                    cry_database.write_secrets_batch([pending.write])
+                except Exception as write_error:
+                    pending.error = write_error
+                    _count('errors')
+    _commit_time.observe(time.perf_counter() - start)
+    _batch_size.observe(len(batch))
+    _count('batches')
+    _count('writes', len(batch))
+    for pending in batch:
+        pending.done.set()
+
+
+def _run():
+    while True:
+        batch = _collect_batch()
+        try:
+            _commit(batch)
+        except Exception as e:
+            # Never leave a caller waiting
+            logging.error(f"Unexpected error committing secret writes: {str(e)}")
+            for pending in batch:
+                if not pending.done.is_set():
+                    pending.error = e
+                    pending.done.set()
+
+
+def _ensure_committer():
+    global _committer
+    if _committer is not None and _committer.is_alive():
+        return
+    with _committer_lock:
+        if _committer is None or not _committer.is_alive():
+            _committer = threading.Thread(target=_run, name='cry-write-coalescer', daemon=True)
+            _committer.start()
+
+
+def _submit(operation, bucket_name, secret_name, encrypted_secret, app_name):
+    """Queue one write and wait for the batch that carries it to commit."""
+    write = (operation, app_name, bucket_name, secret_name, encrypted_secret)
+    if not WRITE_COALESCE_ENABLED:
+        cry_database.write_secrets_batch([write])
+        return
+    _ensure_committer()
+    pending = _PendingWrite(write)
+    _queue.put(pending)
+    pending.done.wait()
+    if pending.error is not None:
+        raise pending.error
+
+
+def save_secret(bucket_name, secret_name, encrypted_secret, app_name):
+    """Save or update a secret in the database, committed together with concurrent writes."""
+    _submit('save', bucket_name, secret_name, encrypted_secret, app_name)
+
+
+def update_secret(bucket_name, secret_name, encrypted_secret, app_name):
+    """Update an existing secret in the database, committed together with concurrent writes."""
+    _submit('update', bucket_name, secret_name, encrypted_secret, app_name)
+
+
+def delete_secret(bucket_name, secret_name, app_name):
+    """Tombstone a secret in the database, committed together with concurrent writes."""
+    _submit('delete', bucket_name, secret_name, None, app_name)
+
+
+def stats():
+    """Return the coalescer settings, counters and batch-size and commit-latency histograms.
+
+    Returns:
+        dict: Coalescer stats.
+    """
+    with _counters_lock:
+        counters = dict(_counters)
+    return {
+        'enabled': WRITE_COALESCE_ENABLED,
+        'max_batch': WRITE_COALESCE_MAX_BATCH,
+        'max_delay': WRITE_COALESCE_MAX_DELAY,
+        'queued': _queue.qsize(),
+        **counters,
+        'batch_size': _batch_size.snapshot(),
+        'commit_time_seconds': _commit_time.snapshot(),
+    }
+
+
+cry_metrics.register('write_coalescer', stats)
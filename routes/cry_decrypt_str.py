@@ -2,13 +2,14 @@
 cry_decrypt_string.py
 ---------------------
 
-Module for decrypting encrypted strings using a provided salt.
+Module for decrypting encrypted strings using a provided salt, one at a time or in batches.
 """
 
 from http import HTTPStatus
 from flask_restx import Namespace, Resource, fields
-from globals import LOG_LEVEL
+from globals import LOG_LEVEL, CRYPTO_BATCH_MAX_ITEMS, CRYPTO_BATCH_MAX_SALTS
 from modules import cry_encryption
+from modules.cry_kdf_executor import KdfExecutorError
 import logging
 
 # Initialize logging with the specified log level
@@ -22,6 +23,11 @@ decrypt_model = ns.model('Decrypt', {
     'salt': fields.String(required=True, description='Salt used for decryption'),
 })
 
+# Model for the batch decryption request payload
+decrypt_batch_model = ns.model('DecryptBatch', {
+    'items': fields.List(fields.Nested(decrypt_model), required=True, description='Texts and salts to decrypt'),
+})
+
 
 @ns.route('/decrypt_string')
 class DecryptString(Resource):
@@ -37,6 +43,7 @@ class DecryptString(Resource):
         # HTTPStatus.BAD_REQUEST: 'Invalid data provided.',
         # HTTPStatus.UNAUTHORIZED: 'Invalid token or unauthorized access.',
         HTTPStatus.INTERNAL_SERVER_ERROR: 'Internal server error encountered.',
+        HTTPStatus.SERVICE_UNAVAILABLE: 'Key derivation capacity exhausted.',
     })
     def post(self):
         """
@@ -62,6 +69,73 @@ class DecryptString(Resource):
             decrypted_text = cry_encryption.decrypt_text(text, salt)
             logging.info("String decrypted successfully.")
             return {'decrypted_text': decrypted_text}, HTTPStatus.OK
+        except KdfExecutorError as e:
+            logging.warning(f"Key derivation unavailable: {str(e)}")
+            return {'error': str(e)}, HTTPStatus.SERVICE_UNAVAILABLE
         except Exception as e:
             logging.error(f"Error decrypting text: {str(e)}")
             return {'error': 'Failed to decrypt text. Please try again later.'}, HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@ns.route('/decrypt_strings')
+class DecryptStrings(Resource):
+    """
+    Resource class for decrypting strings in batches.
+    Provides an endpoint for decrypting many text strings in one request, deriving each distinct salt once.
+    """
+
+    @ns.expect(decrypt_batch_model, validate=True)
+    @ns.doc(responses={
+        HTTPStatus.OK: 'Batch processed. Each item reports its decrypted text or an error.',
+        HTTPStatus.BAD_REQUEST: 'Invalid data provided.',
+        HTTPStatus.INTERNAL_SERVER_ERROR: 'Internal server error encountered.',
+        HTTPStatus.SERVICE_UNAVAILABLE: 'Key derivation capacity exhausted.',
+    })
+    def post(self):
+        """
+        Decrypts the provided text strings using their salts.
+
+        Returns
+        -------
+        dict
+            A dictionary containing one result per item, in request order, or an error message.
+        int
+            An HTTP status code.
+        """
+
+        data = ns.payload
+        items = data.get('items')
+        if not items or not all(item.get('text') and item.get('salt') for item in items):
+            logging.warning("Empty batch or item without text or salt provided for decryption.")
+            return {'message': 'A non-empty list of texts and salts for decryption is required.'}, \
+                HTTPStatus.BAD_REQUEST
+
+        if len(items) > CRYPTO_BATCH_MAX_ITEMS:
+            logging.warning(f"Batch of {len(items)} texts exceeds the limit of {CRYPTO_BATCH_MAX_ITEMS}.")
+            return {'message': f"At most {CRYPTO_BATCH_MAX_ITEMS} texts can be decrypted per request."}, \
+                HTTPStatus.BAD_REQUEST
+
+        if len({item['salt'] for item in items}) > CRYPTO_BATCH_MAX_SALTS:
+            logging.warning(f"Batch uses more than {CRYPTO_BATCH_MAX_SALTS} distinct salts.")
+            return {'message': f"At most {CRYPTO_BATCH_MAX_SALTS} distinct salts can be decrypted per request."}, \
+                HTTPStatus.BAD_REQUEST
+
+        try:
+            results = cry_encryption.decrypt_texts([(item['text'], item['salt']) for item in items])
+            decrypted_texts = []
+            for result in results:
+                if isinstance(result, Exception):
+                    logging.warning(f"Error decrypting batch item: {str(result)}")
+                    decrypted_texts.append({'error': 'Failed to decrypt text.'})
+                else:
+                    decrypted_texts.append(result)
+            logging.info(f"Batch of {len(items)} strings processed for decryption.")
+            return {'decrypted_texts': decrypted_texts}, HTTPStatus.OK
+        except KdfExecutorError as e:
+            logging.warning(f"Key derivation unavailable: {str(e)}")
+            return {'error': str(e)}, HTTPStatus.SERVICE_UNAVAILABLE
+        except ValueError as e:
+            return {'message': str(e)}, HTTPStatus.BAD_REQUEST
+        except Exception as e:
+            logging.error(f"Error decrypting texts: {str(e)}")
+            return {'error': 'Failed to decrypt texts. Please try again later.'}, HTTPStatus.INTERNAL_SERVER_ERROR
@@ -2,13 +2,14 @@
 cry_encrypt_str.py
 ------------------
 
-Module for encrypting provided text strings.
+Module for encrypting provided text strings, one at a time or in batches.
 """
 
 from http import HTTPStatus
 from flask_restx import Namespace, Resource, fields
-from globals import LOG_LEVEL
+from globals import LOG_LEVEL, CRYPTO_BATCH_MAX_ITEMS
 from modules import cry_encryption
+from modules.cry_kdf_executor import KdfExecutorError
 import logging
 
 # Initialize logging with the specified log level
@@ -21,6 +22,11 @@ encrypt_model = ns.model('Encrypt', {
     'text': fields.String(required=True, description='Text to be encrypted'),
 })
 
+# Model for the batch encryption request payload
+encrypt_batch_model = ns.model('EncryptBatch', {
+    'texts': fields.List(fields.String, required=True, description='Texts to be encrypted'),
+})
+
 
 @ns.route('/encrypt_string')
 class EncryptString(Resource):
@@ -36,6 +42,7 @@ class EncryptString(Resource):
         # HTTPStatus.BAD_REQUEST: 'Invalid data provided.',
         # HTTPStatus.UNAUTHORIZED: 'Invalid token or unauthorized access.',
         HTTPStatus.INTERNAL_SERVER_ERROR: 'Internal server error encountered.',
+        HTTPStatus.SERVICE_UNAVAILABLE: 'Key derivation capacity exhausted.',
     })
     def post(self):
         """
@@ -54,6 +61,52 @@ class EncryptString(Resource):
             encrypted_text = cry_encryption.encrypt_text(text)
             logging.info("String encrypted successfully.")
             return {'encrypted_text': encrypted_text}, HTTPStatus.OK
+        except KdfExecutorError as e:
+            logging.warning(f"Key derivation unavailable: {str(e)}")
+            return {'error': str(e)}, HTTPStatus.SERVICE_UNAVAILABLE
         except Exception as e:
             logging.error(f"Error encrypting text: {str(e)}")
             return {'error': 'Failed to encrypt text. Please try again later.'}, HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@ns.route('/encrypt_strings')
+class EncryptStrings(Resource):
+    """
+    Resource class for encrypting strings in batches.
+    Provides an endpoint for encrypting many text strings in one request under a single derived key.
+    """
+
+    @ns.expect(encrypt_batch_model, validate=True)
+    @ns.doc(responses={
+        HTTPStatus.OK: 'Strings encrypted successfully.',
+        HTTPStatus.BAD_REQUEST: 'Invalid data provided.',
+        HTTPStatus.INTERNAL_SERVER_ERROR: 'Internal server error encountered.',
+        HTTPStatus.SERVICE_UNAVAILABLE: 'Key derivation capacity exhausted.',
+    })
+    def post(self):
+        """
+        Post endpoint.
+        Encrypts the provided text strings and returns the encrypted values in the same order.
+        """
+
+        data = ns.payload
+        texts = data.get('texts')
+        if not texts or not all(texts):
+            logging.warning("Empty batch or empty text provided for encryption.")
+            return {'message': 'A non-empty list of texts to be encrypted is required.'}, HTTPStatus.BAD_REQUEST
+
+        if len(texts) > CRYPTO_BATCH_MAX_ITEMS:
+            logging.warning(f"Batch of {len(texts)} texts exceeds the limit of {CRYPTO_BATCH_MAX_ITEMS}.")
+            return {'message': f"At most {CRYPTO_BATCH_MAX_ITEMS} texts can be encrypted per request."}, \
+                HTTPStatus.BAD_REQUEST
+
+        try:
+            encrypted_texts = cry_encryption.encrypt_texts(texts)
+            logging.info(f"{len(texts)} strings encrypted successfully.")
+            return {'encrypted_texts': encrypted_texts}, HTTPStatus.OK
+        except KdfExecutorError as e:
+            logging.warning(f"Key derivation unavailable: {str(e)}")
+            return {'error': str(e)}, HTTPStatus.SERVICE_UNAVAILABLE
+        except Exception as e:
+            logging.error(f"Error encrypting texts: {str(e)}")
+            return {'error': 'Failed to encrypt texts. Please try again later.'}, HTTPStatus.INTERNAL_SERVER_ERROR
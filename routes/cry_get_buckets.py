@@ -2,19 +2,29 @@
 cry_get_buckets.py
 ------------------
 
-Module for retrieving the list of available buckets.
+Module for retrieving the list of available buckets, in full or one filtered page at a time.
 """
 
 import logging
-from flask_restx import Namespace, Resource
+from flask_restx import Namespace, Resource, reqparse
 from modules import cry_secrets_management
-from globals import LOG_LEVEL
+from globals import LOG_LEVEL, LISTING_PAGE_SIZE, LISTING_MAX_PAGE_SIZE
 
 # Initialize logging with the specified log level
 logging.basicConfig(level=LOG_LEVEL)
 
 ns = Namespace('get_buckets', description='Route Namespace to retrieve available buckets.')
 
+# Query arguments for paginated listing; without any of them the full list is returned
+listing_parser = reqparse.RequestParser()
+listing_parser.add_argument('cursor', location='args', required=False, help='next_cursor of the previous page')
+listing_parser.add_argument('limit', location='args', required=False, type=int,
+                            help=f"Buckets per page, at most {LISTING_MAX_PAGE_SIZE}")
+listing_parser.add_argument('app_name', location='args', required=False, help='Only buckets of this application')
+listing_parser.add_argument('prefix', location='args', required=False, help='Only buckets starting with this prefix')
+listing_parser.add_argument('pattern', location='args', required=False,
+                            help="Only buckets matching this glob pattern, e.g. 'team-*'")
+
 
 @ns.route('/buckets')
 class Buckets(Resource):
@@ -23,14 +33,33 @@ class Buckets(Resource):
     Provides an endpoint to list all buckets.
     """
 
+    @ns.expect(listing_parser, validate=True)
     @ns.response(200, 'Buckets retrieved successfully.')
+    @ns.response(400, 'Invalid cursor or limit.')
     @ns.response(500, 'Internal Server Error.')
     def get(self):
         """
         Get endpoint.
-        Returns a list of all available buckets.
+        Returns a list of all available buckets, or with any of cursor, limit, app_name, prefix or pattern
+        one page of them along with the next_cursor, or None on the last page.
         """
 
+        args = listing_parser.parse_args()
+        if any(args.get(name) is not None for name in ('cursor', 'limit', 'app_name', 'prefix', 'pattern')):
+            limit = LISTING_PAGE_SIZE if args.get('limit') is None else args.get('limit')
+            if not 0 < limit <= LISTING_MAX_PAGE_SIZE:
+                return {'message': f"limit must be between 1 and {LISTING_MAX_PAGE_SIZE}."}, 400
+            try:
+                page = cry_secrets_management.get_buckets_page(args.get('cursor'), limit, args.get('app_name'),
+                                                               args.get('prefix') or '', args.get('pattern'))
+                logging.info(f"Retrieved a page of {len(page['buckets'])} buckets successfully.")
+                return page, 200
+            except ValueError as e:
+                return {'message': str(e)}, 400
+            except Exception as e:
+                logging.error(f"Error retrieving buckets: {str(e)}")
+                return {'error': 'Failed to retrieve buckets. Please try again later.'}, 500
+
         try:
             # Retrieve the list of buckets
             buckets = cry_secrets_management.get_buckets()
@@ -0,0 +1,80 @@
+"""
+cry_get_changes.py
+------------------
+
+Module for reading the change feed of a bucket, so clients can keep a local mirror in sync incrementally.
+"""
+
+import logging
+from http import HTTPStatus
+
+from flask import g
+from flask_restx import Namespace, Resource
+
+from globals import auth_parser, LOG_LEVEL, CHANGE_FEED_PAGE_SIZE, CHANGE_FEED_MAX_PAGE_SIZE
+from modules import cry_secrets_management
+from modules.cry_auth import auth
+from modules.cry_auth_helpers import ip_whitelist_required
+
+logging.basicConfig(level=LOG_LEVEL)
+
+ns = Namespace('get_changes', description='Namespace for reading the change feed of a bucket.')
+
+# Query arguments of the change feed
+changes_parser = auth_parser.copy()
+changes_parser.add_argument('cursor', location='args', required=False,
+                            help='Cursor returned by the previous page; omit to start from the first change')
+changes_parser.add_argument('limit', location='args', required=False, type=int,
+                            help=f"Changes per page, at most {CHANGE_FEED_MAX_PAGE_SIZE}")
+
+
+@ns.route('/<string:app_name>/<string:bucket>')
+class GetChanges(Resource):
+    """
+    Resource to page through the secrets of a bucket created, updated or deleted since a cursor.
+    """
+
+    @auth.login_required
+    @ns.expect(changes_parser, validate=True)
+    @ns.doc(security='apikey', params={'app_name': 'Name of the Application', 'bucket': 'Name of the bucket'})
+    @ns.response(HTTPStatus.OK, 'Changes successfully retrieved.')
+    @ns.response(HTTPStatus.BAD_REQUEST, 'Invalid cursor or limit.')
+    @ns.response(HTTPStatus.NOT_FOUND, 'Bucket not found.')
+    @ns.response(HTTPStatus.UNAUTHORIZED, 'Unauthorized access.')
+    @ns.response(HTTPStatus.INTERNAL_SERVER_ERROR, 'Internal server error encountered.')
+    @ip_whitelist_required
+    def get(self, bucket, app_name):
+        """
+        GET method to retrieve one page of changes of the specified bucket.
+
+        :param bucket: Name of the bucket.
+        :param app_name: Application Name for the Bucket.
+        :return: A JSON response with the changed secret names, the cursor for the next page and whether more
+            changes are waiting.
+        """
+        if not hasattr(g, 'bucket_name'):
+            logging.error("bucket_name not found in global context. Token might not be set properly.")
+            return {'message': 'Unauthorized access.'}, HTTPStatus.UNAUTHORIZED
+
+        if g.bucket_name != bucket or g.app_name != app_name:
+            return {'message': 'Unauthorized access to this bucket.'}, HTTPStatus.UNAUTHORIZED
+
+        args = changes_parser.parse_args()
+        limit = CHANGE_FEED_PAGE_SIZE if args.get('limit') is None else args.get('limit')
+        if not 0 < limit <= CHANGE_FEED_MAX_PAGE_SIZE:
+            return {'message': f"limit must be between 1 and {CHANGE_FEED_MAX_PAGE_SIZE}."}, HTTPStatus.BAD_REQUEST
+
+        try:
+            page = cry_secrets_management.get_changes(bucket, app_name, args.get('cursor'), limit)
+            logging.info(f"Fetched {len(page['changes'])} changes of bucket '{bucket}'.")
+            return page, HTTPStatus.OK
+
+        except cry_secrets_management.BucketError:
+            return {'message': f"Bucket '{bucket}' not found."}, HTTPStatus.NOT_FOUND
+
+        except ValueError as e:
+            return {'message': str(e)}, HTTPStatus.BAD_REQUEST
+
+        except Exception as e:
+            logging.error(f"Error fetching changes of bucket '{bucket}': {str(e)}")
+            return {'error': 'Internal server error'}, HTTPStatus.INTERNAL_SERVER_ERROR
@@ -7,10 +7,11 @@ Module for retrieving a stored secret based on the specified bucket and secret n
 
 import json
 import jwt
-from flask import g
+from flask import g, request, Response
 from flask_restx import Namespace, Resource
 from http import HTTPStatus
 import logging
+from werkzeug.http import quote_etag
 from globals import auth_parser, LOG_LEVEL
 from modules import cry_secrets_management
 from modules.cry_auth import auth
@@ -33,6 +34,7 @@ class GetSecret(Resource):
                                     'secret_name': 'Name of the secret'}, validate=True)
     @ns.doc(security='apikey')
     @ns.response(HTTPStatus.OK, 'Secret successfully retrieved.')
+    @ns.response(HTTPStatus.NOT_MODIFIED, 'Secret unchanged since the ETag given in If-None-Match.')
     @ns.response(HTTPStatus.NOT_FOUND, 'Bucket or secret not found.')
     @ns.response(HTTPStatus.UNAUTHORIZED, 'Unauthorized access.')
     @ns.response(HTTPStatus.INTERNAL_SERVER_ERROR, 'Internal server error encountered.')
@@ -44,7 +46,8 @@ class GetSecret(Resource):
         :param bucket: Name of the bucket containing the secret.
         :param secret_name: Name of the secret to retrieve.
         :param app_name: Application Name for the Bucket.
-        :return: A JSON response containing the secret or an error message.
+        :return: A JSON response containing the secret or an error message. The secret is sent with an ETag;
+            a request whose If-None-Match holds the current ETag gets an empty 304 without decrypting.
         """
         if not hasattr(g, 'bucket_name'):
             logging.error("bucket_name not found in global context. Token might not be set properly.")
@@ -62,9 +65,13 @@ class GetSecret(Resource):
                 logging.warning(f"Secret for '{secret_name}' not found in bucket '{bucket}'.")
                 return {'message': f"Secret for '{secret_name}' not found in bucket '{bucket}'."}, HTTPStatus.NOT_FOUND
 
+            etag = cry_secrets_management.get_secret_etag(bucket, secret_name, app_name)
+            if etag is not None and request.if_none_match.contains_weak(etag):
+                return Response(status=HTTPStatus.NOT_MODIFIED, headers={'ETag': quote_etag(etag)})
+
             secret = cry_secrets_management.retrieve_secret(bucket, secret_name, app_name)
             logging.info(f"Successfully fetched secret for '{secret_name}' from bucket '{bucket}'.")
-            return {'secret': secret}, HTTPStatus.OK
+            return {'secret': secret}, HTTPStatus.OK, {'ETag': quote_etag(etag)} if etag is not None else {}
 
         except jwt.ExpiredSignatureError:
             logging.error("Token validation failed: Token has expired.")
@@ -0,0 +1,89 @@
+"""
+cry_get_secrets.py
+------------------
+
+Module for retrieving many stored secrets of one bucket in a single request.
+"""
+
+from flask import g
+from flask_restx import Namespace, Resource, fields
+from http import HTTPStatus
+import logging
+
+from globals import auth_parser, LOG_LEVEL, CRYPTO_BATCH_MAX_ITEMS
+from modules import cry_secrets_management
+from modules.cry_auth import auth
+from modules.cry_auth_helpers import ip_whitelist_required
+from modules.cry_kdf_executor import KdfExecutorError
+
+logging.basicConfig(level=LOG_LEVEL)
+
+ns = Namespace('get_secrets', description='Namespace for fetching many stored secrets at once.')
+
+# Model for the multi-get request payload
+get_secrets_model = ns.model('GetSecrets', {
+    'secret_names': fields.List(fields.String, required=False, description='Names of the secrets to retrieve'),
+    'all': fields.Boolean(required=False, default=False, description='Retrieve every secret in the bucket')
+})
+
+
+@ns.route('/<string:app_name>/<string:bucket>')
+class GetSecrets(Resource):
+    """
+    Resource to fetch several secrets, or all of them, from a given bucket.
+    """
+
+    @auth.login_required
+    @ns.expect(auth_parser, get_secrets_model, validate=True)
+    @ns.doc(security='apikey', params={'app_name': 'Name of the Application', 'bucket': 'Name of the bucket'})
+    @ns.response(HTTPStatus.OK, 'Secrets retrieved; missing and undecryptable names are listed separately.')
+    @ns.response(HTTPStatus.BAD_REQUEST, 'Invalid data provided.')
+    @ns.response(HTTPStatus.NOT_FOUND, 'Bucket not found.')
+    @ns.response(HTTPStatus.UNAUTHORIZED, 'Unauthorized access.')
+    @ns.response(HTTPStatus.INTERNAL_SERVER_ERROR, 'Internal server error encountered.')
+    @ns.response(HTTPStatus.SERVICE_UNAVAILABLE, 'Key derivation capacity exhausted.')
+    @ip_whitelist_required
+    def post(self, bucket, app_name):
+        """
+        POST method to retrieve the named secrets, or every secret, of the specified bucket.
+
+        :param bucket: Name of the bucket containing the secrets.
+        :param app_name: Application Name for the Bucket.
+        :return: A JSON response with the secrets by name and the names that are missing or failed to decrypt.
+        """
+        if not hasattr(g, 'bucket_name'):
+            logging.error("bucket_name not found in global context. Token might not be set properly.")
+            return {'message': 'Unauthorized access.'}, HTTPStatus.UNAUTHORIZED
+
+        if g.bucket_name != bucket or g.app_name != app_name:
+            return {'message': 'Unauthorized access to this bucket.'}, HTTPStatus.UNAUTHORIZED
+
+        data = ns.payload or {}
+        secret_names = data.get('secret_names')
+        if data.get('all'):
+            if secret_names:
+                return {'message': "Provide either 'secret_names' or 'all', not both."}, HTTPStatus.BAD_REQUEST
+            secret_names = None
+        elif not secret_names or not all(secret_names):
+            return {'message': "A non-empty list of secret names or 'all' is required."}, HTTPStatus.BAD_REQUEST
+        elif len(secret_names) > CRYPTO_BATCH_MAX_ITEMS:
+            return {'message': f"At most {CRYPTO_BATCH_MAX_ITEMS} secrets can be retrieved per request."}, \
+                HTTPStatus.BAD_REQUEST
+
+        try:
+            result = cry_secrets_management.retrieve_secrets(bucket, secret_names, app_name)
+            logging.info(f"Fetched {len(result['secrets'])} secrets from bucket '{bucket}', "
+                         f"{len(result['missing'])} missing, {len(result['failed'])} failed.")
+            return result, HTTPStatus.OK
+
+        except cry_secrets_management.BucketError as e:
+            logging.warning(f"Bucket '{bucket}' not found when trying to fetch secrets: {str(e)}")
+            return {'message': f"Bucket '{bucket}' not found."}, HTTPStatus.NOT_FOUND
+
+        except KdfExecutorError as e:
+            logging.warning(f"Key derivation unavailable: {str(e)}")
+            return {'error': str(e)}, HTTPStatus.SERVICE_UNAVAILABLE
+
+        except Exception as e:
+            logging.error(f"Unexpected error of type {type(e).__name__} encountered: {str(e)}")
+            return {'error': 'An unexpected error occurred.'}, HTTPStatus.INTERNAL_SERVER_ERROR
@@ -2,15 +2,16 @@
 cry_get_secrets_list.py
 -----------------------
 
-Module for retrieving a list of secrets based on the specified bucket.
+Module for retrieving a list of secrets based on the specified bucket, in full or one filtered page at a time.
 """
 
 import logging
 from http import HTTPStatus
 
-from flask import g
+from flask import g, request, Response
 from flask_restx import Namespace, Resource
-from globals import LOG_LEVEL, auth_parser
+from werkzeug.http import quote_etag
+from globals import LOG_LEVEL, auth_parser, LISTING_PAGE_SIZE, LISTING_MAX_PAGE_SIZE
 from modules import cry_secrets_management
 from modules.cry_auth import auth
 from modules.cry_auth_helpers import ip_whitelist_required
@@ -19,6 +20,15 @@ logging.basicConfig(level=LOG_LEVEL)
 
 ns = Namespace('get_secrets_list', description='Get Secrets List Route Namespace')
 
+# Query arguments for paginated listing; without any of them the full list is returned
+listing_parser = auth_parser.copy()
+listing_parser.add_argument('cursor', location='args', required=False, help='next_cursor of the previous page')
+listing_parser.add_argument('limit', location='args', required=False, type=int,
+                            help=f"Secrets per page, at most {LISTING_MAX_PAGE_SIZE}")
+listing_parser.add_argument('prefix', location='args', required=False, help='Only secrets starting with this prefix')
+listing_parser.add_argument('pattern', location='args', required=False,
+                            help="Only secrets matching this glob pattern, e.g. 'db_*'")
+
 
 @ns.route('/get_secrets_list/<string:app_name>/<string:bucket>')
 class GetSecretList(Resource):
@@ -27,11 +37,12 @@ class GetSecretList(Resource):
     """
 
     @auth.login_required
-    @ns.expect(auth_parser, params={'app_name': 'Name of the Application',
-                                    'bucket': 'Name of the bucket',
-                                    'secret_name': 'Name of the secret'}, validate=True)
+    @ns.expect(listing_parser, params={'app_name': 'Name of the Application',
+                                       'bucket': 'Name of the bucket'}, validate=True)
     @ns.doc(security='apikey')
     @ns.response(HTTPStatus.OK, 'Secret successfully retrieved.')
+    @ns.response(HTTPStatus.NOT_MODIFIED, 'Secrets list unchanged since the ETag given in If-None-Match.')
+    @ns.response(HTTPStatus.BAD_REQUEST, 'Invalid cursor or limit.')
     @ns.response(HTTPStatus.NOT_FOUND, 'Bucket or secret not found.')
     @ns.response(HTTPStatus.UNAUTHORIZED, 'Unauthorized access.')
     @ns.response(HTTPStatus.INTERNAL_SERVER_ERROR, 'Internal server error encountered.')
@@ -42,7 +53,9 @@ class GetSecretList(Resource):
 
         :param bucket: Name of the bucket for which to retrieve the secrets list.
         :param app_name: Application Name
-        :return: A JSON response containing a list of secrets or an error message.
+        :return: A JSON response containing a list of secrets or an error message. The full list is sent with an
+            ETag; a request whose If-None-Match holds the current ETag gets an empty 304. With any of cursor,
+            limit, prefix or pattern, one page is returned along with the next_cursor, or None on the last page.
         """
         if not hasattr(g, 'bucket_name'):
             logging.error("bucket_name not found in global context. Token might not be set properly.")
@@ -51,10 +64,30 @@ class GetSecretList(Resource):
         if g.bucket_name != bucket:
             return {'message': 'Unauthorized access to this bucket.'}, HTTPStatus.UNAUTHORIZED
 
+        args = listing_parser.parse_args()
+        if any(args.get(name) is not None for name in ('cursor', 'limit', 'prefix', 'pattern')):
+            limit = LISTING_PAGE_SIZE if args.get('limit') is None else args.get('limit')
+            if not 0 < limit <= LISTING_MAX_PAGE_SIZE:
+                return {'message': f"limit must be between 1 and {LISTING_MAX_PAGE_SIZE}."}, HTTPStatus.BAD_REQUEST
+            try:
+                page = cry_secrets_management.get_secrets_page(bucket, app_name, args.get('cursor'), limit,
+                                                               args.get('prefix') or '', args.get('pattern'))
+                logging.info(f"Successfully fetched a page of {len(page['secrets'])} secrets for bucket '{bucket}'.")
+                return page, HTTPStatus.OK
+            except ValueError as e:
+                return {'message': str(e)}, HTTPStatus.BAD_REQUEST
+            except Exception as e:
+                logging.error(f"Error encountered while fetching secrets list for bucket '{bucket}': {str(e)}")
+                return {'error': str(e)}, 500
+
         try:
+            etag = cry_secrets_management.get_secrets_etag(bucket, app_name)
+            if request.if_none_match.contains_weak(etag):
+                return Response(status=HTTPStatus.NOT_MODIFIED, headers={'ETag': quote_etag(etag)})
+
             secrets_list = cry_secrets_management.get_secrets(bucket, app_name)
             logging.info(f"Successfully fetched secrets list for bucket '{bucket}'.")
-            return {'secrets': secrets_list}, 200
+            return {'secrets': secrets_list}, 200, {'ETag': quote_etag(etag)}
         except Exception as e:
             logging.error(f"Error encountered while fetching secrets list for bucket '{bucket}': {str(e)}")
             return {'error': str(e)}, 500
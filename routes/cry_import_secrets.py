@@ -0,0 +1,102 @@
+"""
+cry_import_secrets.py
+---------------------
+
+Module for creating or replacing many secrets of one bucket in a single request.
+"""
+
+from flask import g
+from flask_restx import Namespace, Resource, fields
+from http import HTTPStatus
+import logging
+
+from globals import auth_parser, LOG_LEVEL, CRYPTO_BATCH_MAX_ITEMS
+from modules import cry_secrets_management
+from modules.cry_auth import auth
+from modules.cry_auth_helpers import ip_whitelist_required
+
+# Initialize logging with the specified log level from globals
+logging.basicConfig(level=LOG_LEVEL)
+
+ns = Namespace('import_secrets', description='Bulk Secret Import Route Namespace')
+
+# Define the model for one secret of the import
+import_item_model = ns.model('ImportSecret', {
+    'secret_name': fields.String(required=True, description='Secret name'),
+    'secret': fields.String(required=True, description='The secret data')
+})
+
+# Define the model for the import request payload
+import_model = ns.model('ImportSecrets', {
+    'app_name': fields.String(required=True, description='Application Name'),
+    'bucket': fields.String(required=True, description='Bucket name'),
+    'secrets': fields.List(fields.Nested(import_item_model), required=True, description='Secrets to import'),
+    'overwrite': fields.Boolean(required=False, default=False,
+                                description='Replace existing secrets instead of reporting them')
+})
+
+
+@ns.route('/')
+class ImportSecretsResource(Resource):
+    """
+    Resource class for bulk secret import. Provides an endpoint for storing many secrets of one bucket at once.
+    """
+
+    @auth.login_required
+    @ns.expect(auth_parser, import_model, validate=True)
+    @ns.doc(security='apikey')
+    @ns.doc(
+        responses={
+            HTTPStatus.OK: 'Import processed; see the per-secret status.',
+            HTTPStatus.BAD_REQUEST: 'Invalid data provided.',
+            HTTPStatus.UNAUTHORIZED: 'Invalid token or unauthorized access.',
+            HTTPStatus.NOT_FOUND: 'Bucket not found.',
+            HTTPStatus.INTERNAL_SERVER_ERROR: 'Internal server error.'
+        })
+    @ip_whitelist_required
+    def post(self):
+        """
+        Endpoint to store many secrets in one bucket. Requires the bucket name and a list of secret names and data.
+        Returns the status of each secret in request order.
+        """
+        data = ns.payload
+        bucket = data.get('bucket')
+        app_name = data.get('app_name')
+        secrets = data.get('secrets') or []
+
+        # Check if bucket_name attribute exists in the g object
+        if not hasattr(g, 'bucket_name'):
+            logging.error("bucket_name not found in global context. Token might not be set properly.")
+            return {'message': 'Unauthorized access.'}, HTTPStatus.UNAUTHORIZED
+
+        # Check if the authenticated user's token app matches the app in the request
+        if g.app_name != app_name:
+            return {'message': 'Unauthorized access to this app_name.'}, HTTPStatus.UNAUTHORIZED
+
+        # Check if the authenticated user's token bucket matches the bucket in the request
+        if g.bucket_name != bucket:
+            return {'message': 'Unauthorized access to this bucket.'}, HTTPStatus.UNAUTHORIZED
+
+        if not secrets:
+            return {'message': 'A non-empty list of secrets is required.'}, HTTPStatus.BAD_REQUEST
+
+        if len(secrets) > CRYPTO_BATCH_MAX_ITEMS:
+            logging.warning(f"Import of {len(secrets)} secrets exceeds the limit of {CRYPTO_BATCH_MAX_ITEMS}.")
+            return {'message': f"At most {CRYPTO_BATCH_MAX_ITEMS} secrets can be imported per request."}, \
+                HTTPStatus.BAD_REQUEST
+
+        logging.info(f"Attempting to import {len(secrets)} secrets into bucket: {bucket}.")
+        try:
+            results = cry_secrets_management.import_secrets(
+                bucket, [(item.get('secret_name'), item.get('secret')) for item in secrets], app_name,
+                overwrite=bool(data.get('overwrite')))
+        except cry_secrets_management.BucketError as e:
+            logging.warning(f"Import into bucket '{bucket}' failed: {str(e)}")
+            return {'message': str(e)}, HTTPStatus.NOT_FOUND
+        except Exception as e:
+            logging.error(f"Error importing secrets into bucket '{bucket}': {str(e)}")
+            return {'error': 'Failed to import secrets. Please try again later.'}, HTTPStatus.INTERNAL_SERVER_ERROR
+
+        stored = sum(1 for result in results if result['status'] in ('created', 'updated'))
+        return {'message': f"{stored} of {len(results)} secrets imported into '{bucket}'.",
+                'results': results}, HTTPStatus.OK
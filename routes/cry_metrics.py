@@ -0,0 +1,41 @@
+"""
+cry_metrics.py
+--------------
+
+Module for reporting the internal metrics of the Secrets Management Service.
+"""
+
+import logging
+from http import HTTPStatus
+
+from flask_restx import Namespace, Resource
+
+from globals import LOG_LEVEL
+from modules import cry_metrics
+
+logging.basicConfig(level=LOG_LEVEL)
+
+ns = Namespace('metrics', description='Metrics for the Secrets Management Service')
+
+
+@ns.route('/')
+class MetricsResource(Resource):
+    """
+    Resource for reporting cache, executor and database metrics.
+    """
+
+    @ns.doc(
+        responses={
+            HTTPStatus.OK: 'Metrics collected successfully.',
+            HTTPStatus.INTERNAL_SERVER_ERROR: 'Internal server error.'
+        })
+    def get(self):
+        """
+        Collect the metrics of every registered component.
+        Returns a JSON object keyed by component name.
+        """
+        try:
+            return {'metrics': cry_metrics.collect()}, HTTPStatus.OK
+        except Exception as e:
+            logging.error(f"Error collecting metrics: {str(e)}")
+            return {'error': 'Internal server error'}, HTTPStatus.INTERNAL_SERVER_ERROR
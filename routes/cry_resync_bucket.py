@@ -0,0 +1,66 @@
+"""
+cry_resync_bucket.py
+--------------------
+
+Module for re-pulling a single bucket from the database on demand in the Secrets Management Service.
+"""
+
+import logging
+from http import HTTPStatus
+
+from flask import request, session
+from flask_restx import Namespace, Resource
+
+from globals import auth_parser, LOG_LEVEL
+from modules import cry_initialize
+from modules.cry_auth_helpers import get_user_email_from_token, verify_sso_token
+
+logging.basicConfig(level=LOG_LEVEL)
+
+ns = Namespace('resync_bucket', description='Namespace for refreshing a bucket from the database.')
+
+
+@ns.route('/<string:app_name>/<string:bucket>')
+class ResyncBucket(Resource):
+    """
+    Resource to re-pull the key, secrets and cache entries of one bucket from the database.
+    """
+
+    @ns.expect(auth_parser, params={'app_name': 'Name of the Application',
+                                    'bucket': 'Name of the bucket'}, validate=True)
+    @ns.doc(security='apikey')
+    @ns.response(HTTPStatus.OK, 'Bucket successfully resynced.')
+    @ns.response(HTTPStatus.NOT_FOUND, 'Bucket not found in the database.')
+    @ns.response(HTTPStatus.UNAUTHORIZED, 'Unauthorized access.')
+    @ns.response(HTTPStatus.INTERNAL_SERVER_ERROR, 'Internal server error encountered.')
+    def post(self, bucket, app_name):
+        """
+        POST method to resync the specified bucket from the database.
+
+        Resyncing is an operator action, so it takes an SSO access token - from the session or an
+        `Authorization: Bearer` header - rather than the bucket's client token.
+
+        :param bucket: Name of the bucket to resync.
+        :param app_name: Application Name for the Bucket.
+        :return: A JSON response with the counts of secrets written, removed and unchanged and the time taken.
+        """
+        access_token = session.get('access_token') or request.headers.get('Authorization')
+        if access_token and access_token.startswith('Bearer '):
+            access_token = access_token[len('Bearer '):]  # Remove the 'Bearer ' prefix
+
+        if not access_token or not verify_sso_token(access_token)[0]:
+            logging.warning(f"Resync of bucket '{bucket}' refused: no valid SSO token.")
+            return {'message': 'Unauthorized access.'}, HTTPStatus.UNAUTHORIZED
+
+        logging.info(f"Resync of bucket '{bucket}' for app '{app_name}' "
+                     f"requested by {get_user_email_from_token(access_token)}.")
+
+        try:
+            result = cry_initialize.resync_bucket(bucket, app_name)
+            if result is None:
+                return {'message': f"Bucket '{bucket}' not found."}, HTTPStatus.NOT_FOUND
+            return result, HTTPStatus.OK
+
+        except Exception as e:
+            logging.error(f"Error resyncing bucket '{bucket}': {str(e)}")
+            return {'error': 'Internal server error'}, HTTPStatus.INTERNAL_SERVER_ERROR
@@ -0,0 +1,175 @@
+"""
+cry_secret_tags.py
+------------------
+
+Module for reading and replacing the key/value tags of secrets, and for finding the secrets of a bucket by tag.
+"""
+
+import logging
+from http import HTTPStatus
+
+from flask import g
+from flask_restx import Namespace, Resource, fields
+
+from globals import auth_parser, LOG_LEVEL
+from modules import cry_secrets_management
+from modules.cry_auth import auth
+from modules.cry_auth_helpers import ip_whitelist_required
+
+logging.basicConfig(level=LOG_LEVEL)
+
+ns = Namespace('secret_tags', description='Namespace for tagging secrets and finding secrets by tag.')
+
+# Model for the tag replacement payload
+tags_model = ns.model('SecretTags', {
+    'tags': fields.Raw(required=True, description='Tags as an object of tag keys and values, e.g. {"env": "prod"}')
+})
+
+# Query arguments of the tag search
+search_parser = auth_parser.copy()
+search_parser.add_argument('tags', location='args', required=True,
+                           help="Comma-separated key=value pairs a secret must all carry, e.g. 'env=prod,team=x'")
+
+
+def _authorize(bucket, app_name):
+    """Return an error response unless the token grants access to the bucket, else None."""
+    if not hasattr(g, 'bucket_name'):
+        logging.error("bucket_name not found in global context. Token might not be set properly.")
+        return {'message': 'Unauthorized access.'}, HTTPStatus.UNAUTHORIZED
+
+    if g.bucket_name != bucket or g.app_name != app_name:
+        return {'message': 'Unauthorized access to this bucket.'}, HTTPStatus.UNAUTHORIZED
+    return None
+
+
+def _parse_tag_query(query):
+    """Parse 'key=value,key=value' into a dict, raising ValueError on a pair without '='."""
+    tags = {}
+    for pair in query.split(','):
+        key, separator, value = pair.partition('=')
+        if not separator or not key.strip():
+            raise ValueError(f"Invalid tag filter '{pair}'; expected key=value.")
+        tags[key.strip()] = value.strip()
+    return tags
+
+
+@ns.route('/<string:app_name>/<string:bucket>')
+class FindSecretsByTags(Resource):
+    """
+    Resource to find the secrets of a bucket carrying a set of tags.
+    """
+
+    @auth.login_required
+    @ns.expect(search_parser, validate=True)
+    @ns.doc(security='apikey', params={'app_name': 'Name of the Application', 'bucket': 'Name of the bucket'})
+    @ns.response(HTTPStatus.OK, 'Matching secrets retrieved.')
+    @ns.response(HTTPStatus.BAD_REQUEST, 'Invalid tag filter.')
+    @ns.response(HTTPStatus.NOT_FOUND, 'Bucket not found.')
+    @ns.response(HTTPStatus.UNAUTHORIZED, 'Unauthorized access.')
+    @ns.response(HTTPStatus.INTERNAL_SERVER_ERROR, 'Internal server error encountered.')
+    @ip_whitelist_required
+    def get(self, bucket, app_name):
+        """
+        GET method to list the secrets of the specified bucket that carry every given tag.
+
+        :param bucket: Name of the bucket to search.
+        :param app_name: Application Name for the Bucket.
+        :return: A JSON response with the sorted names of the matching secrets.
+        """
+        error = _authorize(bucket, app_name)
+        if error is not None:
+            return error
+
+        try:
+            tags = _parse_tag_query(search_parser.parse_args().get('tags') or '')
+            secrets = cry_secrets_management.find_secrets_by_tags(bucket, app_name, tags)
+            logging.info(f"Found {len(secrets)} secrets tagged {tags} in bucket '{bucket}'.")
+            return {'secrets': secrets}, HTTPStatus.OK
+
+        except cry_secrets_management.BucketError:
+            return {'message': f"Bucket '{bucket}' not found."}, HTTPStatus.NOT_FOUND
+
+        except ValueError as e:
+            return {'message': str(e)}, HTTPStatus.BAD_REQUEST
+
+        except Exception as e:
+            logging.error(f"Error searching tags in bucket '{bucket}': {str(e)}")
+            return {'error': 'Internal server error'}, HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@ns.route('/<string:app_name>/<string:bucket>/<string:secret_name>')
+class SecretTags(Resource):
+    """
+    Resource to read or replace the tags of a secret.
+    """
+
+    @auth.login_required
+    @ns.expect(auth_parser, validate=True)
+    @ns.doc(security='apikey', params={'app_name': 'Name of the Application', 'bucket': 'Name of the bucket',
+                                       'secret_name': 'Name of the secret'})
+    @ns.response(HTTPStatus.OK, 'Tags retrieved.')
+    @ns.response(HTTPStatus.NOT_FOUND, 'Secret not found.')
+    @ns.response(HTTPStatus.UNAUTHORIZED, 'Unauthorized access.')
+    @ns.response(HTTPStatus.INTERNAL_SERVER_ERROR, 'Internal server error encountered.')
+    @ip_whitelist_required
+    def get(self, bucket, secret_name, app_name):
+        """
+        GET method to retrieve the tags of the specified secret.
+
+        :param bucket: Name of the bucket containing the secret.
+        :param secret_name: Name of the secret.
+        :param app_name: Application Name for the Bucket.
+        :return: A JSON response with the tags of the secret.
+        """
+        error = _authorize(bucket, app_name)
+        if error is not None:
+            return error
+
+        try:
+            return {'tags': cry_secrets_management.get_secret_tags(bucket, secret_name, app_name)}, HTTPStatus.OK
+
+        except cry_secrets_management.SecretError as e:
+            return {'message': str(e)}, HTTPStatus.NOT_FOUND
+
+        except Exception as e:
+            logging.error(f"Error fetching tags of secret '{secret_name}': {str(e)}")
+            return {'error': 'Internal server error'}, HTTPStatus.INTERNAL_SERVER_ERROR
+
+    @auth.login_required
+    @ns.expect(auth_parser, tags_model, validate=True)
+    @ns.doc(security='apikey', params={'app_name': 'Name of the Application', 'bucket': 'Name of the bucket',
+                                       'secret_name': 'Name of the secret'})
+    @ns.response(HTTPStatus.OK, 'Tags replaced.')
+    @ns.response(HTTPStatus.BAD_REQUEST, 'Invalid tags.')
+    @ns.response(HTTPStatus.NOT_FOUND, 'Secret not found.')
+    @ns.response(HTTPStatus.UNAUTHORIZED, 'Unauthorized access.')
+    @ns.response(HTTPStatus.INTERNAL_SERVER_ERROR, 'Internal server error encountered.')
+    @ip_whitelist_required
+    def put(self, bucket, secret_name, app_name):
+        """
+        PUT method to replace the tags of the specified secret. An empty object removes every tag.
+
+        :param bucket: Name of the bucket containing the secret.
+        :param secret_name: Name of the secret.
+        :param app_name: Application Name for the Bucket.
+        :return: A JSON response with the new tags of the secret.
+        """
+        error = _authorize(bucket, app_name)
+        if error is not None:
+            return error
+
+        tags = (ns.payload or {}).get('tags')
+        try:
+            cry_secrets_management.set_secret_tags(bucket, secret_name, tags, app_name)
+            logging.info(f"Replaced the tags of secret '{secret_name}' in bucket '{bucket}'.")
+            return {'tags': tags}, HTTPStatus.OK
+
+        except ValueError as e:
+            return {'message': str(e)}, HTTPStatus.BAD_REQUEST
+
+        except cry_secrets_management.SecretError as e:
+            return {'message': str(e)}, HTTPStatus.NOT_FOUND
+
+        except Exception as e:
+            logging.error(f"Error replacing tags of secret '{secret_name}': {str(e)}")
+            return {'error': 'Internal server error'}, HTTPStatus.INTERNAL_SERVER_ERROR
@@ -0,0 +1,120 @@
+"""
+cry_watch.py
+------------
+
+Module for long-polling a secret, or every secret of a bucket, until it changes.
+"""
+
+import logging
+from http import HTTPStatus
+
+from flask import g
+from flask_restx import Namespace, Resource
+
+from globals import auth_parser, LOG_LEVEL, WATCH_DEFAULT_TIMEOUT, WATCH_MAX_TIMEOUT
+from modules import cry_secrets_management
+from modules.cry_auth import auth
+from modules.cry_auth_helpers import ip_whitelist_required
+from modules.cry_watch import WatchLimitError
+
+logging.basicConfig(level=LOG_LEVEL)
+
+ns = Namespace('watch', description='Namespace for waiting on changes to stored secrets.')
+
+# Query arguments of both watch routes
+watch_parser = auth_parser.copy()
+watch_parser.add_argument('version', location='args', required=False,
+                          help='Version last seen; the request returns as soon as the current version differs')
+watch_parser.add_argument('timeout', location='args', required=False,
+                          type=float, help=f"Seconds to wait, at most {WATCH_MAX_TIMEOUT:g}")
+
+
+def watch(bucket, app_name, watch_changes):
+    """
+    Helper function to authorize a watch request and run it.
+
+    :param watch_changes: Called with the last seen version and the timeout; returns (changed, current version).
+    """
+    if not hasattr(g, 'bucket_name'):
+        logging.error("bucket_name not found in global context. Token might not be set properly.")
+        return {'message': 'Unauthorized access.'}, HTTPStatus.UNAUTHORIZED
+
+    if g.bucket_name != bucket or g.app_name != app_name:
+        return {'message': 'Unauthorized access to this bucket.'}, HTTPStatus.UNAUTHORIZED
+
+    if not cry_secrets_management.bucket_exists(bucket, app_name):
+        return {'message': f"Bucket '{bucket}' not found."}, HTTPStatus.NOT_FOUND
+
+    args = watch_parser.parse_args()
+    timeout = args.get('timeout')
+    timeout = min(max(timeout, 0.0), WATCH_MAX_TIMEOUT) if timeout is not None else WATCH_DEFAULT_TIMEOUT
+    try:
+        # Accept an ETag as sent by get_secret, with or without its quotes
+        version = args.get('version')
+        changed, version = watch_changes(version.strip('"') if version is not None else None, timeout)
+        return {'changed': changed, 'version': version}, HTTPStatus.OK
+
+    except WatchLimitError as e:
+        logging.warning(f"Watch on bucket '{bucket}' rejected: {str(e)}")
+        return {'error': str(e)}, HTTPStatus.SERVICE_UNAVAILABLE, {'Retry-After': str(int(WATCH_DEFAULT_TIMEOUT))}
+
+    except Exception as e:
+        logging.error(f"Error watching bucket '{bucket}': {str(e)}")
+        return {'error': 'Internal server error'}, HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@ns.route('/<string:app_name>/<string:bucket>')
+class WatchBucket(Resource):
+    """
+    Resource to wait until any secret of a bucket is created, changed or deleted.
+    """
+
+    @auth.login_required
+    @ns.expect(watch_parser, validate=True)
+    @ns.doc(security='apikey', params={'app_name': 'Name of the Application', 'bucket': 'Name of the bucket'})
+    @ns.response(HTTPStatus.OK, 'The bucket changed or the timeout passed; see changed and version.')
+    @ns.response(HTTPStatus.NOT_FOUND, 'Bucket not found.')
+    @ns.response(HTTPStatus.UNAUTHORIZED, 'Unauthorized access.')
+    @ns.response(HTTPStatus.SERVICE_UNAVAILABLE, 'All watch slots are in use; poll again later.')
+    @ns.response(HTTPStatus.INTERNAL_SERVER_ERROR, 'Internal server error encountered.')
+    @ip_whitelist_required
+    def get(self, bucket, app_name):
+        """
+        GET method to wait for a change to the specified bucket.
+
+        :param bucket: Name of the bucket to watch.
+        :param app_name: Application Name for the Bucket.
+        :return: A JSON response with whether the bucket changed and its current version.
+        """
+        return watch(bucket, app_name, lambda version, timeout: cry_secrets_management.watch_bucket(
+            bucket, app_name, version, timeout))
+
+
+@ns.route('/<string:app_name>/<string:bucket>/<string:secret_name>')
+class WatchSecret(Resource):
+    """
+    Resource to wait until a secret is created, changed or deleted.
+    """
+
+    @auth.login_required
+    @ns.expect(watch_parser, validate=True)
+    @ns.doc(security='apikey', params={'app_name': 'Name of the Application', 'bucket': 'Name of the bucket',
+                                       'secret_name': 'Name of the secret'})
+    @ns.response(HTTPStatus.OK, 'The secret changed or the timeout passed; see changed and version.')
+    @ns.response(HTTPStatus.NOT_FOUND, 'Bucket not found.')
+    @ns.response(HTTPStatus.UNAUTHORIZED, 'Unauthorized access.')
+    @ns.response(HTTPStatus.SERVICE_UNAVAILABLE, 'All watch slots are in use; poll again later.')
+    @ns.response(HTTPStatus.INTERNAL_SERVER_ERROR, 'Internal server error encountered.')
+    @ip_whitelist_required
+    def get(self, bucket, secret_name, app_name):
+        """
+        GET method to wait for a change to the specified secret. The version is the secret's ETag, or '' if it
+        does not exist.
+
+        :param bucket: Name of the bucket containing the secret.
+        :param secret_name: Name of the secret to watch.
+        :param app_name: Application Name for the Bucket.
+        :return: A JSON response with whether the secret changed and its current version.
+        """
+        return watch(bucket, app_name, lambda version, timeout: cry_secrets_management.watch_secret(
+            bucket, secret_name, app_name, version, timeout))
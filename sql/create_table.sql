@@ -21,3 +21,154 @@ CREATE TABLE IF NOT EXISTS secrets (
     FOREIGN KEY (bucket_name, app_name) REFERENCES bucket_keys(bucket_name, app_name)
 );
 
+
+-- Tombstones: deleted secrets keep their row with deleted = TRUE so other nodes' incremental sync sees the delete
+ALTER TABLE secrets ADD COLUMN IF NOT EXISTS deleted BOOLEAN NOT NULL DEFAULT FALSE;
+
+-- Change notifications: every write to bucket_keys or secrets is announced on the cry_changes channel,
+-- so listening nodes refresh just the affected bucket or secret. Payloads carry names only, never key material.
+CREATE OR REPLACE FUNCTION cry_notify_change() RETURNS TRIGGER AS $$
+DECLARE
+    row_data JSONB;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        row_data := to_jsonb(OLD);
+    ELSE
+        row_data := to_jsonb(NEW);
+    END IF;
+    PERFORM pg_notify('cry_changes', json_build_object(
+        'table', TG_TABLE_NAME,
+        'app_name', row_data->>'app_name',
+        'bucket_name', row_data->>'bucket_name',
+        'secret_name', row_data->>'secret_name'
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS secrets_notify_change ON secrets;
+CREATE TRIGGER secrets_notify_change
+    AFTER INSERT OR UPDATE OR DELETE ON secrets
+    FOR EACH ROW EXECUTE FUNCTION cry_notify_change();
+
+DROP TRIGGER IF EXISTS bucket_keys_notify_change ON bucket_keys;
+CREATE TRIGGER bucket_keys_notify_change
+    AFTER INSERT OR UPDATE OR DELETE ON bucket_keys
+    FOR EACH ROW EXECUTE FUNCTION cry_notify_change();
+
+-- Change feed: each secret row records the transaction that last wrote it. Pages are read in (change_txid,
+-- secret_name) order and only up to the oldest transaction still running, so a cursor never passes a change
+-- that commits later. Rows written before this column existed sort first with change_txid = 0.
+ALTER TABLE secrets ADD COLUMN IF NOT EXISTS change_txid BIGINT NOT NULL DEFAULT 0;
+CREATE INDEX IF NOT EXISTS idx_secrets_changes ON secrets (app_name, bucket_name, change_txid, secret_name);
+
+CREATE OR REPLACE FUNCTION cry_stamp_change() RETURNS TRIGGER AS $$
+BEGIN
+    NEW.change_txid := txid_current();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS secrets_stamp_change ON secrets;
+CREATE TRIGGER secrets_stamp_change
+    BEFORE INSERT OR UPDATE ON secrets
+    FOR EACH ROW EXECUTE FUNCTION cry_stamp_change();
+
+-- Incremental sync: each node reads the rows of both tables whose change_txid lies between the horizon
+-- (txid_snapshot_xmin) of its previous pass and the current one. Unlike updated_at, which is the transaction's
+-- start time, the horizon only passes a transaction once it has committed, however long it ran.
+CREATE INDEX IF NOT EXISTS idx_secrets_change_txid ON secrets (change_txid);
+
+ALTER TABLE bucket_keys ADD COLUMN IF NOT EXISTS change_txid BIGINT NOT NULL DEFAULT 0;
+CREATE INDEX IF NOT EXISTS idx_bucket_keys_change_txid ON bucket_keys (change_txid);
+
+DROP TRIGGER IF EXISTS bucket_keys_stamp_change ON bucket_keys;
+CREATE TRIGGER bucket_keys_stamp_change
+    BEFORE INSERT OR UPDATE ON bucket_keys
+    FOR EACH ROW EXECUTE FUNCTION cry_stamp_change();
+
+-- Secret tags: optional key/value metadata, at most one value per key. Changing a secret's tags touches its
+-- updated_at, which restamps its change_txid, so incremental sync, change notifications and the change feed
+-- pick the change up.
+CREATE TABLE IF NOT EXISTS secret_tags (
+    bucket_name TEXT NOT NULL,
+    app_name TEXT NOT NULL,
+    secret_name TEXT NOT NULL,
+    tag_key TEXT NOT NULL CHECK(LENGTH(tag_key) BETWEEN 1 AND 128),
+    tag_value TEXT NOT NULL CHECK(LENGTH(tag_value) <= 256),
+    PRIMARY KEY (bucket_name, app_name, secret_name, tag_key),
+    FOREIGN KEY (bucket_name, app_name, secret_name) REFERENCES secrets(bucket_name, app_name, secret_name)
+        ON DELETE CASCADE
+);
+
+-- A deleted secret loses its tags, so a secret created again under the same name starts untagged
+CREATE OR REPLACE FUNCTION cry_drop_deleted_tags() RETURNS TRIGGER AS $$
+BEGIN
+    DELETE FROM secret_tags
+    WHERE bucket_name = NEW.bucket_name AND app_name = NEW.app_name AND secret_name = NEW.secret_name;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS secrets_drop_deleted_tags ON secrets;
+CREATE TRIGGER secrets_drop_deleted_tags
+    AFTER UPDATE OF deleted ON secrets
+    FOR EACH ROW WHEN (NEW.deleted AND NOT OLD.deleted) EXECUTE FUNCTION cry_drop_deleted_tags();
+
+-- Anti-entropy digests: a running digest per bucket, the XOR of one leaf hash per live secret, kept current by a
+-- trigger so reconciliation reads one row per bucket instead of hashing every secret. A leaf is
+-- sha256(hex(utf-8 secret name) || ':' || hex(sha256(encrypted_secret))) as 256 bits; XOR lets a write swap its
+-- old leaf for its new one without reading the rest of the bucket. App roots are aggregated from these rows.
+CREATE OR REPLACE FUNCTION cry_secret_leaf(secret_name TEXT, encrypted_secret BYTEA) RETURNS BIT(256) AS $$
+    SELECT ('x' || encode(sha256(convert_to(
+        encode(convert_to(secret_name, 'UTF8'), 'hex') || ':' || encode(sha256(encrypted_secret), 'hex'),
+        'UTF8')), 'hex'))::BIT(256);
+$$ LANGUAGE sql IMMUTABLE STRICT;
+
+CREATE OR REPLACE AGGREGATE cry_bit_xor(BIT) (SFUNC = bitxor, STYPE = BIT);
+
+-- The table is backfilled once, when it is created. Writers are held off until the trigger below exists,
+-- so no secret written meanwhile is missed.
+DO $$
+BEGIN
+    IF to_regclass('bucket_digests') IS NULL THEN
+        CREATE TABLE bucket_digests (
+            app_name TEXT NOT NULL,
+            bucket_name TEXT NOT NULL,
+            secret_count BIGINT NOT NULL,
+            digest BIT(256) NOT NULL,
+            PRIMARY KEY (app_name, bucket_name)
+        );
+        LOCK TABLE secrets IN SHARE MODE;
+        INSERT INTO bucket_digests (app_name, bucket_name, secret_count, digest)
+        SELECT app_name, bucket_name, COUNT(*), cry_bit_xor(cry_secret_leaf(secret_name, encrypted_secret))
+        FROM secrets
+        WHERE NOT deleted
+        GROUP BY app_name, bucket_name;
+    END IF;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION cry_apply_leaf(app TEXT, bucket TEXT, count_delta BIGINT, leaf BIT(256)) RETURNS VOID AS $$
+    INSERT INTO bucket_digests AS d (app_name, bucket_name, secret_count, digest)
+    VALUES (app, bucket, count_delta, leaf)
+    ON CONFLICT (app_name, bucket_name)
+    DO UPDATE SET secret_count = d.secret_count + EXCLUDED.secret_count, digest = d.digest # EXCLUDED.digest;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION cry_track_bucket_digest() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' AND NOT OLD.deleted THEN
+        PERFORM cry_apply_leaf(OLD.app_name, OLD.bucket_name, -1, cry_secret_leaf(OLD.secret_name, OLD.encrypted_secret));
+    END IF;
+    IF TG_OP <> 'DELETE' AND NOT NEW.deleted THEN
+        PERFORM cry_apply_leaf(NEW.app_name, NEW.bucket_name, 1, cry_secret_leaf(NEW.secret_name, NEW.encrypted_secret));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS secrets_track_bucket_digest ON secrets;
+CREATE TRIGGER secrets_track_bucket_digest
+    AFTER INSERT OR DELETE OR UPDATE OF encrypted_secret, deleted ON secrets
+    FOR EACH ROW EXECUTE FUNCTION cry_track_bucket_digest();
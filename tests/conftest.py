@@ -0,0 +1,17 @@
+"""
+Shared setup for the unit tests.
+
+The application modules read their configuration from the environment at import and open the
+database pool as they load, so the environment is set and the pool class replaced before any of
+them is imported. No test talks to a database: code that reads or writes rows is exercised with
+`cry_database` functions monkeypatched per test.
+"""
+
+import os
+import sys
+from unittest import mock
+
+os.environ.setdefault('CRY_KDF_EXECUTOR', 'inline')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+mock.patch('psycopg2.pool.ThreadedConnectionPool').start()
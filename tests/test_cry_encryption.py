@@ -0,0 +1,107 @@
+import base64
+import os
+
+import pytest
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import Fernet
+
+from modules import cry_encryption
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).decode()
+
+
+def _envelope(kdf_params, plaintext='secret', salt=b'0' * cry_encryption.SALT_LENGTH):
+    """Seal an envelope under the key the given parameters derive, as a node configured with them would."""
+    ciphers = cry_encryption._build_ciphers(cry_encryption.generate_key_basic(salt, kdf_params))
+    return cry_encryption._seal(ciphers, kdf_params, plaintext), salt
+
+
+@pytest.fixture
+def derivations(monkeypatch):
+    """Record every key derivation instead of silently paying for it."""
+    calls = []
+    derive = cry_encryption.generate_key_basic
+
+    def recording_derive(salt, kdf_params=cry_encryption.DEFAULT_KDF_PARAMS):
+        calls.append(kdf_params)
+        return derive(salt, kdf_params)
+
+    monkeypatch.setattr(cry_encryption, 'generate_key_basic', recording_derive)
+    return calls
+
+
+def test_envelope_round_trip_records_kdf_params():
+    salt = os.urandom(cry_encryption.SALT_LENGTH)
+    envelope = cry_encryption.encrypt_string('hello', salt)
+    assert envelope[0] & cry_encryption.ENVELOPE_KDF_FLAG
+    assert cry_encryption.kdf_params_of(envelope) == cry_encryption.KDF_PARAMS
+    assert cry_encryption.decrypt_string(envelope, salt) == 'hello'
+
+
+def test_tampered_envelope_fails_authentication():
+    salt = os.urandom(cry_encryption.SALT_LENGTH)
+    envelope = bytearray(cry_encryption.encrypt_string('hello', salt))
+    envelope[-1] ^= 0x01
+    with pytest.raises(InvalidTag):
+        cry_encryption.decrypt_string(bytes(envelope), salt)
+
+
+def test_legacy_fernet_token_still_decrypts():
+    salt = os.urandom(cry_encryption.SALT_LENGTH)
+    token = Fernet(cry_encryption.generate_key_basic(salt)).encrypt(b'legacy')
+    assert cry_encryption.decrypt_string(token, salt) == 'legacy'
+    assert cry_encryption.decrypt_text(_b64(token), _b64(salt)) == {'decrypted_text': 'legacy'}
+
+
+def test_decrypt_text_round_trip():
+    encrypted = cry_encryption.encrypt_text('hello')
+    assert cry_encryption.decrypt_text(encrypted['encrypted_text'], encrypted['salt']) == {'decrypted_text': 'hello'}
+
+
+@pytest.mark.parametrize('kdf_params', [('pbkdf2', 10000000), ('scrypt', 2 ** 20, 8, 1), ('scrypt', 2 ** 14, 8, 16)])
+def test_caller_supplied_envelope_over_cost_is_rejected_before_deriving(kdf_params, derivations):
+    # Only the header is read before the check, so a body sealed under any key will do
+    ciphers = cry_encryption._build_ciphers(cry_encryption.generate_key())
+    envelope = cry_encryption._seal(ciphers, kdf_params, 'x')
+    derivations.clear()
+
+    with pytest.raises(cry_encryption.DecryptionError):
+        cry_encryption.decrypt_text(_b64(envelope), _b64(b'0' * cry_encryption.SALT_LENGTH))
+    results = cry_encryption.decrypt_texts([(_b64(envelope), _b64(b'0' * cry_encryption.SALT_LENGTH))])
+    assert isinstance(results[0], cry_encryption.DecryptionError)
+    assert derivations == []
+
+
+def test_stored_envelope_stays_readable_after_kdf_cost_is_lowered(monkeypatch):
+    envelope, salt = _envelope(('pbkdf2', 150000))
+    monkeypatch.setattr(cry_encryption, 'KDF_PARAMS', cry_encryption.DEFAULT_KDF_PARAMS)
+    monkeypatch.setattr(cry_encryption, 'KDF_ENVELOPE_MAX_COST_FACTOR', 1)
+
+    assert cry_encryption.decrypt_string(envelope, salt) == 'secret'
+    with pytest.raises(cry_encryption.DecryptionError):
+        cry_encryption.decrypt_text(_b64(envelope), _b64(salt))
+
+
+def test_kdf_config_over_scrypt_memory_is_rejected():
+    with pytest.raises(ValueError):
+        cry_encryption.kdf_params_from_config({'algorithm': 'scrypt', 'n': 2 ** 20, 'r': 8, 'p': 1})
+    assert cry_encryption.kdf_params_from_config({'algorithm': 'scrypt', 'n': 2 ** 14, 'r': 8, 'p': 1}) == \
+        ('scrypt', 2 ** 14, 8, 1)
+
+
+def test_decrypt_texts_derives_each_salt_once_and_caps_distinct_salts(monkeypatch, derivations):
+    first, second = cry_encryption.encrypt_text('a'), cry_encryption.encrypt_text('b')
+    items = [(first['encrypted_text'], first['salt']), (second['encrypted_text'], second['salt']),
+             (first['encrypted_text'], first['salt']), ('not base64!', first['salt'])]
+    derivations.clear()
+
+    results = cry_encryption.decrypt_texts(items)
+    assert results[:3] == [{'decrypted_text': 'a'}, {'decrypted_text': 'b'}, {'decrypted_text': 'a'}]
+    assert isinstance(results[3], cry_encryption.DecryptionError)
+    assert len(derivations) == 2
+
+    monkeypatch.setattr(cry_encryption, 'CRYPTO_BATCH_MAX_SALTS', 1)
+    with pytest.raises(ValueError):
+        cry_encryption.decrypt_texts(items)
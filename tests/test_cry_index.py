@@ -0,0 +1,67 @@
+import pytest
+
+from modules import cry_index
+
+
+@pytest.fixture
+def bucket():
+    for secret_name in ('db', 'cache', 'queue'):
+        cry_index.add_secret('tags-app', 'bucket', secret_name)
+    cry_index.add_secret('tags-app', 'other', 'db')
+    yield 'tags-app', 'bucket'
+    cry_index.remove_bucket('tags-app', 'bucket')
+    cry_index.remove_bucket('tags-app', 'other')
+
+
+def test_find_by_tags_intersects_every_tag(bucket):
+    cry_index.set_tags(*bucket, 'db', {'env': 'prod', 'team': 'core'})
+    cry_index.set_tags(*bucket, 'cache', {'env': 'prod', 'team': 'web'})
+    cry_index.set_tags(*bucket, 'queue', {'env': 'dev', 'team': 'core'})
+    cry_index.set_tags('tags-app', 'other', 'db', {'env': 'prod'})
+
+    assert cry_index.find_by_tags(*bucket, {'env': 'prod'}) == ['cache', 'db']
+    assert cry_index.find_by_tags(*bucket, {'env': 'prod', 'team': 'core'}) == ['db']
+    assert cry_index.find_by_tags(*bucket, {'env': 'prod', 'team': 'none'}) == []
+    assert cry_index.find_by_tags(*bucket, {}) == []
+    assert cry_index.find_by_tags('tags-app', 'missing', {'env': 'prod'}) == []
+
+
+def test_set_tags_replaces_the_previous_tags(bucket):
+    cry_index.set_tags(*bucket, 'db', {'env': 'prod', 'team': 'core'})
+    cry_index.set_tags(*bucket, 'db', {'env': 'dev'})
+    assert cry_index.get_tags(*bucket, 'db') == {'env': 'dev'}
+    assert cry_index.find_by_tags(*bucket, {'env': 'prod'}) == []
+    assert cry_index.find_by_tags(*bucket, {'team': 'core'}) == []
+    assert cry_index.find_by_tags(*bucket, {'env': 'dev'}) == ['db']
+
+    cry_index.set_tags(*bucket, 'db', None)
+    assert cry_index.get_tags(*bucket, 'db') == {}
+    assert cry_index.find_by_tags(*bucket, {'env': 'dev'}) == []
+
+
+def test_removing_a_secret_or_bucket_drops_its_tags(bucket):
+    cry_index.set_tags(*bucket, 'db', {'env': 'prod'})
+    cry_index.set_tags(*bucket, 'cache', {'env': 'prod'})
+    cry_index.set_tags('tags-app', 'other', 'db', {'env': 'prod'})
+
+    cry_index.remove_secret(*bucket, 'db')
+    assert cry_index.get_tags(*bucket, 'db') == {}
+    assert cry_index.find_by_tags(*bucket, {'env': 'prod'}) == ['cache']
+
+    cry_index.remove_bucket(*bucket)
+    assert cry_index.get_tags(*bucket, 'cache') == {}
+    assert cry_index.find_by_tags(*bucket, {'env': 'prod'}) == []
+    # Another bucket's secret of the same name keeps its tags
+    assert cry_index.find_by_tags('tags-app', 'other', {'env': 'prod'}) == ['db']
+
+
+def test_load_tags_replaces_one_bucket_only(bucket):
+    cry_index.set_tags(*bucket, 'db', {'env': 'prod'})
+    cry_index.set_tags('tags-app', 'other', 'db', {'env': 'prod'})
+
+    count = cry_index.load_tags([('tags-app', 'bucket', 'queue', 'env', 'prod'),
+                                 ('tags-app', 'bucket', 'queue', 'team', 'core')], *bucket)
+    assert count == 2
+    assert cry_index.find_by_tags(*bucket, {'env': 'prod'}) == ['queue']
+    assert cry_index.get_tags(*bucket, 'db') == {}
+    assert cry_index.get_tags('tags-app', 'other', 'db') == {'env': 'prod'}
@@ -0,0 +1,54 @@
+import pytest
+
+from modules.cry_ip_allowlist import IPAllowList
+
+
+def test_overlapping_and_adjacent_ranges_merge():
+    allowlist = IPAllowList(['10.0.0.0/25', '10.0.0.128/25', '10.0.0.64/26', '10.0.1.5', '10.0.1.6'])
+    # 10.0.0.0/25 and 10.0.0.128/25 are adjacent, /26 lies inside them, .5 and .6 touch
+    assert len(allowlist) == 2
+    assert '10.0.0.0' in allowlist and '10.0.0.255' in allowlist
+    assert '10.0.1.5' in allowlist and '10.0.1.6' in allowlist
+    assert '10.0.1.0' not in allowlist and '10.0.1.4' not in allowlist and '10.0.1.7' not in allowlist
+
+
+def test_ranges_stay_apart_when_there_is_a_gap():
+    allowlist = IPAllowList(['10.0.0.0/24', '10.0.2.0/24'])
+    assert len(allowlist) == 2
+    assert '10.0.1.1' not in allowlist
+    assert '10.0.2.1' in allowlist
+
+
+def test_host_bits_in_a_network_are_ignored():
+    allowlist = IPAllowList(['192.168.1.77/24'])
+    assert '192.168.1.1' in allowlist and '192.168.2.1' not in allowlist
+
+
+def test_ipv6_and_ipv4_mapped_addresses():
+    allowlist = IPAllowList(['fd00::/8', '10.0.0.5'])
+    assert 'fd12::1' in allowlist and 'fe80::1' not in allowlist
+    assert '::ffff:10.0.0.5' in allowlist
+    assert '::ffff:10.0.0.6' not in allowlist
+    # The IPv4 range does not leak into IPv6 addresses with the same integer value
+    assert '::a00:5' not in allowlist
+
+
+@pytest.mark.parametrize('entries', [['ANY'], ['10.0.0.1', 'ANY']])
+def test_any_allows_every_address(entries):
+    allowlist = IPAllowList(entries)
+    assert '8.8.8.8' in allowlist and '2001:db8::1' in allowlist
+
+
+@pytest.mark.parametrize('entry', ['any', 'Any', ' ANY'])
+def test_any_is_matched_exactly(entry):
+    allowlist = IPAllowList([entry])
+    assert len(allowlist) == 0
+    assert '8.8.8.8' not in allowlist
+
+
+def test_invalid_entries_and_addresses_are_ignored():
+    allowlist = IPAllowList(['not-an-ip', '10.0.0.0/33', '', ' 10.0.0.1 '])
+    assert len(allowlist) == 1
+    assert '10.0.0.1' in allowlist
+    assert 'not-an-ip' not in allowlist and None not in allowlist
+    assert len(IPAllowList(None)) == 0
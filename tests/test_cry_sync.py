@@ -0,0 +1,93 @@
+import pytest
+
+from modules import cry_database
+from modules import cry_index
+from modules import cry_initialize
+from modules import cry_materializer
+
+
+@pytest.fixture
+def database(monkeypatch):
+    """Stand in for the change_txid queries: rows are (change_txid, row) and the horizon is settable."""
+    db = {'horizon': 100, 'secrets': [], 'bucket_keys': [], 'reads': []}
+
+    def changed_since(table):
+        def read(after, before):
+            db['reads'].append((table, after, before))
+            return [row for txid, row in db[table] if (after is None or txid >= after) and txid < before]
+        return read
+
+    monkeypatch.setattr(cry_database, 'get_change_horizon', lambda: db['horizon'])
+    monkeypatch.setattr(cry_database, 'get_secrets_changed_since', changed_since('secrets'))
+    monkeypatch.setattr(cry_database, 'get_bucket_keys_changed_since', changed_since('bucket_keys'))
+    monkeypatch.setattr(cry_database, 'get_all_secret_tags', lambda: [])
+    monkeypatch.setattr(cry_database, 'get_secret_tags', lambda secrets: [])
+    monkeypatch.setattr(cry_index, 'load_tags', lambda tags: 0)
+    monkeypatch.setattr(cry_index, 'set_tags', lambda *args: None)
+    monkeypatch.setitem(cry_initialize._sync_watermarks, 'secrets', None)
+    monkeypatch.setitem(cry_initialize._sync_watermarks, 'bucket_keys', None)
+    return db
+
+
+@pytest.fixture
+def applied(monkeypatch):
+    """Record the secret rows applied; a secret named 'broken' fails to materialize."""
+    rows = []
+
+    def apply(app_name, bucket_name, secret_name, encrypted_secret, deleted):
+        rows.append(secret_name)
+        return cry_materializer.FAILED if secret_name == 'broken' else cry_materializer.WRITTEN
+
+    monkeypatch.setattr(cry_initialize, '_apply_secret_row', apply)
+    return rows
+
+
+def _secret(txid, secret_name, deleted=False):
+    return txid, ('app', 'bucket', secret_name, b'ciphertext', deleted)
+
+
+def test_secret_sync_pages_between_horizons(database, applied):
+    database['secrets'] = [_secret(10, 'one'), _secret(50, 'two', deleted=True)]
+    assert cry_initialize.initialize_secrets_from_db() == 2
+    assert database['reads'] == [('secrets', None, 100)]
+    assert cry_initialize._sync_watermarks['secrets'] == 100
+
+    # A write committed after the horizon was read is picked up by the next pass, and nothing before it is
+    database['secrets'].append(_secret(120, 'three'))
+    database['horizon'] = 150
+    applied.clear()
+    assert cry_initialize.initialize_secrets_from_db() == 1
+    assert database['reads'][-1] == ('secrets', 100, 150)
+    assert applied == ['three']
+    assert cry_initialize._sync_watermarks['secrets'] == 150
+
+
+def test_failed_write_keeps_the_watermark(database, applied):
+    database['secrets'] = [_secret(10, 'one'), _secret(20, 'broken')]
+    cry_initialize.initialize_secrets_from_db()
+    assert cry_initialize._sync_watermarks['secrets'] is None
+
+    # The retry re-reads from the same watermark, so the failed secret is applied again
+    database['horizon'] = 200
+    applied.clear()
+    cry_initialize.initialize_secrets_from_db()
+    assert database['reads'][-1] == ('secrets', None, 200)
+    assert sorted(applied) == ['broken', 'one']
+    assert cry_initialize._sync_watermarks['secrets'] is None
+
+
+def test_bucket_key_sync_advances_to_the_horizon(database, monkeypatch):
+    initialized = []
+    monkeypatch.setattr(cry_initialize, 'initialize_buckets', initialized.extend)
+    monkeypatch.setattr(cry_initialize, 'bucket_cache', {})
+    database['bucket_keys'] = [(5, ('app', 'bucket', 'key', 'client'))]
+
+    assert cry_initialize.sync_buckets_from_db() == 1
+    assert initialized == [('app', 'bucket', 'key')]
+    assert cry_initialize.bucket_cache == {('app', 'bucket'): {'client_id': 'client'}}
+    assert cry_initialize._sync_watermarks['bucket_keys'] == 100
+
+    database['horizon'] = 130
+    assert cry_initialize.sync_buckets_from_db() == 0
+    assert database['reads'][-1] == ('bucket_keys', 100, 130)
+    assert cry_initialize._sync_watermarks['bucket_keys'] == 130
@@ -0,0 +1,82 @@
+import threading
+
+import pytest
+
+from modules import cry_index
+from modules import cry_local_digests
+from modules import cry_materializer
+from modules import cry_secrets_management
+from modules import cry_watch
+
+
+@pytest.fixture
+def secrets_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(cry_local_digests, 'SECRETS_DIR', str(tmp_path))
+    yield tmp_path
+    for app_name, bucket_name in list(cry_index.list_buckets()):
+        if app_name.startswith('watch-'):
+            cry_index.remove_bucket(app_name, bucket_name)
+
+
+def _write(secrets_dir, app_name, bucket_name, secret_name, data):
+    cry_index.add_secret(app_name, bucket_name, secret_name)
+    cry_materializer.write_file(str(secrets_dir / app_name / bucket_name / f"{secret_name}.json"), data)
+
+
+def test_waiter_limit_rejects_and_frees_slots(monkeypatch):
+    monkeypatch.setattr(cry_watch, 'WATCH_MAX_WAITERS', 1)
+    with cry_watch.waiter('watch-app', 'bucket', 'secret'):
+        with pytest.raises(cry_watch.WatchLimitError):
+            with cry_watch.waiter('watch-app', 'bucket'):
+                pass
+    with cry_watch.waiter('watch-app', 'bucket'):
+        assert cry_watch.stats()['waiters'] == 1
+    assert cry_watch.stats()['waiters'] == 0
+
+
+def test_publish_wakes_secret_and_bucket_waiters_only():
+    with cry_watch.waiter('watch-app', 'bucket', 'secret') as secret_event, \
+            cry_watch.waiter('watch-app', 'bucket') as bucket_event, \
+            cry_watch.waiter('watch-app', 'bucket', 'other') as other_event, \
+            cry_watch.waiter('watch-app', 'other-bucket') as other_bucket_event:
+        cry_watch.publish('watch-app', 'bucket', 'secret')
+        assert secret_event.is_set() and bucket_event.is_set()
+        assert not other_event.is_set() and not other_bucket_event.is_set()
+
+
+def test_bucket_version_depends_only_on_content(secrets_dir):
+    assert cry_secrets_management.get_bucket_etag('bucket', 'watch-a') == ''
+    _write(secrets_dir, 'watch-a', 'bucket', 'one', b'1')
+    _write(secrets_dir, 'watch-a', 'bucket', 'two', b'2')
+    _write(secrets_dir, 'watch-b', 'bucket', 'two', b'2')
+    _write(secrets_dir, 'watch-b', 'bucket', 'one', b'1')
+    version = cry_secrets_management.get_bucket_etag('bucket', 'watch-a')
+    assert len(version) == 64
+    # Another node holding the same secrets, written in another order, reports the same version
+    assert cry_secrets_management.get_bucket_etag('bucket', 'watch-b') == version
+
+    # A restart rebuilds the same version from the files
+    cry_local_digests.rescan()
+    assert cry_secrets_management.get_bucket_etag('bucket', 'watch-a') == version
+
+    _write(secrets_dir, 'watch-a', 'bucket', 'two', b'changed')
+    assert cry_secrets_management.get_bucket_etag('bucket', 'watch-a') != version
+    _write(secrets_dir, 'watch-a', 'bucket', 'two', b'2')
+    assert cry_secrets_management.get_bucket_etag('bucket', 'watch-a') == version
+
+
+def test_watch_bucket_returns_on_change_or_timeout(secrets_dir):
+    _write(secrets_dir, 'watch-c', 'bucket', 'one', b'1')
+    version = cry_secrets_management.get_bucket_etag('bucket', 'watch-c')
+    assert cry_secrets_management.watch_bucket('bucket', 'watch-c', version, 0.05) == (False, version)
+
+    def change():
+        _write(secrets_dir, 'watch-c', 'bucket', 'one', b'new')
+        cry_watch.publish('watch-c', 'bucket', 'one')
+
+    timer = threading.Timer(0.05, change)
+    timer.start()
+    changed, new_version = cry_secrets_management.watch_bucket('bucket', 'watch-c', version, 5)
+    timer.join()
+    assert changed and new_version != version
+    assert new_version == cry_secrets_management.get_bucket_etag('bucket', 'watch-c')
@@ -0,0 +1,75 @@
+import threading
+
+import pytest
+
+from modules import cry_database
+from modules import cry_write_coalescer
+
+
+@pytest.fixture
+def transactions(monkeypatch):
+    """Record each transaction's writes; a transaction holding a write to 'bad' fails as a whole."""
+    committed = []
+    lock = threading.Lock()
+
+    def write_secrets_batch(writes):
+        if any(write[3] == 'bad' for write in writes):
+            raise ValueError('bad write')
+        with lock:
+            committed.append([write[3] for write in writes])
+
+    monkeypatch.setattr(cry_database, 'write_secrets_batch', write_secrets_batch)
+    return committed
+
+
+def _batch(*secret_names):
+    return [cry_write_coalescer._PendingWrite(('save', 'app', 'bucket', secret_name, b'x'))
+            for secret_name in secret_names]
+
+
+def test_batch_commits_in_one_transaction(transactions):
+    batch = _batch('one', 'two', 'three')
+    cry_write_coalescer._commit(batch)
+    assert transactions == [['one', 'two', 'three']]
+    assert all(pending.done.is_set() and pending.error is None for pending in batch)
+
+
+def test_failed_batch_falls_back_to_one_transaction_per_write(transactions):
+    fallbacks = cry_write_coalescer.stats()['fallbacks']
+    batch = _batch('one', 'bad', 'two')
+    cry_write_coalescer._commit(batch)
+
+    # Only the bad write fails; its neighbours still commit, each on its own
+    assert transactions == [['one'], ['two']]
+    assert [pending.error is None for pending in batch] == [True, False, True]
+    assert isinstance(batch[1].error, ValueError)
+    assert all(pending.done.is_set() for pending in batch)
+    assert cry_write_coalescer.stats()['fallbacks'] == fallbacks + 1
+
+
+def test_failed_single_write_is_not_retried(transactions):
+    batch = _batch('bad')
+    cry_write_coalescer._commit(batch)
+    assert transactions == []
+    assert isinstance(batch[0].error, ValueError) and batch[0].done.is_set()
+
+
+def test_concurrent_callers_each_get_their_own_result(transactions, monkeypatch):
+    monkeypatch.setattr(cry_write_coalescer, 'WRITE_COALESCE_ENABLED', True)
+    monkeypatch.setattr(cry_write_coalescer, 'WRITE_COALESCE_MAX_DELAY', 0.05)
+    errors = {}
+
+    def save(secret_name):
+        try:
+            cry_write_coalescer.save_secret('bucket', secret_name, b'x', 'app')
+        except ValueError as e:
+            errors[secret_name] = e
+
+    threads = [threading.Thread(target=save, args=(secret_name,)) for secret_name in ('one', 'bad', 'two', 'three')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert list(errors) == ['bad']
+    assert sorted(name for transaction in transactions for name in transaction) == ['one', 'three', 'two']